@@ -0,0 +1,163 @@
+"""
+基准测试共用的工具：在临时目录中编译项目，以及执行生成的数据包的解释器
+"""
+
+import os, re, sys, subprocess, tempfile
+from contextlib import contextmanager
+from typing import Iterator
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def commands(lines: list[str]) -> list[str]:
+    """去掉空行与注释"""
+    return [line for line in lines if line and not line.startswith('#')]
+
+@contextmanager
+def run_project(script: str, *args) -> Iterator[tuple[str, str]]:
+    """在新的临时目录中以`--run`运行`script`，返回（工作目录，标准输出），离开时删除目录"""
+    with tempfile.TemporaryDirectory() as work_dir:
+        out = subprocess.run(
+            [sys.executable, os.path.abspath(script), '--run', *map(str, args)],
+            cwd=work_dir, capture_output=True, text=True, check=True
+        )
+        yield work_dir, out.stdout
+
+class Interpreter:
+    """执行数据包中的函数，只支持计分板、storage、execute、function与return的常见形式。
+
+    `executed`为执行的命令数，`max_depth`为函数调用的最大嵌套层数。
+    """
+
+    def __init__(self, folder: str, namespace: str):
+        self.functions = {}
+        base = os.path.join(folder, namespace, 'function')
+        for path, _, names in os.walk(base):
+            for name in names:
+                rel = os.path.relpath(os.path.join(path, name), base)
+                sig = f"{namespace}:{rel.removesuffix('.mcfunction').replace(os.sep, '/')}"
+                with open(os.path.join(path, name), encoding='utf-8') as rd:
+                    self.functions[sig] = [
+                        line for line in rd.read().split('\n') if line and line[0] != '#'
+                    ]
+        self.scores = {}
+        self.storage = {}
+        self.executed = 0
+        self.depth = 0
+        self.max_depth = 0
+
+    def call(self, sig: str, args: dict[str, str] | None = None) -> int | None:
+        """执行函数，返回其返回值，函数没有返回时为`None`"""
+        self.depth += 1
+        self.max_depth = max(self.max_depth, self.depth)
+        try:
+            for line in self.functions[sig]:
+                if line[0] == '$':
+                    line = re.sub(r'\$\((\w+)\)', lambda m: args[m.group(1)], line[1:])
+                self.executed += 1
+                returned, _ = self.run(line.split())
+                if returned is not None: return returned
+            return None
+        finally:
+            self.depth -= 1
+
+    def run(self, tokens: list[str]) -> tuple[int | None, int]:
+        """执行命令，返回（函数的返回值，命令的结果）"""
+        head = tokens[0]
+        if head == 'return':
+            if tokens[1] == 'run':
+                returned, result = self.run(tokens[2:])
+                return result if returned is None else returned, result
+            return int(tokens[1]), int(tokens[1])
+        if head == 'function':
+            args = None
+            if len(tokens) > 2:
+                path = tokens[5] + '.'
+                args = {
+                    key[len(path):]: str(value) for key, value in self.storage.items()
+                    if key.startswith(path)
+                }
+            returned = self.call(tokens[1], args)
+            return None, 0 if returned is None else returned
+        if head == 'execute':
+            return self.execute(tokens[1:])
+        if head == 'scoreboard' and tokens[1] == 'players':
+            return None, self.scoreboard(tokens[2:])
+        if head == 'data' and tokens[1] == 'get':
+            return None, int(self.storage.get(tokens[4], 0))
+        return None, 0
+
+    def scoreboard(self, tokens: list[str]) -> int:
+        action, holder = tokens[0], tokens[1]
+        if action == 'set':
+            self.scores[holder] = int(tokens[3])
+        elif action == 'add':
+            self.scores[holder] = self.scores.get(holder, 0) + int(tokens[3])
+        elif action == 'remove':
+            self.scores[holder] = self.scores.get(holder, 0) - int(tokens[3])
+        elif action == 'reset':
+            self.scores.pop(holder, None)
+        elif action == 'operation':
+            source = self.scores.get(tokens[4], 0)
+            target = self.scores.get(holder, 0)
+            self.scores[holder] = {
+                '=': source, '+=': target + source, '-=': target - source,
+                '*=': target * source,
+                '/=': target // source if source else target,
+                '%=': target % source if source else target,
+                '<': min(target, source), '>': max(target, source)
+            }[tokens[3]]
+        if holder in self.scores:
+            # scores are 32-bit and wrap around like the game's
+            self.scores[holder] = (self.scores[holder] + 2**31) % 2**32 - 2**31
+        return self.scores.get(holder, 0)
+
+    def test(self, tokens: list[str]) -> bool:
+        """`score <holder> <objective> (matches <range>|<op> <source> <objective>)`"""
+        holder = tokens[1]
+        if tokens[3] == 'matches':
+            return self.matches(holder, tokens[4])
+        source = tokens[4]
+        if holder not in self.scores or source not in self.scores: return False
+        left, right = self.scores[holder], self.scores[source]
+        return {
+            '<': left < right, '<=': left <= right, '=': left == right,
+            '>=': left >= right, '>': left > right
+        }[tokens[3]]
+
+    def matches(self, holder: str, text: str) -> bool:
+        if holder not in self.scores: return False
+        low, _, high = text.partition('..')
+        if not _: high = low
+        score = self.scores[holder]
+        return (not low or score >= int(low)) and (not high or score <= int(high))
+
+    def execute(self, tokens: list[str]) -> tuple[int | None, int]:
+        stores = []
+        index = 0
+        returned, result = None, 1
+        while index < len(tokens):
+            word = tokens[index]
+            if word == 'run':
+                returned, result = self.run(tokens[index + 1:])
+                break
+            if word in ('if', 'unless'):
+                passed = self.test(tokens[index + 1:])
+                if passed != (word == 'if'):
+                    # a failed condition still stores its result
+                    result = 0
+                    break
+                index += 6 if tokens[index + 4] == 'matches' else 7
+            elif word == 'store':
+                if tokens[index + 2] == 'score':
+                    stores.append((tokens[index + 1], tokens[index + 3], None))
+                    index += 5
+                else:
+                    stores.append((tokens[index + 1], None, tokens[index + 4]))
+                    index += 7
+            else:
+                index += 1
+        for mode, holder, path in stores:
+            value = (1 if result else 0) if mode == 'success' else result
+            if holder is not None: self.scores[holder] = value
+            else: self.storage[path] = value
+        return returned, result
@@ -0,0 +1,69 @@
+"""
+比较直接写出zip数据包与先写出散落文件再打包的构建时间
+
+编译含有大量MCFunction的项目，分别统计输出阶段（`MCF.tidyUp`）的耗时。散落文件模式
+额外计入将输出目录打包为zip的耗时，两者使用相同的压缩等级。
+
+usage: python benchmarks/bench_archive.py
+"""
+
+import os, sys, time, zipfile
+from _common import ROOT, run_project
+
+FUNCTION_COUNTS = (100, 1000, 3000)
+MODES = ('loose+zip', 'archive')
+LEVEL = 6
+
+def zip_tree(dist: str, archive: str) -> None:
+    with zipfile.ZipFile(archive, 'w', zipfile.ZIP_DEFLATED, compresslevel=LEVEL) as zf:
+        for folder, _, files in os.walk(dist):
+            for file in files:
+                path = os.path.join(folder, file)
+                zf.write(path, 'data/' + os.path.relpath(path, dist).replace(os.sep, '/'))
+
+def compile_project(mode: str, count: int) -> tuple[float, int]:
+    sys.path.insert(0, ROOT)
+    from emcf.core import MCF
+    from emcf.types import Integer
+    from emcf.functional import MCFunction, Return
+
+    def make(index: int):
+        @MCFunction(Integer)
+        def step(value: Integer):
+            Return(value * (index + 2) + index)
+        return step
+
+    functions = [make(index) for index in range(count)]
+    config = {"namespace": "bench", "version": 57, "gc": True, "naming": "stable"}
+    if mode == 'archive':
+        config["archive"] = "pack.zip"
+        config["archive_level"] = LEVEL
+    MCF.useConfig(config)
+
+    value = Integer(None)
+    value.collect("value")
+    for function in functions:
+        value.assign(function(value))
+    start = time.perf_counter()
+    MCF.tidyUp()
+    if mode != 'archive':
+        zip_tree('build', 'pack.zip')
+    return time.perf_counter() - start, os.path.getsize('pack.zip')
+
+def main() -> None:
+    print(f"compression level: {LEVEL}")
+    print(f"{'functions':>10}" + ''.join(f"{mode:>16}" for mode in MODES) + f"{'size':>12}")
+    for count in FUNCTION_COUNTS:
+        row = f"{count:>10}"
+        size = 0
+        for mode in MODES:
+            with run_project(__file__, mode, count) as (_, out):
+                elapsed, size = out.strip().splitlines()[-1].split()
+                row += f"{float(elapsed) * 1000:>13.1f} ms"
+        print(row + f"{int(size):>12,}")
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--run':
+        print(*compile_project(sys.argv[2], int(sys.argv[3])))
+    else:
+        main()
@@ -0,0 +1,81 @@
+"""
+统计MCFunction调用随调用者活跃变量数量增长时执行的命令数
+
+调用开销为调用处与函数入口中的命令数，不含函数体。叶函数只会保存其可能修改的变量，
+递归函数则需要保存调用者的整个上下文。每种函数分别以静态与宏调用约定编译。
+
+usage: python benchmarks/bench_calls.py
+"""
+
+import os, sys
+from _common import ROOT, commands, run_project
+
+LIVE_COUNTS = (1, 10, 50, 100, 200)
+KINDS = ('leaf', 'recursive')
+CONVENTIONS = ('static', 'macro')
+BEGIN = "# bench call begin"
+END = "# bench call end"
+
+def call_cost(function_root: str) -> int:
+    with open(os.path.join(function_root, 'main.mcfunction'), encoding='utf-8') as rd:
+        lines = rd.read().split('\n')
+    site = commands(lines[lines.index(BEGIN) + 1:lines.index(END)])
+    entry = next(line for line in site if line.startswith('function '))
+    entry_path = entry.split(' ')[1].split(':', 1)[1]
+    with open(
+        os.path.join(function_root, f"{entry_path}.mcfunction"), encoding='utf-8'
+    ) as rd:
+        entry_lines = rd.read().split('\n')
+    return len(site) + len(commands(entry_lines))
+
+def compile_project(kind: str, convention: str, live: int) -> int:
+    sys.path.insert(0, ROOT)
+    from emcf.core import MCF, embed_mcf
+    from emcf.types import Integer
+    from emcf.control import If
+    from emcf.functional import MCFunction, Return
+
+    @MCFunction(Integer, convention)
+    def leaf(value: Integer):
+        Return(value + 1)
+
+    @MCFunction(Integer, convention)
+    def recursive(value: Integer):
+        with If(value > 0):
+            Return(recursive(value - 1))
+        Return(value)
+
+    callee = leaf if kind == 'leaf' else recursive
+    MCF.useConfig({
+        "namespace": "bench",
+        "version": 57,
+        "gc": True
+    })
+
+    def project() -> None:
+        variables = [Integer(index) for index in range(live)]
+        embed_mcf([BEGIN])
+        callee(variables[0])
+        embed_mcf([END])
+
+    project()
+    MCF.tidyUp()
+    return call_cost(os.path.join('build', 'bench', 'function'))
+
+def main() -> None:
+    columns = [(kind, convention) for kind in KINDS for convention in CONVENTIONS]
+    print(f"{'live':>6}" + ''.join(
+        f"{kind + '/' + convention:>18}" for kind, convention in columns
+    ))
+    for live in LIVE_COUNTS:
+        row = f"{live:>6}"
+        for kind, convention in columns:
+            with run_project(__file__, kind, convention, live) as (_, out):
+                row += f"{int(out.strip().splitlines()[-1]):>18}"
+        print(row)
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--run':
+        print(compile_project(sys.argv[2], sys.argv[3], int(sys.argv[4])))
+    else:
+        main()
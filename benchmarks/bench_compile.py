@@ -0,0 +1,88 @@
+"""
+统计编译大型生成程序的耗时
+
+生成含有大量MCFunction的程序，每个函数包含整数运算、条件分支、循环与浮点数运算，
+分别统计生成命令（从定义函数到调用`MCF.tidyUp`之前）与`MCF.tidyUp`（序列化并写出所有
+文件）的最短耗时，以及写出的命令数量。
+
+usage: python benchmarks/bench_compile.py
+"""
+
+import os, sys, time
+from _common import ROOT, run_project
+
+FUNCTION_COUNTS = (200, 800)
+RUNS = 7
+
+def compile_project(count: int) -> tuple[float, float, int]:
+    sys.path.insert(0, ROOT)
+    from emcf.core import MCF
+    from emcf.types import Integer, Float
+    from emcf.control import If, Elif, Else, While, Range
+    from emcf.functional import MCFunction, Return
+
+    def make(index: int):
+        @MCFunction(Integer)
+        def step(value: Integer, scale: Float):
+            total = Integer(index)
+            for i in Range(0, value):
+                total.assign(total + i * 3)
+            with If(total > 100):
+                total.assign(total // 2)
+            with Elif(total < 10):
+                total.assign(total + 7)
+            with Else():
+                total.assign(total - 1)
+            counter = Integer(0)
+            with While()(counter < 4):
+                counter.assign(counter + 1)
+            scale.assign(scale * Float(1.5) + Float(index))
+            Return(total + counter)
+        return step
+
+    start = time.perf_counter()
+    functions = [make(index) for index in range(count)]
+    MCF.useConfig({"namespace": "bench", "version": 57, "naming": "stable"})
+    value = Integer(None)
+    value.collect("value")
+    scale = Float(None)
+    scale.collect("scale")
+    for function in functions:
+        value.assign(function(value, scale))
+    built = time.perf_counter()
+    MCF.tidyUp()
+    end = time.perf_counter()
+
+    commands = 0
+    for path, _, names in os.walk(os.path.join('build', 'bench', 'function')):
+        for name in names:
+            with open(os.path.join(path, name), encoding='utf-8') as rd:
+                commands += sum(
+                    1 for line in rd.read().split('\n') if line and line[0] != '#'
+                )
+    return built - start, end - built, commands
+
+def main() -> None:
+    print(f"{'functions':>10}{'build':>12}{'tidyUp':>12}{'commands':>10}")
+    for count in FUNCTION_COUNTS:
+        builds = []
+        tidies = []
+        commands = 0
+        for _ in range(RUNS):
+            with run_project(__file__, count) as (_, out):
+                build, tidy, commands = next(
+                    line.split()[1:] for line in out.splitlines()
+                    if line.startswith('compile ')
+                )
+                builds.append(float(build))
+                tidies.append(float(tidy))
+        print(
+            f"{count:>10}{min(builds) * 1000:>9.1f} ms"
+            f"{min(tidies) * 1000:>9.1f} ms{int(commands):>10}"
+        )
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--run':
+        print('compile', *compile_project(int(sys.argv[2])))
+    else:
+        main()
@@ -0,0 +1,61 @@
+"""
+比较使用与不使用组件缓存时写出组件的耗时
+
+项目使用Block与Float，加载block组件（含数百个谓词文件）与浮点数组件。`cold`在空的
+缓存目录中构建，`warm`复用上一次构建留下的缓存，统计`MCF.exportComponents`的耗时。
+
+usage: python benchmarks/bench_component_cache.py
+"""
+
+import os, sys, time, statistics, tempfile
+from _common import ROOT, run_project
+
+MODES = ('no cache', 'cold', 'warm')
+RUNS = 7
+
+def compile_project(cache: str) -> float:
+    sys.path.insert(0, ROOT)
+    from emcf.core import MCF
+    from emcf.types import Float
+    from emcf.types_extension import Block
+
+    config = {"namespace": "bench", "version": 57, "naming": "stable"}
+    if cache:
+        config["component_cache"] = cache
+    MCF.useConfig(config)
+
+    block = Block("~ ~1 ~")
+    block.query_state()
+    Float(1.5) + Float(2.5)
+    start = time.perf_counter()
+    MCF.exportComponents()
+    elapsed = time.perf_counter() - start
+    MCF.tidyUp()
+    return elapsed
+
+def main() -> None:
+    print(f"{'mode':>10}{'median':>12}{'min':>12}")
+    for mode in MODES:
+        samples = []
+        with tempfile.TemporaryDirectory() as cache_dir:
+            shared = os.path.join(cache_dir, 'cache')
+            if mode == 'warm':
+                with run_project(__file__, shared): pass
+            for _ in range(RUNS):
+                # a relative cache lives in the fresh working directory
+                cache = {'no cache': '', 'cold': 'cache', 'warm': shared}[mode]
+                with run_project(__file__, cache) as (_, out):
+                    samples.append(float(next(
+                        line.split()[1] for line in out.splitlines()
+                        if line.startswith('export ')
+                    )))
+        print(
+            f"{mode:>10}{statistics.median(samples) * 1000:>9.1f} ms"
+            f"{min(samples) * 1000:>9.1f} ms"
+        )
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--run':
+        print('export', compile_project(sys.argv[2]))
+    else:
+        main()
@@ -0,0 +1,92 @@
+"""
+统计条件分支生成的命令数与NBT操作数
+
+`chain`为一条if/elif/else链，`nested`在每个分支中再嵌套一条if/else，`call`在if分支中
+调用含有条件分支的MCFunction。每个项目重复`REPEAT`次，结果为与不含条件分支的基准项目
+相减后的增量；NBT操作数为访问`storage`的命令数量。
+
+usage: python benchmarks/bench_conditions.py
+"""
+
+import os, sys
+from _common import ROOT, run_project
+
+PROJECTS = ('chain', 'nested', 'call')
+REPEAT = 20
+
+def compile_project(project: str) -> tuple[int, int]:
+    sys.path.insert(0, ROOT)
+    from emcf.core import MCF
+    from emcf.types import Integer
+    from emcf.control import If, Elif, Else
+    from emcf.functional import MCFunction, Return
+
+    @MCFunction(Integer)
+    def clamp(value: Integer):
+        with If(value > 100):
+            Return(100)
+        with Elif(value < 0):
+            Return(0)
+        Return(value)
+
+    MCF.useConfig({"namespace": "bench", "version": 57, "naming": "stable"})
+    value = Integer(None)
+    value.collect("value")
+    for index in range(REPEAT):
+        if project == 'base':
+            value.assign(value + index)
+        elif project == 'chain':
+            with If(value > index):
+                value.assign(value + index)
+            with Elif(value < -index):
+                value.assign(value - index)
+            with Else():
+                value.assign(value * 2)
+        elif project == 'nested':
+            with If(value > index):
+                with If(value > 2 * index):
+                    value.assign(value + index)
+                with Else():
+                    value.assign(value - 1)
+            with Else():
+                with If(value < -index):
+                    value.assign(value - index)
+                with Else():
+                    value.assign(value * 2)
+        else:
+            with If(value > index):
+                value.assign(clamp(value + index))
+            with Else():
+                value.assign(value * 2)
+    MCF.tidyUp()
+
+    commands = nbt = 0
+    for path, _, names in os.walk(os.path.join('build', 'bench', 'function')):
+        for name in names:
+            with open(os.path.join(path, name), encoding='utf-8') as rd:
+                for line in rd.read().split('\n'):
+                    if not line or line[0] == '#': continue
+                    commands += 1
+                    if ' storage ' in line: nbt += 1
+    return commands, nbt
+
+def measure(project: str) -> tuple[int, int]:
+    with run_project(__file__, project) as (_, out):
+        commands, nbt = next(
+            line.split()[1:] for line in out.splitlines()
+            if line.startswith('conditions ')
+        )
+        return int(commands), int(nbt)
+
+def main() -> None:
+    base_commands, base_nbt = measure('base')
+    print(f"{'project':>8}{'commands':>10}{'nbt':>8}")
+    for project in PROJECTS:
+        commands, nbt = measure(project)
+        print(f"{project:>8}{commands - base_commands:>10}{nbt - base_nbt:>8}")
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--run':
+        print('conditions', *compile_project(sys.argv[2]))
+    else:
+        main()
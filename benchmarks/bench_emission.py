@@ -0,0 +1,53 @@
+"""
+比较`buffer`与`file`两种写出后端的编译耗时
+
+usage: python benchmarks/bench_emission.py [function_count]
+"""
+
+import sys, time
+from _common import ROOT, run_project
+
+DEFAULT_COUNT = 10000
+
+def compile_project(emitter: str, count: int) -> float:
+    sys.path.insert(0, ROOT)
+    from emcf.core import MCF
+    from emcf.types import Integer
+    from emcf.control import If, While
+
+    def project() -> None:
+        counter = Integer(0)
+        # every If body and every While control/body is a separate function
+        for index in range(count // 3):
+            with If(counter == index):
+                counter += 1
+            with While()(counter < index):
+                counter += 2
+
+    start = time.perf_counter()
+    MCF.useConfig({
+        "namespace": "bench",
+        "version": 57,
+        "gc": True,
+        "emitter": emitter
+    })
+    project()
+    MCF.tidyUp()
+    return time.perf_counter() - start
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_COUNT
+    results = {}
+    for emitter in ('file', 'buffer'):
+        with run_project(__file__, emitter, count) as (_, out):
+            results[emitter] = float(out.strip().splitlines()[-1])
+    for emitter, cost in results.items():
+        print(f"{emitter:>6}: {cost:.3f}s")
+    print(f"speedup: {results['file'] / results['buffer']:.2f}x")
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--run':
+        cost = compile_project(sys.argv[2], int(sys.argv[3]))
+        print(cost)
+    else:
+        main()
@@ -0,0 +1,200 @@
+"""
+比较Fixed与Float每次运算执行的命令数，并估算1M次运算的工作量
+
+每种运算的开销为调用处的命令数加上其调用的函数中的命令数。Float的组件函数中含有
+提前返回的分支，这里按完整执行计数，因此Float的结果是上限。
+
+统计前先检查`CASES`中的乘除法：两个操作数分别为变量与常量，以`_common`中的解释器
+执行，在回绕与饱和两种模式下与精确值向下取整的结果比较；同时检查`COMPARISONS`中
+Fixed变量与编译期已知的Integer的比较。
+
+usage: python benchmarks/bench_fixed.py
+"""
+
+import os, re, sys, operator
+from fractions import Fraction
+from _common import ROOT, Interpreter, commands, run_project
+
+OPERATIONS = ('+', '-', '*', '/', '<')
+MODES = ('Float', 'Fixed', 'Fixed+check')
+WORKLOAD = 1_000_000
+FUNCTION = re.compile(r'function (\S+)')
+SCALE = 1000
+# 乘除法的（左操作数，运算，右操作数），包括中间值会超出32位而结果不会的情况
+CASES = (
+    (50, '*', 50), (100, '*', 100), (0.999, '*', 3000), (1.5, '*', -2.25),
+    (-2147483.648, '*', -0.001), (2000000, '*', 2), (-1500000, '*', 1.5),
+    (3000, '/', 1.5), (-3000, '/', 1.5), (1, '/', 3), (-1, '/', 3),
+    (7, '/', -0.5), (5, '/', 3000), (2000, '/', 2500), (-2000, '/', 2500),
+    (1000000, '/', 0.001), (-2147483.648, '/', -1)
+)
+# Fixed变量与值已知的Integer的（左操作数，比较，右操作数）
+COMPARISONS = (
+    (1.5, '<', 5), (5, '<=', 5), (5.001, '>', 5), (4.999, '>=', 5),
+    (5, '=', 5), (-0.5, '!=', 0)
+)
+COMPARE = {
+    '<': operator.lt, '<=': operator.le, '>': operator.gt, '>=': operator.ge,
+    '=': operator.eq, '!=': operator.ne
+}
+
+class CommandCounter:
+    """按完整执行统计函数中的命令数"""
+
+    def __init__(self, function_root: str):
+        self._root = function_root
+        self._cache: dict[str, int] = {}
+
+    def lines(self, signature: str) -> list[str]:
+        namespace, path = signature.split(':', 1)
+        file = os.path.join(self._root, namespace, 'function', f"{path}.mcfunction")
+        with open(file, encoding='utf-8') as rd:
+            return commands(rd.read().split('\n'))
+
+    def count(self, lines: list[str], visiting: set[str]) -> int:
+        total = 0
+        for line in lines:
+            total += 1
+            match = FUNCTION.search(line)
+            if match is not None:
+                total += self.function(match.group(1), visiting)
+        return total
+
+    def function(self, signature: str, visiting: set[str]) -> int:
+        if signature in visiting: return 0
+        if signature not in self._cache:
+            visiting.add(signature)
+            self._cache[signature] = self.count(self.lines(signature), visiting)
+            visiting.remove(signature)
+        return self._cache[signature]
+
+def compile_project(mode: str) -> list[int]:
+    sys.path.insert(0, ROOT)
+    from emcf.core import MCF, embed_mcf
+    from emcf.types import Float, Fixed
+
+    MCF.useConfig({
+        "namespace": "bench",
+        "version": 57,
+        "gc": False,
+        "overflow_check": mode == 'Fixed+check'
+    })
+    kind = Float if mode == 'Float' else Fixed
+
+    def project() -> None:
+        left = kind(None)
+        left.collect("left")
+        right = kind(None)
+        right.collect("right")
+        for ops in OPERATIONS:
+            embed_mcf([f"# bench {ops} begin"])
+            if ops == '+': left + right
+            elif ops == '-': left - right
+            elif ops == '*': left * right
+            elif ops == '/': left / right
+            else: left < right
+            embed_mcf([f"# bench {ops} end"])
+
+    project()
+    MCF.tidyUp()
+    counter = CommandCounter('build')
+    with open(
+        os.path.join('build', 'bench', 'function', 'main.mcfunction'), encoding='utf-8'
+    ) as rd:
+        main_lines = rd.read().split('\n')
+    costs = []
+    for ops in OPERATIONS:
+        begin = main_lines.index(f"# bench {ops} begin")
+        end = main_lines.index(f"# bench {ops} end")
+        costs.append(counter.count(commands(main_lines[begin + 1:end]), set()))
+    return costs
+
+def raw(value: float) -> int:
+    return round(Fraction(value) * SCALE)
+
+def expected(left: float, ops: str, right: float, checked: bool) -> int:
+    """精确值向下取整后的储存值，超出32位时回绕或饱和"""
+    left, right = raw(left), raw(right)
+    value = left * right // SCALE if ops == '*' else left * SCALE // right
+    if checked: return min(max(value, -2**31), 2**31 - 1)
+    return (value + 2**31) % 2**32 - 2**31
+
+def check_project(checked: bool) -> None:
+    sys.path.insert(0, ROOT)
+    from emcf.core import MCF
+    from emcf.types import Fixed, Integer
+    from emcf.control import If
+
+    MCF.useConfig({
+        "namespace": "bench",
+        "version": 57,
+        "naming": "stable",
+        "overflow_check": checked
+    })
+    for index, (left, ops, right) in enumerate(CASES):
+        left_var, right_var = Fixed(None), Fixed(None)
+        left_var.collect(f"left{index}")
+        right_var.collect(f"right{index}")
+        operate = (lambda a, b: a * b) if ops == '*' else (lambda a, b: a / b)
+        operate(left_var, right_var).move(f"both{index}")
+        operate(left_var, right).move(f"right{index}")
+        operate(left, right_var).move(f"left{index}")
+    for index, (left, ops, right) in enumerate(COMPARISONS):
+        value = Fixed(None)
+        value.collect(f"compared{index}")
+        result = Integer(0)
+        with If(COMPARE[ops](value, Integer(right))):
+            result.assign(1)
+        result.move(f"compare{index}")
+    MCF.tidyUp()
+
+def check(checked: bool) -> None:
+    with run_project(__file__, 'check', checked) as (work_dir, _):
+        machine = Interpreter(os.path.join(work_dir, 'build'), 'bench')
+        for index, (left, _, right) in enumerate(CASES):
+            machine.storage[f"left{index}"] = raw(left)
+            machine.storage[f"right{index}"] = raw(right)
+        for index, (left, _, _) in enumerate(COMPARISONS):
+            machine.storage[f"compared{index}"] = raw(left)
+        machine.call('bench:main')
+        for index, (left, ops, right) in enumerate(CASES):
+            for variant in ('both', 'right', 'left'):
+                result = machine.storage.get(f"{variant}{index}")
+                if result != expected(left, ops, right, checked):
+                    raise AssertionError(
+                        f"{left} {ops} {right} ({variant} variable, overflow_check="
+                        f"{checked}) gives {result}, expected "
+                        f"{expected(left, ops, right, checked)}"
+                    )
+        for index, (left, ops, right) in enumerate(COMPARISONS):
+            result = machine.storage.get(f"compare{index}")
+            if result != int(COMPARE[ops](raw(left), right * SCALE)):
+                raise AssertionError(
+                    f"Fixed({left}) {ops} Integer({right}) gives {result}"
+                )
+
+def main() -> None:
+    for checked in (False, True):
+        check(checked)
+    results: dict[str, list[int]] = {}
+    for mode in MODES:
+        with run_project(__file__, mode) as (_, out):
+            results[mode] = [
+                int(value) for value in out.strip().splitlines()[-1].split()
+            ]
+    print(f"{'op':>4}" + ''.join(f"{mode:>14}" for mode in MODES))
+    for index, ops in enumerate(OPERATIONS):
+        print(f"{ops:>4}" + ''.join(
+            f"{results[mode][index]:>14}" for mode in MODES
+        ))
+    print(f"\ncommands for {WORKLOAD:,} operations (uniform mix):")
+    for mode in MODES:
+        average = sum(results[mode]) / len(OPERATIONS)
+        print(f"{mode:>14}{int(average * WORKLOAD):>16,}")
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--run':
+        if sys.argv[2] == 'check': check_project(sys.argv[3] == 'True')
+        else: print(*compile_project(sys.argv[2]))
+    else:
+        main()
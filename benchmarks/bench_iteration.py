@@ -0,0 +1,94 @@
+"""
+统计ArrayList两种遍历方式下每个元素执行的命令数
+
+编译一个循环体为空的遍历，从生成的控制函数中统计：进入循环的命令、每个元素经过的
+控制函数与宏函数命令，以及列表耗尽时最后一次进入控制函数执行的命令。
+
+usage: python benchmarks/bench_iteration.py
+"""
+
+import os, sys
+from _common import ROOT, commands, run_project
+
+SIZES = (10, 1000, 100000)
+STRATEGIES = ('index', 'consume')
+BEGIN = "# bench iterate begin"
+END = "# bench iterate end"
+
+def read_function(function_root: str, signature: str) -> list[str]:
+    path = signature.split(':', 1)[1]
+    with open(
+        os.path.join(function_root, f"{path}.mcfunction"), encoding='utf-8'
+    ) as rd:
+        return commands(rd.read().split('\n'))
+
+def called(line: str) -> str:
+    return line[line.index('function ') + len('function '):].split(' ')[0]
+
+def is_end_check(line: str) -> bool:
+    """列表耗尽时返回的判断"""
+    return line.startswith('execute unless data storage') or (
+        line.endswith('matches 0 run return 0')
+    )
+
+def loop_cost(function_root: str) -> tuple[int, int, int]:
+    """返回进入循环、每个元素、离开循环所执行的命令数"""
+    with open(os.path.join(function_root, 'main.mcfunction'), encoding='utf-8') as rd:
+        lines = rd.read().split('\n')
+    site = commands(lines[lines.index(BEGIN) + 1:lines.index(END)])
+    control_sig = next(called(line) for line in site if line.startswith('function '))
+    control = read_function(function_root, control_sig)
+    per_element = 0
+    exhausted = None
+    for line in control:
+        per_element += 1
+        if line.endswith('with storage bench:emcf call'):
+            per_element += len(read_function(function_root, called(line)))
+        if exhausted is None and is_end_check(line):
+            exhausted = per_element
+    return len(site), per_element, exhausted
+
+def compile_project(strategy: str) -> tuple[int, int, int]:
+    sys.path.insert(0, ROOT)
+    from emcf.core import MCF, embed_mcf
+    from emcf.types import ArrayList, Integer
+
+    MCF.useConfig({
+        "namespace": "bench",
+        "version": 57,
+        "gc": True
+    })
+
+    def project() -> None:
+        values = ArrayList[Integer]([0])
+        values.collect("values")
+        embed_mcf([BEGIN])
+        for _ in values.iterate(Integer, strategy):
+            pass
+        embed_mcf([END])
+
+    project()
+    MCF.tidyUp()
+    return loop_cost(os.path.join('build', 'bench', 'function'))
+
+def main() -> None:
+    costs = {}
+    for strategy in STRATEGIES:
+        with run_project(__file__, strategy) as (_, out):
+            costs[strategy] = tuple(
+                int(value) for value in out.strip().splitlines()[-1].split()
+            )
+    print(f"{'size':>8}" + ''.join(f"{strategy:>12}" for strategy in STRATEGIES))
+    for size in SIZES:
+        row = f"{size:>8}"
+        for strategy in STRATEGIES:
+            enter, per_element, exhausted = costs[strategy]
+            total = enter + size * per_element + exhausted
+            row += f"{total / size:>12.2f}"
+        print(row)
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--run':
+        print(*compile_project(sys.argv[2]))
+    else:
+        main()
@@ -0,0 +1,67 @@
+"""
+比较不同`jobs`设置下写出组件的耗时
+
+项目使用Block、Entity、Float、Text、ArrayList与HashMap，加载所有常用组件，统计
+`MCF.exportComponents`的耗时，并检查各设置下的输出完全一致。
+
+usage: python benchmarks/bench_jobs.py
+"""
+
+import os, sys, time, hashlib, statistics
+from _common import ROOT, run_project
+
+JOBS = (1, 2, 4, 8)
+RUNS = 7
+
+def digest(folder: str) -> str:
+    sha = hashlib.sha1()
+    for path, _, files in sorted(os.walk(folder)):
+        for file in sorted(files):
+            sha.update(file.encode('utf-8'))
+            with open(os.path.join(path, file), 'rb') as rd:
+                sha.update(rd.read())
+    return sha.hexdigest()
+
+def compile_project(jobs: int) -> tuple[float, str]:
+    sys.path.insert(0, ROOT)
+    from emcf.core import MCF
+    from emcf.types import Float, Text, ArrayList, HashMap
+    from emcf.types_extension import Block, Entity
+
+    MCF.useConfig({"namespace": "bench", "version": 57, "naming": "stable", "jobs": jobs})
+    Block("~ ~1 ~").query_state()
+    Entity("@s")
+    Float(1.5) + Float(2.5)
+    Text("bench")
+    ArrayList([])
+    HashMap({})
+    start = time.perf_counter()
+    MCF.exportComponents()
+    elapsed = time.perf_counter() - start
+    MCF.tidyUp()
+    return elapsed, digest('build')
+
+def main() -> None:
+    print(f"cpus: {os.cpu_count()}")
+    print(f"{'jobs':>6}{'median':>12}{'min':>12}  output")
+    for jobs in JOBS:
+        samples = []
+        outputs = set()
+        for _ in range(RUNS):
+            with run_project(__file__, jobs) as (_, out):
+                elapsed, output = next(
+                    line.split()[1:] for line in out.splitlines()
+                    if line.startswith('export ')
+                )
+                samples.append(float(elapsed))
+                outputs.add(output)
+        print(
+            f"{jobs:>6}{statistics.median(samples) * 1000:>9.1f} ms"
+            f"{min(samples) * 1000:>9.1f} ms  {', '.join(o[:8] for o in outputs)}"
+        )
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--run':
+        print('export', *compile_project(int(sys.argv[2])))
+    else:
+        main()
@@ -0,0 +1,79 @@
+"""
+比较`Range`的起点、终点与步长在运行时或编译期已知时生成与执行的命令数及调用深度
+
+对`COUNTS`中的每个次数与`BODIES`中的每种循环体，分别以三种方式编译同一个循环：
+`runtime`的起点、终点与步长均为变量，`stop`只有终点为变量，`const`均为Python整数
+（按默认的`unroll`与`unroll_factor`展开）。`sum`累加下标，`skip`以`Continue`跳过
+3的倍数。构建后以`_common`中的解释器执行`main`，报告生成的命令数、执行的命令数
+（均减去不含循环的基准项目）与函数调用的最大嵌套层数，并检查结果是否正确。
+
+usage: python benchmarks/bench_range.py
+"""
+
+import os, sys
+from _common import ROOT, Interpreter, run_project
+
+COUNTS = (6, 64, 500)
+BODIES = ('sum', 'skip')
+MODES = ('runtime', 'stop', 'const')
+
+def compile_project(mode: str, body: str, count: int) -> None:
+    sys.path.insert(0, ROOT)
+    from emcf.core import MCF
+    from emcf.types import Integer
+    from emcf.control import If, Range, Continue
+
+    MCF.useConfig({"namespace": "bench", "version": 57, "naming": "stable"})
+    start, stop, step = Integer(None), Integer(None), Integer(None)
+    start.collect("start")
+    stop.collect("stop")
+    step.collect("step")
+    total = Integer(0)
+    if mode != 'base':
+        if mode == 'runtime': loop = Range(start, stop, step)
+        elif mode == 'stop': loop = Range(0, stop)
+        else: loop = Range(count)
+        for index in loop:
+            if body == 'skip':
+                with If(index % 3 == 0):
+                    Continue()
+            total.assign(total + index)
+    total.move("result")
+    MCF.tidyUp()
+
+def measure(mode: str, body: str, count: int) -> tuple[int, int, int]:
+    """返回（生成的命令数，执行的命令数，调用深度）"""
+    with run_project(__file__, mode, body, count) as (work_dir, _):
+        machine = Interpreter(os.path.join(work_dir, 'build'), 'bench')
+        generated = sum(len(lines) for lines in machine.functions.values())
+        machine.storage.update({'start': 0, 'stop': count, 'step': 1})
+        machine.call('bench:main')
+        expected = sum(
+            index for index in range(count) if body == 'sum' or index % 3
+        )
+        if mode != 'base' and machine.storage.get('result') != expected:
+            raise AssertionError(
+                f"{mode} {body} with {count} iterations gives "
+                f"{machine.storage.get('result')}, expected {expected}"
+            )
+        return generated, machine.executed, machine.max_depth
+
+def main() -> None:
+    # every call nests a few frames of the interpreter
+    sys.setrecursionlimit(100000)
+    print(f"{'count':>6}{'body':>6}{'mode':>9}{'generated':>11}{'executed':>10}{'depth':>7}")
+    for count in COUNTS:
+        base_generated, base_executed, base_depth = measure('base', 'sum', count)
+        for body in BODIES:
+            for mode in MODES:
+                generated, executed, depth = measure(mode, body, count)
+                print(
+                    f"{count:>6}{body:>6}{mode:>9}{generated - base_generated:>11}"
+                    f"{executed - base_executed:>10}{depth:>7}"
+                )
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--run':
+        compile_project(sys.argv[2], sys.argv[3], int(sys.argv[4]))
+    else:
+        main()
@@ -0,0 +1,47 @@
+"""
+统计从`import emcf`到写出第一条命令的启动时间
+
+`cold`在每次运行前删除组件索引，相当于遍历整个组件库；`warm`使用已生成的索引。
+第一条命令为一次`Float`加法，其间会经过`builtinSign`的组件查找。
+
+usage: python benchmarks/bench_startup.py
+"""
+
+import os, sys, time, statistics
+from _common import ROOT, run_project
+
+INDEX = os.path.join(ROOT, 'emcf', 'libs', '57', '.index.json')
+MODES = ('cold', 'warm')
+RUNS = 9
+
+def startup() -> float:
+    start = time.perf_counter()
+    sys.path.insert(0, ROOT)
+    from emcf.core import MCF
+    from emcf.types import Float
+    MCF.useConfig({"namespace": "bench", "version": 57})
+    Float(1.5) + Float(2.5)
+    return time.perf_counter() - start
+
+def main() -> None:
+    print(f"{'mode':>6}{'median':>12}{'min':>12}")
+    for mode in MODES:
+        samples = []
+        for _ in range(RUNS):
+            if mode == 'cold' and os.path.exists(INDEX):
+                os.remove(INDEX)
+            with run_project(__file__) as (_, out):
+                samples.append(float(next(
+                    line.split()[1] for line in out.splitlines()
+                    if line.startswith('startup ')
+                )))
+        print(
+            f"{mode:>6}{statistics.median(samples) * 1000:>9.1f} ms"
+            f"{min(samples) * 1000:>9.1f} ms"
+        )
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--run':
+        print('startup', startup())
+    else:
+        main()
@@ -0,0 +1,118 @@
+"""
+比较逐个`str.replace`与单次扫描替换渲染block组件的耗时
+
+按`writeComponents`的方式构造block组件的替换规则，分别渲染其函数文件与静态文件
+（其中包括`bp/sub`下的489个谓词文件），并检查两种方式的结果一致。
+
+usage: python benchmarks/bench_substitution.py
+"""
+
+import os, sys, time, statistics
+from _common import ROOT, run_project
+
+RUNS = 9
+
+def replace_lines(replacements: dict[str, str]):
+    """原先渲染函数文件的方式：每行依次应用按长度降序排列的全部规则"""
+    ordered = sorted(replacements.items(), key=lambda c: len(c[0]), reverse=True)
+    def substitute(text: str) -> str:
+        to_write = []
+        for line in text.splitlines():
+            for key, replacer in ordered:
+                line = line.replace(key, replacer)
+            to_write.append(line + '\n')
+        return ''.join(to_write)
+    return substitute
+
+def replace_text(replacements: dict[str, str]):
+    """原先复制静态文件的方式：整个文件依次应用全部规则"""
+    def substitute(text: str) -> str:
+        for key, replacer in replacements.items():
+            text = text.replace(key, replacer)
+        return text
+    return substitute
+
+def render(contents: list[str], compile_rules, replacements: dict[str, str]) -> list[str]:
+    substitute = compile_rules(replacements)
+    return [substitute(content) for content in contents]
+
+def measure(contents: list[str], compile_rules, replacements: dict[str, str]) -> float:
+    samples = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        render(contents, compile_rules, replacements)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+def compare() -> list[tuple[int, int, float, float, str]]:
+    """返回每组的（文件数，规则数，逐个替换的耗时，单次扫描的耗时，组名）"""
+    sys.path.insert(0, ROOT)
+    from emcf.core import MCF
+    from emcf._utils import makeSubstitution
+    from emcf._components import builtin_components as built_cps
+
+    MCF.useConfig({"namespace": "bench", "version": 57, "naming": "stable"})
+    database = MCF.database
+    info = database._components['block']
+    macros = {f"__{key}__": value for key, value in built_cps.block.items()}
+    signatures = {
+        sig: f"bench:emcf/{MCF._stableName(sub_cp_id)}"
+        for sub_cp_id, (sig, _) in info['functions'].items()
+    }
+
+    def read(path: str) -> str:
+        with open(path, 'r', encoding='utf-8') as rd:
+            return rd.read()
+
+    groups = {
+        'functions': (
+            [read(os.path.join(database._path, *rel.split('/')))
+             for _, rel in info['functions'].values()],
+            macros | signatures,
+            replace_lines
+        )
+    }
+    for request in info['static']:
+        src_path = os.path.join(database._path, 'block', request["src"])
+        groups[f"static {request['src']}"] = (
+            [read(os.path.join(src_path, *rel.split('/'))) for rel in request["files"]],
+            macros,
+            replace_text
+        )
+
+    rows = []
+    for name, (contents, replacements, baseline) in groups.items():
+        if baseline is replace_lines:
+            # comments and empty lines are dropped before rendering
+            contents = [''.join(
+                line + '\n' for line in content.splitlines() if line and line[0] != '#'
+            ) for content in contents]
+        assert (
+            render(contents, baseline, replacements)
+            == render(contents, makeSubstitution, replacements)
+        )
+        rows.append((
+            len(contents), len(replacements),
+            measure(contents, baseline, replacements),
+            measure(contents, makeSubstitution, replacements), name
+        ))
+    return rows
+
+def main() -> None:
+    # useConfig writes a build tree, so the comparison runs in a temporary directory
+    with run_project(__file__) as (_, out):
+        print(f"{'group':>12}{'files':>8}{'rules':>8}{'replace':>14}{'single-pass':>14}")
+        for line in out.splitlines():
+            if not line.startswith('render '): continue
+            files, rules, replace, single, name = line.split(maxsplit=5)[1:]
+            print(
+                f"{name:>12}{int(files):>8}{int(rules):>8}"
+                f"{float(replace) * 1000:>11.2f} ms{float(single) * 1000:>11.2f} ms"
+            )
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--run':
+        for row in compare():
+            print('render', *row)
+    else:
+        main()
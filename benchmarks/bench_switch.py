@@ -0,0 +1,77 @@
+"""
+比较`If`/`Elif`链与`Switch`按整数选择分支时执行的命令数
+
+对`ARMS`中的每个分支数，分别以`If`/`Elif`/`Else`链、`Switch`的查找树与`Switch`的
+跳转表编译同一个选择：值为k时将k写入结果，没有匹配的分支时写入-1。构建后以一个只
+支持生成的命令中用到的子集的解释器执行`main`，统计每个值执行的命令数（减去不含选择
+的基准项目），并检查结果是否正确。
+
+usage: python benchmarks/bench_switch.py
+"""
+
+import os, sys
+from _common import ROOT, Interpreter, run_project
+
+ARMS = (8, 32, 128)
+MODES = ('ladder', 'tree', 'table')
+
+def compile_project(mode: str, arms: int) -> None:
+    sys.path.insert(0, ROOT)
+    from emcf.core import MCF
+    from emcf.types import Integer
+    from emcf.control import If, Elif, Else, Switch, Case, Default
+
+    MCF.useConfig({"namespace": "bench", "version": 57, "naming": "stable"})
+    value = Integer(None)
+    value.collect("value")
+    result = Integer(0)
+    if mode == 'ladder':
+        with If(value == 0):
+            result.assign(0)
+        for arm in range(1, arms):
+            with Elif(value == arm):
+                result.assign(arm)
+        with Else():
+            result.assign(-1)
+    elif mode != 'base':
+        with Switch(value, jump_table=mode == 'table'):
+            for arm in range(arms):
+                with Case(arm):
+                    result.assign(arm)
+            with Default():
+                result.assign(-1)
+    result.move("result")
+    MCF.tidyUp()
+
+def measure(mode: str, arms: int) -> list[int]:
+    """返回每个值执行的命令数"""
+    with run_project(__file__, mode, arms) as (work_dir, _):
+        counts = []
+        for value in range(-1, arms + 1):
+            machine = Interpreter(os.path.join(work_dir, 'build'), 'bench')
+            machine.storage['value'] = value
+            machine.call('bench:main')
+            expected = value if 0 <= value < arms else -1
+            if mode != 'base' and machine.storage.get('result') != expected:
+                raise AssertionError(
+                    f"{mode} with {arms} arms gives {machine.storage.get('result')} "
+                    f"for {value}, expected {expected}"
+                )
+            counts.append(machine.executed)
+        return counts
+
+def main() -> None:
+    print(f"{'arms':>6}{'mode':>8}{'average':>10}{'max':>8}")
+    for arms in ARMS:
+        base = measure('base', arms)
+        for mode in MODES:
+            counts = [count - start for count, start in zip(measure(mode, arms), base)]
+            print(
+                f"{arms:>6}{mode:>8}{sum(counts) / len(counts):>10.1f}{max(counts):>8}"
+            )
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--run':
+        compile_project(sys.argv[2], int(sys.argv[3]))
+    else:
+        main()
@@ -0,0 +1,63 @@
+"""
+比较开启与关闭`tree_shake`时数据包的文件数、大小与写出组件的耗时
+
+每个项目只使用组件中的少数函数：`float`只进行一次浮点数加法，`block`查询方块状态，
+`mixed`同时使用浮点数、文本、列表与字典。
+
+usage: python benchmarks/bench_tree_shake.py
+"""
+
+import os, sys, time
+from _common import ROOT, run_project
+
+PROJECTS = ('float', 'block', 'mixed')
+MODES = (False, True)
+
+def compile_project(project: str, shake: bool) -> tuple[float, int, int]:
+    sys.path.insert(0, ROOT)
+    from emcf.core import MCF
+    from emcf.types import Float, Text, ArrayList, HashMap
+    from emcf.types_extension import Block
+
+    MCF.useConfig({
+        "namespace": "bench", "version": 57, "naming": "stable", "tree_shake": shake
+    })
+    if project == 'float':
+        Float(1.5) + Float(2.5)
+    elif project == 'block':
+        Block("~ ~1 ~").query_state()
+    else:
+        Float(1.5) * Float(2.5)
+        Text("bench")
+        ArrayList([]).append(Float(1.0))
+        HashMap({})
+    start = time.perf_counter()
+    MCF.exportComponents()
+    elapsed = time.perf_counter() - start
+    MCF.tidyUp()
+    files = size = 0
+    for path, _, names in os.walk('build'):
+        for name in names:
+            files += 1
+            size += os.path.getsize(os.path.join(path, name))
+    return elapsed, files, size
+
+def main() -> None:
+    print(f"{'project':>8}{'tree_shake':>12}{'files':>8}{'bytes':>12}{'export':>12}")
+    for project in PROJECTS:
+        for shake in MODES:
+            with run_project(__file__, project, shake) as (_, out):
+                elapsed, files, size = next(
+                    line.split()[1:] for line in out.splitlines()
+                    if line.startswith('export ')
+                )
+                print(
+                    f"{project:>8}{str(shake):>12}{int(files):>8}{int(size):>12,}"
+                    f"{float(elapsed) * 1000:>9.1f} ms"
+                )
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--run':
+        print('export', *compile_project(sys.argv[2], sys.argv[3] == 'True'))
+    else:
+        main()
@@ -0,0 +1,315 @@
+"""
+mcfunction命令的类型化中间表示
+
+`_writers`中的写出器构造命令节点并交给`MCF.command`，函数体以节点的列表缓冲，
+在写出时才序列化为文本。节点保留命令的操作数，便于在序列化之前分析命令。
+"""
+
+import re
+
+__all__ = [
+    'Command',
+    'RawCommand',
+    'ScorePlayers',
+    'ScoreOperation',
+    'DataQuery',
+    'DataModify',
+    'FunctionCall',
+    'ExecuteCommand',
+    'ReturnCommand',
+    'DeferredCommand',
+    'toCommand',
+]
+
+_NAME = re.compile(r'\w+')
+
+def _names(*parts: str) -> list[str]:
+    """与`_NAME.findall`的结果相同，操作数通常是单个名称，此时不需要正则匹配"""
+    names = []
+    for part in parts:
+        if part.isidentifier(): names.append(part)
+        else: names.extend(_NAME.findall(part))
+    return names
+
+class Command:
+    """命令节点的基类，`macro`表示命令是否为宏命令（序列化时带有`$`前缀）"""
+    __slots__ = ('macro',)
+    macro: bool
+
+    # commands that may run other functions or leave the current one
+    barrier = False
+
+    def render(self) -> str:
+        """序列化为不含`$`前缀与换行的命令文本"""
+        raise NotImplementedError
+
+    def names(self) -> list[str]:
+        """命令中出现的所有名称，用于判断一段函数可能访问的变量"""
+        return _NAME.findall(self.render())
+
+    def line(self) -> str:
+        """序列化为函数文件中的一行"""
+        return ('$' if self.macro else '') + self.render() + '\n'
+
+    def __str__(self) -> str:
+        return self.render()
+
+class RawCommand(Command):
+    """未经分析的命令文本"""
+    __slots__ = ('text',)
+    text: str
+
+    def __init__(self, text: str, macro: bool = False):
+        self.text = text
+        self.macro = macro
+
+    @property
+    def barrier(self) -> bool:
+        tokens = self.text.split()
+        return 'function' in tokens or 'return' in tokens
+
+    def render(self) -> str:
+        return self.text
+
+class ScorePlayers(Command):
+    """`scoreboard players <action> <holder> <objective> [value]`"""
+    __slots__ = ('action', 'holder', 'objective', 'value')
+    action: str
+    holder: str
+    objective: str
+    value: str | None
+
+    def __init__(
+        self,
+        action: str,
+        holder: str,
+        objective: str,
+        value: int | str | None = None,
+        macro: bool = False
+    ):
+        self.action = action
+        self.holder = holder
+        self.objective = objective
+        self.value = None if value is None else str(value)
+        self.macro = macro
+
+    def render(self) -> str:
+        if self.value is None:
+            return f"scoreboard players {self.action} {self.holder} {self.objective}"
+        return f"scoreboard players {self.action} {self.holder} {self.objective} {self.value}"
+
+    def names(self) -> list[str]:
+        if self.value is None:
+            return _names(self.holder, self.objective)
+        return _names(self.holder, self.objective, self.value)
+
+class ScoreOperation(Command):
+    """`scoreboard players operation <holder> <objective> <operation> <source> <source_objective>`"""
+    __slots__ = ('holder', 'objective', 'operation', 'source', 'source_objective')
+    holder: str
+    objective: str
+    operation: str
+    source: str
+    source_objective: str
+
+    def __init__(
+        self,
+        holder: str,
+        objective: str,
+        operation: str,
+        source: str,
+        source_objective: str,
+        macro: bool = False
+    ):
+        self.holder = holder
+        self.objective = objective
+        self.operation = operation
+        self.source = source
+        self.source_objective = source_objective
+        self.macro = macro
+
+    def render(self) -> str:
+        return (
+            f"scoreboard players operation {self.holder} {self.objective} "
+            f"{self.operation} {self.source} {self.source_objective}"
+        )
+
+    def names(self) -> list[str]:
+        return _names(self.holder, self.objective, self.source, self.source_objective)
+
+class DataQuery(Command):
+    """`data (get|merge|remove) <target> [operands...]`"""
+    __slots__ = ('action', 'target', 'operands')
+    action: str
+    target: str
+    operands: tuple[str, ...]
+
+    def __init__(self, action: str, target: str, *operands: str, macro: bool = False):
+        self.action = action
+        self.target = target
+        self.operands = operands
+        self.macro = macro
+
+    def render(self) -> str:
+        return ' '.join(('data', self.action, self.target) + self.operands)
+
+    def names(self) -> list[str]:
+        return _names(self.target, *self.operands)
+
+class DataModify(Command):
+    """`data modify <target> <path> <mode> <source_type> [source...]`
+
+    `mode`为`set`、`append`、`insert <index>`等，`source_type`为`value`、`from`或`string`。
+    """
+    __slots__ = ('target', 'path', 'mode', 'source_type', 'source')
+    target: str
+    path: str
+    mode: str
+    source_type: str
+    source: tuple[str, ...]
+
+    def __init__(
+        self,
+        target: str,
+        path: str,
+        mode: str,
+        source_type: str,
+        *source: str,
+        macro: bool = False
+    ):
+        self.target = target
+        self.path = path
+        self.mode = mode
+        self.source_type = source_type
+        self.source = source
+        self.macro = macro
+
+    def render(self) -> str:
+        return ' '.join((
+            'data modify', self.target, self.path, self.mode, self.source_type
+        ) + self.source)
+
+    def names(self) -> list[str]:
+        return _names(self.target, self.path, *self.source)
+
+class FunctionCall(Command):
+    """`function <signature> [arguments...]`"""
+    __slots__ = ('signature', 'arguments')
+    signature: str
+    arguments: tuple[str, ...]
+
+    barrier = True
+
+    def __init__(self, signature: str, *arguments: str, macro: bool = False):
+        self.signature = signature
+        self.arguments = arguments
+        self.macro = macro
+
+    def render(self) -> str:
+        if not self.arguments:
+            return f"function {self.signature}"
+        return ' '.join(('function', self.signature) + self.arguments)
+
+class ExecuteCommand(Command):
+    """`execute <sub_commands...> run <command>`
+
+    `run`为`None`时命令以最后一个条件子命令结束，其结果即为条件是否成立。
+    """
+    __slots__ = ('sub_commands', 'run')
+    sub_commands: list[str]
+    run: Command | None
+
+    def __init__(
+        self,
+        sub_commands: list[str],
+        run: Command | None,
+        macro: bool = False
+    ):
+        self.sub_commands = sub_commands
+        self.run = run
+        self.macro = macro
+
+    @property
+    def barrier(self) -> bool:
+        return self.run is not None and self.run.barrier
+
+    def render(self) -> str:
+        if self.run is None:
+            return f"execute {' '.join(self.sub_commands)}"
+        return f"execute {' '.join(self.sub_commands)} run {self.run.render()}"
+
+    def names(self) -> list[str]:
+        if self.run is None:
+            return _names(*self.sub_commands)
+        return _names(*self.sub_commands) + self.run.names()
+
+class ReturnCommand(Command):
+    """`return <value>`或`return run <command>`"""
+    __slots__ = ('value', 'run')
+    value: str | None
+    run: Command | None
+
+    barrier = True
+
+    def __init__(
+        self,
+        value: int | str | None = None,
+        run: Command | None = None,
+        macro: bool = False
+    ):
+        self.value = None if value is None else str(value)
+        self.run = run
+        self.macro = macro
+
+    def render(self) -> str:
+        if self.run is not None:
+            return f"return run {self.run.render()}"
+        return f"return {self.value}"
+
+    def names(self) -> list[str]:
+        if self.run is not None:
+            return self.run.names()
+        return _names(self.value)
+
+class DeferredCommand(Command):
+    """一组延迟生效的命令，`active`为假时不产生任何输出。
+
+    节点先按顺序写入函数，之后再决定是否生效，见`MCF.defer`。节点同时是`MCF.redirect`
+    的目标，用于收集其中的命令。
+    """
+    __slots__ = ('commands', 'active')
+    commands: list[Command]
+    active: bool
+
+    def __init__(self):
+        self.commands = []
+        self.active = False
+        self.macro = False
+
+    def write(self, command: 'str | Command') -> int:
+        self.commands.append(toCommand(command))
+        return 1
+
+    @property
+    def barrier(self) -> bool:
+        return any(command.barrier for command in self.commands)
+
+    def render(self) -> str:
+        return '\n'.join(command.render() for command in self.commands)
+
+    def names(self) -> list[str]:
+        names = []
+        for command in self.commands:
+            names.extend(command.names())
+        return names
+
+    def line(self) -> str:
+        if not self.active: return ''
+        return ''.join(command.line() for command in self.commands)
+
+def toCommand(written: 'str | Command') -> Command:
+    """将经由`MCF.write`写出的文本转换为命令节点"""
+    if isinstance(written, Command):
+        return written
+    macro = written.startswith('$')
+    return RawCommand(written.removeprefix('$').rstrip('\n'), macro)
@@ -1,14 +1,105 @@
 
-from ._utils import getMultiPaths, console
+from ._utils import getMultiPaths, makeSubstitution, console
 from ._exceptions import MCFComponentError
 from typing import Callable
-import json, os, sys
+import hashlib, json, os, re, sys, shutil, threading
 
 __all__ = [
     'MCFDataBase',
 ]
 
 SLASH = os.path.sep
+INDEX_FILE = '.index.json'
+INDEX_FORMAT = 1
+CACHE_FORMAT = 2
+CACHE_ENTRY = 'entry.json'
+# resource locations, including ones whose namespace is a macro such as `__nsp__:bp/p0`
+LOCATION = re.compile(r'[\w.\-]+:[\w.\-/]+')
+
+def _stamp(path: str) -> int | None:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+def buildIndex(lib_path: str) -> dict:
+    """遍历组件库，生成组件的索引。
+
+    索引中记录所有组件的配置、函数与静态文件，以及库中所有文件夹、`component.json`
+    与`db.json`的修改时间。文件夹的修改时间在其中的文件增删时改变，因此只需检查这些
+    修改时间即可判断索引是否过期。
+    """
+    stamps: dict[str, int] = {}
+    components: dict[str, dict] = {}
+    files, folders = getMultiPaths(lib_path)
+    for folder in folders:
+        stamps[os.path.relpath(folder, lib_path)] = _stamp(folder)
+    stamps['db.json'] = _stamp(os.path.join(lib_path, 'db.json'))
+    for file in files:
+        if not file.endswith(f'{SLASH}component.json'): continue
+        stamps[os.path.relpath(file, lib_path)] = _stamp(file)
+        cp_path = os.path.dirname(file)
+        component = os.path.relpath(cp_path, lib_path).replace(SLASH, '.')
+        with open(file, 'r', encoding='utf-8') as rd:
+            config = json.loads(rd.read())
+        if not isinstance(config, dict):
+            components[component] = {'valid': False}
+            continue
+        namespace = config.get('namespace', 'local')
+        functions: dict[str, list[str]] = {}
+        for sub_file in files:
+            if not sub_file.endswith('.mcfunction'): continue
+            if not sub_file.startswith(cp_path + SLASH): continue
+            rel = os.path.relpath(sub_file, cp_path).removesuffix('.mcfunction')
+            functions[component + '.' + '.'.join(rel.split(SLASH))] = [
+                f"{namespace}:{'/'.join(rel.split(SLASH))}",
+                os.path.relpath(sub_file, lib_path).replace(SLASH, '/')
+            ]
+        statics = []
+        for request in config.get('static', []):
+            src_path = os.path.join(cp_path, request["src"])
+            static_files, _ = getMultiPaths(src_path)
+            statics.append(dict(request, files=[
+                os.path.relpath(static, src_path).replace(SLASH, '/')
+                for static in static_files if static.endswith('.json')
+            ]))
+        components[component] = {
+            'valid': True,
+            'namespace': namespace,
+            'requires': config.get('requires', []),
+            'onInitialize': config.get('onInitialize', None),
+            'static': statics,
+            'functions': functions
+        }
+    return {'format': INDEX_FORMAT, 'stamps': stamps, 'components': components}
+
+def loadIndex(lib_path: str) -> dict:
+    """读取组件库的索引，索引不存在或过期时重新生成并尽可能写回"""
+    index_path = os.path.join(lib_path, INDEX_FILE)
+    try:
+        with open(index_path, 'r', encoding='utf-8') as rd:
+            index = json.loads(rd.read())
+        if index.get('format', None) == INDEX_FORMAT and all(
+            _stamp(os.path.join(lib_path, rel)) == stamp
+            for rel, stamp in index['stamps'].items()
+        ):
+            return index
+    except (OSError, ValueError):
+        pass
+    index = buildIndex(lib_path)
+    try:
+        with open(index_path, 'w', encoding='utf-8') as wt:
+            wt.write(json.dumps(index))
+        # creating the index file changes the modification time of the library
+        root = _stamp(lib_path)
+        if index['stamps']['.'] != root:
+            index['stamps']['.'] = root
+            with open(index_path, 'w', encoding='utf-8') as wt:
+                wt.write(json.dumps(index))
+    except OSError:
+        # a read-only installation rebuilds the index in memory every time
+        pass
+    return index
 
 class MCFDataBase:
     _mcf_path: str
@@ -16,26 +107,37 @@ class MCFDataBase:
     _loaded_cps: set[str]
     _available_cps: set[str]
     _cps_macros: dict[str, dict[str, str]]
+    _components: dict[str, dict]
+    _owners: dict[str, str]
+    _cache_path: str | None
 
     selectors: list[str]
+    cache_hits: int
     
     def __init__(self, version: int):
         self._loaded_cps = set()
+        self._cache_path = None
+        self.cache_hits = 0
         cur_dir = os.path.dirname(__file__)
         path = os.path.join(cur_dir, f"./libs/{version}/db.json")
         path = os.path.normpath(path)
         self._path = os.path.join(cur_dir, f"./libs/{version}")
         self._path = os.path.normpath(self._path)
-        
-        files, _ = getMultiPaths(self._path)
-        files = [
-            os.path.relpath(file, self._path)
-            .removesuffix(f'{SLASH}component.json')
-            .replace(SLASH, '.')
-            for file in files if file.endswith('component.json')
-        ]
-        self._available_cps = set(files)
+
+        self._components = loadIndex(self._path)['components']
+        self._available_cps = set(self._components)
         self._cps_macros = dict()
+        # 函数标识到其所属组件，所属组件为标识中最短的组件前缀
+        self._owners = {}
+        for info in self._components.values():
+            for sign in info.get('functions', {}):
+                paras = sign.split('.')
+                parent = paras[0]
+                for para in paras[1:]:
+                    if parent in self._available_cps:
+                        break
+                    parent += f".{para}"
+                self._owners[sign] = parent
 
         # load version database
         # TODO
@@ -43,131 +145,368 @@ class MCFDataBase:
             self.selectors = json.loads(file.readline())
     
     def validateSign(self, sign: str) -> bool:
-        paras = sign.split('.')
-        sign_path = os.path.join(self._path, *paras) + '.mcfunction'
-        if not os.path.exists(sign_path):
-            return False
-        parent = paras[0]
-        for para in paras[1:]:
-            if parent in self._available_cps:
-                break
-            parent += f".{para}"
-        if parent not in self._loaded_cps:
-            return False
-        return True
+        owner = self._owners.get(sign, None)
+        return owner is not None and owner in self._loaded_cps
 
     def writeComponents(
         self,
         callback: Callable[[dict[str, list[str]]], None],
-        cp_init_path: str
+        cp_init_path: str,
+        emit: Callable[[str, str], None],
+        emit_from: Callable[[str, str], None],
+        jobs: int = 1,
+        ordered: bool = False,
+        roots: set[str] | None = None
     ) -> None:
+        """写出所有使用的组件，文件内容经由`emit(path, content)`写出。
+
+        启用组件缓存时，渲染结果保存在缓存目录中，经由`emit_from(path, source)`写出。
+        `jobs`大于1时各组件在线程池中并行导出，`ordered`表示写出的顺序是否影响结果。
+        给出`roots`（使用的组件函数标识）时只写出从其与组件初始化函数出发可以到达的文件。
+        """
         symbol_map: dict[str, dict[str, list[str]]] = {}
         requires_map: dict[str, list[str]] = {}
         on_init_map: dict[str, str] = {}
         static_map: dict[str, list[dict[str, str]]] = {}
 
-        for component in self._loaded_cps:
-            cp_path = os.path.join(self._path, *component.split('.'))
-            config_path = os.path.join(cp_path, "component.json")
-            # config surely exists
-            with open(config_path, 'r', encoding='utf-8') as rd:
-                config = json.loads(rd.read())
+        # sorted so that generated names and the output order do not depend on hashing
+        for component in sorted(self._loaded_cps):
+            info = self._components[component]
             # config json should be a dict
-            if not isinstance(config, dict):
+            if not info['valid']:
                 console.error(
                     MCFComponentError(
                         f"Invalid format for component.json in component '{component}'"
                     )
                 )
+                continue
             # load config
-            namespace = config.get('namespace', 'local')
-            requires_map[component] = config.get('requires', [])
-            init_function = config.get('onInitialize', None)
-            statics = config.get('static', None)
+            namespace = info['namespace']
+            requires_map[component] = info['requires']
+            init_function = info['onInitialize']
             if init_function is not None:
                 on_init_map[component] = f"{namespace}:{init_function}"
-            if statics is not None:
-                static_map[component] = statics
-            # get all mcfunction in component
-            files, _ = getMultiPaths(cp_path)
-            files = [file for file in files if file.endswith('.mcfunction')]
+            if info['static']:
+                static_map[component] = info['static']
             # resolve all mcfunction
-            signature_mapping: dict[str, list[str]] = {}
-            # file path
-            for file in files:
-                rel = os.path.relpath(file, cp_path).removesuffix('.mcfunction')
-                # sign
-                sub_cp_id = component + '.' + '.'.join(rel.split(SLASH))
-                # signature
-                sub_func_sig = f"{namespace}:{'/'.join(rel.split(SLASH))}"
-                signature_mapping[sub_cp_id] = [sub_func_sig, file]
+            signature_mapping: dict[str, list[str]] = {
+                sub_cp_id: [sub_func_sig, os.path.join(self._path, *rel.split('/'))]
+                for sub_cp_id, (sub_func_sig, rel) in info['functions'].items()
+            }
             callback(signature_mapping)
             symbol_map[component] = signature_mapping
 
+        reached: set[str] | None = None
+        if roots is not None:
+            reached = self._reachable(
+                symbol_map, static_map, roots | set(on_init_map.values())
+            )
+
         # replace & write
-        on_init_wt = open(cp_init_path, "w", encoding='utf-8')
+        on_init_lines: list[str] = []
+        tasks: list[tuple] = []
         for component in symbol_map.keys():
-            macros = self._cps_macros[component]
-            replacements = []
-            for key, value in macros.items():
-                replacements.append((f"__{key}__", value))
+            macros: dict[str, str] = {
+                f"__{key}__": value for key, value in self._cps_macros[component].items()
+            }
+            replacements = dict(macros)
             requires = [component]
             requires.extend(requires_map[component])
             init_func_name = on_init_map.get(component, '')
             for required in requires:
                 for infos in symbol_map[required].values():
-                    replacements.append((infos[0], infos[3]))
+                    replacements[infos[0]] = infos[3]
                     if infos[0] == init_func_name:
-                        on_init_wt.write(
+                        on_init_lines.append(
                             f"function {infos[3]}\n"
                         )
-            # temporary fix for replace strategy
-            # sort in descending order
-            replacements.sort(key=lambda c: len(c[0]), reverse=True)
-            for infos in symbol_map[component].values():
-                with open(infos[1], 'r', encoding='utf-8') as rd:
-                    lines = rd.read().splitlines()
-                    to_write: list[str] = []
-                    for line in lines:
-                        if not line or line[0] == '#': continue
-                        for key, replacer in replacements:
-                            line = line.replace(key, replacer)
-                        to_write.append(line + '\n')
-                with open(infos[2], 'w', encoding='utf-8') as wt:
-                    wt.writelines(to_write)
-        on_init_wt.close()
-
-        # write static files
-        for component in self._loaded_cps:
+            functions = list(symbol_map[component].values())
+            statics = static_map.get(component, [])
+            if reached is not None:
+                functions = [
+                    infos for sub_cp_id, infos in symbol_map[component].items()
+                    if sub_cp_id in reached
+                ]
+                statics = [
+                    dict(request, files=[
+                        rel for rel in request["files"]
+                        if f"{component}/{idx}/{rel}" in reached
+                    ]) for idx, request in enumerate(statics)
+                ]
+            tasks.append((component, macros, replacements, functions, statics))
+
+        if reached is not None:
+            total = sum(len(functions) for functions in symbol_map.values()) + sum(
+                len(request["files"]) for requests in static_map.values()
+                for request in requests
+            )
+            console.info(
+                f"Tree shaking kept {len(reached)} of {total} component files."
+            )
+
+        if jobs <= 1 or len(tasks) <= 1:
+            hits = [self._exportComponent(task, emit, emit_from) for task in tasks]
+        else:
+            hits = self._exportParallel(tasks, jobs, ordered, emit, emit_from)
+        emit(cp_init_path, ''.join(on_init_lines))
+        self.cache_hits = sum(hits)
+        if self._cache_path is not None:
+            console.info(
+                f"Component cache: {self.cache_hits} reused, "
+                f"{len(tasks) - self.cache_hits} rendered."
+            )
+
+    def _reachable(
+        self,
+        symbol_map: dict[str, dict[str, list[str]]],
+        static_map: dict[str, list[dict]],
+        roots: set[str]
+    ) -> set[str]:
+        """从`roots`出发查找所有用到的组件函数与静态文件。
+
+        函数以组件函数标识表示，静态文件以`<组件>/<静态请求序号>/<相对路径>`表示。组件文件
+        中出现的函数签名与静态文件的资源路径（包括出现在字符串中的）都视为引用。
+        """
+        namespace = os.path.basename(os.path.normpath(self._mcf_path))
+        nodes: dict[str, str] = {}
+        sources: dict[str, str] = {}
+        for signature_mapping in symbol_map.values():
+            for sub_cp_id, infos in signature_mapping.items():
+                nodes[infos[0]] = sub_cp_id
+                sources[sub_cp_id] = infos[1]
+        for component, requests in static_map.items():
             cp_path = os.path.join(self._path, *component.split('.'))
-            static_requests = static_map.get(component, [])
-            macro_map = self._cps_macros.get(component, {})
-            for request in static_requests:
-                rq_type = request["type"]
+            # the output namespace is usually written as a macro in the sources
+            prefixes = [namespace] + [
+                f"__{key}__" for key, value in self._cps_macros[component].items()
+                if value == namespace
+            ]
+            for idx, request in enumerate(requests):
                 src_path = os.path.join(cp_path, request["src"])
-                dist_prefix = request["dist"]
-                dist_path = os.path.normpath(
-                    os.path.join(self._mcf_path, *rq_type.split('.'), dist_prefix)
-                )
-                file_path, folder_path = getMultiPaths(src_path)
-                file_path = [file for file in file_path if file.endswith('.json')]
-                for folder in folder_path:
-                    rel = os.path.relpath(folder, src_path)
-                    new_dir = os.path.normpath(
-                        os.path.join(dist_path, rel)
-                    )
-                    os.makedirs(new_dir, exist_ok=True)
-                for file in file_path:
-                    rel = os.path.relpath(file, src_path)
-                    new_file = os.path.normpath(
-                        os.path.join(dist_path, rel)
+                for rel in request["files"]:
+                    node = f"{component}/{idx}/{rel}"
+                    location = '/'.join(
+                        part for part in request["dist"].split('/') + rel.split('/') if part
+                    ).removesuffix('.json')
+                    for prefix in prefixes:
+                        nodes[f"{prefix}:{location}"] = node
+                    sources[node] = os.path.join(src_path, *rel.split('/'))
+
+        reached = {nodes.get(root, root) for root in roots} & set(sources)
+        queue = list(reached)
+        while queue:
+            with open(sources[queue.pop()], 'r', encoding='utf-8') as rd:
+                content = rd.read()
+            for location in LOCATION.findall(content):
+                node = nodes.get(location, None)
+                if node is not None and node not in reached:
+                    reached.add(node)
+                    queue.append(node)
+        return reached
+
+    def _exportComponent(
+        self,
+        task: tuple,
+        emit: Callable[[str, str], None],
+        emit_from: Callable[[str, str], None]
+    ) -> bool:
+        """渲染并写出一个组件，返回是否使用了缓存"""
+        component, macros, replacements, functions, statics = task
+        key = self._cacheKey(component, macros, replacements, functions, statics)
+        cached = self._readCache(component, key)
+        if cached is not None:
+            for path, source in cached:
+                emit_from(path, source)
+            return True
+        rendered = self._renderComponent(
+            component, macros, replacements, functions, statics
+        )
+        cached = self._writeCache(component, key, rendered)
+        if cached is None:
+            for path, content in rendered:
+                emit(path, content)
+        else:
+            for path, source in cached:
+                emit_from(path, source)
+        return False
+
+    def _exportParallel(
+        self,
+        tasks: list[tuple],
+        jobs: int,
+        ordered: bool,
+        emit: Callable[[str, str], None],
+        emit_from: Callable[[str, str], None]
+    ) -> list[bool]:
+        """在多个线程中导出组件，所有组件结束后按组件顺序报告错误。
+
+        `ordered`为真时写出的顺序会影响结果，此时线程中只进行渲染，写出操作被记录下来，
+        之后按组件顺序在当前线程中执行。
+        """
+        pending: list[list[tuple[Callable[[str, str], None], str, str]]] = [
+            [] for _ in tasks
+        ]
+        results: list[tuple[bool, Exception | None]] = [(False, None)] * len(tasks)
+        indices = iter(range(len(tasks)))
+        lock = threading.Lock()
+
+        def work() -> None:
+            while True:
+                with lock:
+                    index = next(indices, None)
+                if index is None: return
+                record = pending[index]
+                try:
+                    if ordered:
+                        hit = self._exportComponent(
+                            tasks[index],
+                            lambda path, content: record.append((emit, path, content)),
+                            lambda path, source: record.append((emit_from, path, source))
+                        )
+                    else:
+                        hit = self._exportComponent(tasks[index], emit, emit_from)
+                    results[index] = (hit, None)
+                except Exception as error:
+                    results[index] = (False, error)
+
+        # the current thread works as well, and takes over all components when no
+        # thread can be started, e.g. when exporting from an atexit callback
+        workers: list[threading.Thread] = []
+        for _ in range(min(jobs, len(tasks)) - 1):
+            worker = threading.Thread(target=work, daemon=True)
+            try:
+                worker.start()
+            except RuntimeError:
+                break
+            workers.append(worker)
+        work()
+        for worker in workers:
+            worker.join()
+
+        hits: list[bool] = []
+        for task, (hit, error), record in zip(tasks, results, pending):
+            if error is not None:
+                console.error(
+                    MCFComponentError(
+                        f"Failed to export component '{task[0]}': {error}"
                     )
-                    with (open(file, 'r', encoding='utf-8') as rd, 
-                        open(new_file, 'w', encoding='utf-8') as wt):
-                        while line := rd.readline():
-                            for target, replacer in macro_map.items():
-                                line = line.replace(f"__{target}__", replacer)
-                            wt.write(line)
+                )
+                hits.append(False)
+                continue
+            hits.append(hit)
+            for write, path, value in record:
+                write(path, value)
+        return hits
+
+    def _renderComponent(
+        self,
+        component: str,
+        macros: dict[str, str],
+        replacements: dict[str, str],
+        functions: list[list[str]],
+        statics: list[dict]
+    ) -> list[tuple[str, str]]:
+        """渲染组件的函数与静态文件，返回`(写出路径, 内容)`的列表"""
+        rendered: list[tuple[str, str]] = []
+        substitute = makeSubstitution(replacements)
+        for infos in functions:
+            with open(infos[1], 'r', encoding='utf-8') as rd:
+                content = ''.join(
+                    line + '\n' for line in rd.read().splitlines()
+                    if line and line[0] != '#'
+                )
+            rendered.append((infos[2], substitute(content)))
+
+        # static files only use macros
+        cp_path = os.path.join(self._path, *component.split('.'))
+        substitute = makeSubstitution(macros)
+        for request in statics:
+            rq_type = request["type"]
+            src_path = os.path.join(cp_path, request["src"])
+            dist_prefix = request["dist"]
+            dist_path = os.path.normpath(
+                os.path.join(self._mcf_path, *rq_type.split('.'), dist_prefix)
+            )
+            for rel in request["files"]:
+                file = os.path.join(src_path, *rel.split('/'))
+                new_file = os.path.normpath(
+                    os.path.join(dist_path, *rel.split('/'))
+                )
+                with open(file, 'r', encoding='utf-8') as rd:
+                    content = rd.read()
+                rendered.append((new_file, substitute(content)))
+        return rendered
+
+    def _cacheKey(
+        self,
+        component: str,
+        macros: dict[str, str],
+        replacements: dict[str, str],
+        functions: list[list[str]],
+        statics: list[dict]
+    ) -> str | None:
+        """渲染结果的缓存键，由组件源文件的内容、宏、函数标识与写出路径决定"""
+        if self._cache_path is None:
+            return None
+        cp_path = os.path.join(self._path, *component.split('.'))
+        sources = [infos[1] for infos in functions]
+        for request in statics:
+            src_path = os.path.join(cp_path, request["src"])
+            sources.extend(
+                os.path.join(src_path, *rel.split('/')) for rel in request["files"]
+            )
+        # hash the contents, a changed source may keep its size and mtime
+        digests = []
+        for source in sources:
+            with open(source, 'rb') as rd:
+                digests.append(hashlib.sha1(rd.read()).hexdigest())
+        material = json.dumps([
+            CACHE_FORMAT, component, self._mcf_path, digests,
+            sorted(macros.items()), sorted(replacements.items()),
+            [infos[2] for infos in functions], statics
+        ])
+        return hashlib.sha1(material.encode('utf-8')).hexdigest()
+
+    def _readCache(self, component: str, key: str | None) -> list[list[str]] | None:
+        """读取缓存条目，返回`[写出路径, 缓存文件]`的列表"""
+        if key is None:
+            return None
+        entry = os.path.join(self._cache_path, f"{component}-{key}")
+        try:
+            with open(os.path.join(entry, CACHE_ENTRY), 'r', encoding='utf-8') as rd:
+                files = json.loads(rd.read())
+        except (OSError, ValueError):
+            return None
+        return [[path, os.path.join(entry, name)] for path, name in files]
+
+    def _writeCache(
+        self, component: str, key: str | None, rendered: list[tuple[str, str]]
+    ) -> list[list[str]] | None:
+        """写入新的缓存条目并删除该组件的旧条目，返回`[写出路径, 缓存文件]`的列表"""
+        if key is None:
+            return None
+        entry = os.path.join(self._cache_path, f"{component}-{key}")
+        staging = os.path.join(self._cache_path, f".{component}-{key}")
+        files: list[list[str]] = []
+        try:
+            shutil.rmtree(staging, ignore_errors=True)
+            os.makedirs(staging)
+            for idx, (path, content) in enumerate(rendered):
+                with open(os.path.join(staging, str(idx)), 'w', encoding='utf-8') as wt:
+                    wt.write(content)
+                files.append([path, str(idx)])
+            with open(os.path.join(staging, CACHE_ENTRY), 'w', encoding='utf-8') as wt:
+                wt.write(json.dumps(files))
+            # one entry per component, the previous one is dropped
+            for name in os.listdir(self._cache_path):
+                if name.rpartition('-')[0] == component:
+                    shutil.rmtree(os.path.join(self._cache_path, name), ignore_errors=True)
+            os.rename(staging, entry)
+        except OSError as error:
+            console.warn(f"Can not write component cache for '{component}': {error}")
+            shutil.rmtree(staging, ignore_errors=True)
+            return None
+        return [[path, os.path.join(entry, name)] for path, name in files]
 
     def pushComponent(self, cp_id: str, macros: dict[str, str]) -> bool:
         if cp_id in self._loaded_cps:
@@ -0,0 +1,270 @@
+"""
+函数文件的写出后端
+"""
+
+from ._commands import Command
+from typing import Literal, TypeAlias, Callable
+import os, json, time, shutil, hashlib, zipfile
+
+__all__ = [
+    'EmitterType',
+    'Processor',
+    'FunctionHandle',
+    'FileHandle',
+    'FileEmitter',
+    'BufferedEmitter',
+    'IncrementalEmitter',
+    'ArchiveEmitter',
+    'makeEmitter'
+]
+
+EmitterType: TypeAlias = Literal['buffer', 'file', 'incremental']
+Processor: TypeAlias = Callable[[str, str], str]
+
+def writeFile(path: str, content: str) -> None:
+    """写出文件，所在的文件夹不存在时创建"""
+    try:
+        # never write through a hard link shared with the component cache
+        if os.stat(path).st_nlink > 1:
+            os.remove(path)
+    except FileNotFoundError:
+        pass
+    try:
+        wt = open(path, 'w', encoding='utf-8')
+    except FileNotFoundError:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        wt = open(path, 'w', encoding='utf-8')
+    with wt:
+        wt.write(content)
+
+def linkFile(path: str, source: str) -> None:
+    """将`path`硬链接到`source`，替换已存在的文件，无法链接时复制"""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    try:
+        os.link(source, path)
+    except OSError:
+        shutil.copyfile(source, path)
+
+def readFile(path: str) -> str:
+    with open(path, 'r', encoding='utf-8') as rd:
+        return rd.read()
+
+class FunctionHandle:
+    """缓冲模式下单个函数文件的写入句柄，命令节点在`getvalue`时才序列化"""
+    _chunks: list[str | Command]
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, s: str | Command) -> int:
+        self._chunks.append(s)
+        return 1
+
+    def close(self) -> None:
+        # contents stay in memory until the emitter flushes
+        pass
+
+    def getvalue(self) -> str:
+        return ''.join([
+            chunk if chunk.__class__ is str else chunk.line() for chunk in self._chunks
+        ])
+
+class FileHandle(FunctionHandle):
+    """文件模式下单个函数文件的写入句柄，命令节点在关闭时序列化并追加至文件"""
+    _path: str
+
+    def __init__(self, path: str):
+        super().__init__()
+        self._path = path
+
+    def close(self) -> None:
+        with open(self._path, 'a', encoding='utf-8') as wt:
+            wt.write(self.getvalue())
+        self._chunks.clear()
+
+class FileEmitter:
+    """每次进入函数时以追加模式打开文件"""
+    _opened: dict[str, None]
+
+    # whether the order of emit calls changes the output, emitters without
+    # an order can be called from several threads at once
+    ordered = False
+
+    def __init__(self):
+        self._opened = {}
+
+    def open(self, path: str) -> FileHandle:
+        self._opened[path] = None
+        return FileHandle(path)
+
+    def emit(self, path: str, content: str) -> None:
+        """直接写出一个完整的文件"""
+        writeFile(path, content)
+
+    def emitFrom(self, path: str, source: str) -> None:
+        """以`source`的内容写出文件，两者共享同一份数据"""
+        linkFile(path, source)
+
+    def flush(self, processor: Processor | None = None) -> int:
+        """文件已在写入时落盘，若给出`processor`则读回并重写所有文件"""
+        if processor is not None:
+            for path in self._opened:
+                with open(path, 'r', encoding='utf-8') as rd:
+                    content = rd.read()
+                with open(path, 'w', encoding='utf-8') as wt:
+                    wt.write(processor(path, content))
+        count = len(self._opened)
+        self._opened.clear()
+        return count
+
+class BufferedEmitter:
+    """在内存中按路径缓冲所有函数，在`flush`时统一写出"""
+    _buffers: dict[str, FunctionHandle]
+
+    ordered = False
+
+    def __init__(self):
+        self._buffers = {}
+
+    def open(self, path: str) -> FunctionHandle:
+        handle = self._buffers.get(path, None)
+        if handle is None:
+            handle = FunctionHandle()
+            self._buffers[path] = handle
+        return handle
+
+    def emit(self, path: str, content: str) -> None:
+        """直接写出一个完整的文件"""
+        writeFile(path, content)
+
+    def emitFrom(self, path: str, source: str) -> None:
+        """以`source`的内容写出文件，两者共享同一份数据"""
+        linkFile(path, source)
+
+    def flush(self, processor: Processor | None = None) -> int:
+        """写出所有缓冲的函数文件，返回写出的文件数量。
+
+        若给出`processor`，每个文件的内容在写出前都会经过`processor(path, content)`处理。
+        """
+        for path, handle in self._buffers.items():
+            content = handle.getvalue()
+            if processor is not None:
+                content = processor(path, content)
+            self.emit(path, content)
+        count = len(self._buffers)
+        self._buffers.clear()
+        return count
+
+class IncrementalEmitter(BufferedEmitter):
+    """与`BufferedEmitter`一样缓冲所有函数，但只写出内容发生变化的文件。
+
+    每个文件的内容摘要记录在清单文件中，内容与上次构建相同且文件仍存在时不再写入，
+    文件的修改时间保持不变。`finish`时删除本次构建未产生的文件并更新清单。
+    """
+    _manifest: str
+    _root: str
+    _previous: dict[str, str]
+    _current: dict[str, str]
+    _write_time: float
+    unchanged: int
+    rewritten: int
+    deleted: int
+
+    ordered = True
+
+    def __init__(self, manifest: str):
+        super().__init__()
+        self._manifest = manifest
+        self._root = os.path.dirname(manifest)
+        self._previous = {}
+        self._current = {}
+        self._write_time = 0.0
+        self.unchanged = 0
+        self.rewritten = 0
+        self.deleted = 0
+        if os.path.isfile(manifest):
+            with open(manifest, 'r', encoding='utf-8') as rd:
+                self._previous = json.loads(rd.read())
+
+    def emit(self, path: str, content: str) -> None:
+        key = os.path.relpath(path, self._root).replace(os.path.sep, '/')
+        digest = hashlib.sha1(content.encode('utf-8')).hexdigest()
+        self._current[key] = digest
+        if self._previous.get(key, None) == digest and os.path.isfile(path):
+            self.unchanged += 1
+            return
+        start = time.perf_counter()
+        writeFile(path, content)
+        self._write_time += time.perf_counter() - start
+        self.rewritten += 1
+
+    def emitFrom(self, path: str, source: str) -> None:
+        # the manifest needs the content, and a linked file must not be rewritten
+        self.emit(path, readFile(source))
+
+    def finish(self, folder: str) -> float:
+        """删除`folder`中以及上次清单中本次构建未产生的文件，写出新的清单。
+
+        返回估计节省的写入时间（秒），按本次构建中每个文件的平均写入时间计算。
+        """
+        stale = set(self._previous)
+        for filepath, _, filenames in os.walk(folder):
+            for filename in filenames:
+                path = os.path.join(filepath, filename)
+                stale.add(os.path.relpath(path, self._root).replace(os.path.sep, '/'))
+        stale.difference_update(self._current)
+        for key in sorted(stale):
+            path = os.path.join(self._root, *key.split('/'))
+            if os.path.isfile(path):
+                os.remove(path)
+                self.deleted += 1
+        start = time.perf_counter()
+        writeFile(self._manifest, json.dumps(self._current, indent=0, sort_keys=True))
+        self._write_time += time.perf_counter() - start
+        return self._write_time / (self.rewritten + 1) * self.unchanged
+
+class ArchiveEmitter(BufferedEmitter):
+    """将所有文件直接写入zip格式的数据包，不在磁盘上产生散落的文件。
+
+    `root`下的文件在压缩包中位于`data/`下，`pack.mcmeta`在`finish`时写入。
+    """
+    _archive: zipfile.ZipFile
+    _root: str
+    level: int
+
+    ordered = True
+
+    def __init__(self, archive: str, root: str, level: int):
+        super().__init__()
+        folder = os.path.dirname(archive)
+        if folder: os.makedirs(folder, exist_ok=True)
+        self._archive = zipfile.ZipFile(
+            archive, 'w', zipfile.ZIP_DEFLATED, compresslevel=level
+        )
+        self._root = root
+        self.level = level
+
+    def emit(self, path: str, content: str) -> None:
+        name = os.path.relpath(path, self._root).replace(os.path.sep, '/')
+        self._archive.writestr(f"data/{name}", content)
+
+    def emitFrom(self, path: str, source: str) -> None:
+        self.emit(path, readFile(source))
+
+    def finish(self, meta: str) -> None:
+        self._archive.writestr("pack.mcmeta", meta)
+        self._archive.close()
+
+def makeEmitter(
+    emitter: EmitterType,
+    manifest: str | None = None
+) -> FileEmitter | BufferedEmitter | IncrementalEmitter:
+    """`manifest`为增量模式下清单文件的路径"""
+    if emitter == 'file':
+        return FileEmitter()
+    if emitter == 'incremental' and manifest is not None:
+        return IncrementalEmitter(manifest)
+    return BufferedEmitter()
@@ -0,0 +1,153 @@
+"""
+对已生成的mcfunction命令序列做窥孔优化
+
+所有优化都只在单个函数内部、按顺序进行分析。遇到函数调用、宏命令以及`return`时，
+所有已知的信息都会被丢弃，因此优化不依赖于调用方或被调用方的行为。
+
+优化假定复制操作(`set from`)的源路径存在，即不保留从不存在路径复制时的旧值。
+"""
+
+import re
+
+__all__ = [
+    'optimizeCommands'
+]
+
+_PATH_CHARS = re.compile(r'[\w.\[\]\-]*')
+_SIMPLE_PATH = re.compile(r'^[\w.\[\]\-]+$')
+
+class _StorageStore:
+    """`data modify storage <storage> <dest> set (value|from|string) ...`"""
+    storage: str
+    dest: str
+    mode: str
+    source: str
+
+    def __init__(self, storage: str, dest: str, mode: str, source: str):
+        self.storage = storage
+        self.dest = dest
+        self.mode = mode
+        self.source = source
+
+def _parse_store(line: str) -> _StorageStore | None:
+    tokens = line.split(' ')
+    if len(tokens) < 8 or tokens[:3] != ['data', 'modify', 'storage']:
+        return None
+    if tokens[5] != 'set' or tokens[6] not in ('value', 'from', 'string'):
+        return None
+    return _StorageStore(tokens[3], tokens[4], tokens[6], ' '.join(tokens[7:]))
+
+def _root(path: str) -> str:
+    return re.split(r'[.\[]', path, maxsplit=1)[0]
+
+def _overlaps(left: str, right: str) -> bool:
+    if left == right: return True
+    if left.startswith(right) and left[len(right)] in '.[': return True
+    if right.startswith(left) and right[len(left)] in '.[': return True
+    return False
+
+def _mentions(text: str, path: str) -> bool:
+    """判断`text`中是否可能访问了与`path`重叠的nbt路径"""
+    root = _root(path)
+    start = text.find(root)
+    while start != -1:
+        if start == 0 or not (text[start - 1].isalnum() or text[start - 1] in '_.'):
+            end = _PATH_CHARS.match(text, start).end()
+            if end < len(text) and not text[end].isspace():
+                return True
+            if _overlaps(text[start:end], path):
+                return True
+        start = text.find(root, start + 1)
+    return False
+
+def _is_barrier(line: str) -> bool:
+    """函数调用、宏与返回会使所有已知信息失效"""
+    if line.startswith('$'): return True
+    tokens = line.split(' ')
+    return 'function' in tokens or 'return' in tokens
+
+def _tracked(path: str) -> bool:
+    return path == 'register' or path.startswith('cache.')
+
+def _forward_copies(lines: list[str | None], storage: str) -> None:
+    """将经由`register`的复制链改写为直接复制"""
+    alias: str | None = None
+    for index, line in enumerate(lines):
+        if line is None or not line or line[0] == '#': continue
+        if _is_barrier(line):
+            alias = None
+            continue
+        store = _parse_store(line)
+        if (store is not None and alias is not None and store.mode == 'from'
+            and store.storage == storage
+            and store.source == f"storage {storage} register"):
+            line = f"data modify storage {storage} {store.dest} set from storage {storage} {alias}"
+            lines[index] = line
+        if alias is not None:
+            touched = line if store is None else store.dest
+            if _mentions(touched, 'register') or _mentions(touched, alias):
+                alias = None
+        if (store is not None and store.storage == storage
+            and store.dest == 'register' and store.mode == 'from'):
+            src = store.source.split(' ')
+            if (len(src) == 3 and src[0] == 'storage' and src[1] == storage
+                and _SIMPLE_PATH.match(src[2])
+                and not _overlaps(src[2], 'register')):
+                alias = src[2]
+
+def _remove_dead_stores(lines: list[str | None], storage: str) -> None:
+    """移除在被读取前就被覆盖的`register`与`cache.*`写入"""
+    pending: dict[str, int] = {}
+    for index, line in enumerate(lines):
+        if line is None or not line or line[0] == '#': continue
+        if _is_barrier(line):
+            pending.clear()
+            continue
+        store = _parse_store(line)
+        read = line if store is None else store.source
+        for path in [path for path in pending if _mentions(read, path)]:
+            pending.pop(path)
+        if store is None: continue
+        if store.storage != storage or not _tracked(store.dest): continue
+        dead = pending.get(store.dest, None)
+        if dead is not None:
+            lines[dead] = None
+        pending[store.dest] = index
+
+def _remove_redundant_sets(lines: list[str | None]) -> None:
+    """移除对已知分数再次设置相同值的`scoreboard players set`"""
+    known: dict[tuple[str, str], str] = {}
+    for index, line in enumerate(lines):
+        if line is None or not line or line[0] == '#': continue
+        if _is_barrier(line):
+            known.clear()
+            continue
+        tokens = line.split(' ')
+        if len(tokens) == 6 and tokens[:3] == ['scoreboard', 'players', 'set']:
+            holder = (tokens[3], tokens[4])
+            if known.get(holder, None) == tokens[5]:
+                lines[index] = None
+            else:
+                known[holder] = tokens[5]
+            continue
+        if tokens[:2] == ['scoreboard', 'objectives'] or '*' in tokens or any(
+            token.startswith('@') for token in tokens
+        ):
+            known.clear()
+            continue
+        if (len(tokens) == 8 and tokens[:3] == ['scoreboard', 'players', 'operation']
+            and tokens[5] != '><'):
+            known.pop((tokens[3], tokens[4]), None)
+            continue
+        names = set(tokens)
+        for holder in [holder for holder in known if holder[0] in names]:
+            known.pop(holder)
+
+def optimizeCommands(content: str, storage: str) -> tuple[str, int]:
+    """优化单个函数的内容，返回优化后的内容与移除的命令数量"""
+    lines: list[str | None] = content.split('\n')
+    _forward_copies(lines, storage)
+    _remove_dead_stores(lines, storage)
+    _remove_redundant_sets(lines)
+    result = [line for line in lines if line is not None]
+    return '\n'.join(result), len(lines) - len(result)
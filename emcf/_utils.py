@@ -1,9 +1,10 @@
 
-import os, traceback
-from typing import Any
+import os, re, traceback
+from typing import Any, Callable
 
 __all__ = [
     'getMultiPaths',
+    'makeSubstitution',
     'LogOutput'
     'iterable'
 ]
@@ -24,6 +25,35 @@ def getMultiPaths(folder_path: str) -> tuple[list[str], list[str]]:
         folder_list.append(filepath)
     return (file_path_list, folder_list)
 
+def _triePattern(node: dict) -> str:
+    # children are tried before the end of a key, so the longest key wins
+    branches = []
+    for char, child in sorted(node.items(), key=lambda c: c[0] == ''):
+        if char == '': continue
+        branches.append(re.escape(char) + _triePattern(child))
+    if not branches:
+        return ''
+    pattern = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+    return f"(?:{pattern})?" if '' in node else pattern
+
+def makeSubstitution(replacements: dict[str, str]) -> Callable[[str], str]:
+    """编译一组替换规则，返回一次扫描完成全部替换的函数
+
+    规则的键被合并为一棵前缀树并编译为一个正则表达式，同一位置上优先匹配最长的键，
+    替换后的内容不会再被替换。
+    """
+    keys = [key for key in replacements if key]
+    if not keys:
+        return lambda text: text
+    trie: dict = {}
+    for key in keys:
+        node = trie
+        for char in key:
+            node = node.setdefault(char, {})
+        node[''] = {}
+    pattern = re.compile(_triePattern(trie))
+    return lambda text: pattern.sub(lambda match: replacements[match.group()], text)
+
 _RED = '\x1b[31m'
 _GREEN = '\x1b[32m'
 _YELLOW = '\x1b[33m'
@@ -3,6 +3,7 @@
 """
 
 from .core import MCF
+from ._commands import *
 from typing import (
     Any, Literal, TypeAlias, Self, NewType,
     Callable, Generic, Optional
@@ -33,18 +34,18 @@ __all__ = [
 ]
 
 class _Collector:
-    _buffer: str
+    _buffer: str | Command
     def __init__(self):
         pass
-    def write(self, s: str) -> int:
+    def write(self, s: str | Command) -> int:
         self._buffer = s
         return 1
 
 class _MultiCollector:
-    _buffer_list: list[str]
+    _buffer_list: list[str | Command]
     def __init__(self):
         self._buffer_list = []
-    def write(self, s: str) -> int:
+    def write(self, s: str | Command) -> int:
         self._buffer_list.append(s)
 
 
@@ -249,7 +250,7 @@ class Execute:
     _last_redirect: Any
 
     def __init__(self, macro: bool = False):
-        self.sub_commands = ["execute"]
+        self.sub_commands = []
         self.is_macro = macro
         self.collect = _Collector()
         self._last_redirect = MCF._io_redirect
@@ -282,10 +283,15 @@ class Execute:
 
     def run(self, run_command: None) -> None:
         """执行子命令，在括号中调用命令，接收其返回值作为参数（返回值始终为`None`）"""
-        self.sub_commands.append('run')
-        self.sub_commands.append(self.collect._buffer.removeprefix('$'))
         MCF.redirect(self._last_redirect)
-        MCF.write(' '.join(self.sub_commands), self.is_macro)
+        MCF.command(ExecuteCommand(
+            self.sub_commands, toCommand(self.collect._buffer), self.is_macro
+        ))
+
+    def check(self) -> None:
+        """不执行命令，以最后一个条件子命令是否成立作为命令的结果"""
+        MCF.redirect(self._last_redirect)
+        MCF.command(ExecuteCommand(self.sub_commands, None, self.is_macro))
 
 class ScoreBoard:
     """所有与scoreboard相关的指令封装"""
@@ -302,10 +308,7 @@ class ScoreBoard:
         """等同于`scoreboard players set <score_holder> <board_name>
           <value>`
         """
-        MCF.write(
-f"""scoreboard players set {score_holder} {board_name} {value}
-"""
-        , macro)
+        MCF.command(ScorePlayers('set', score_holder, board_name, value, macro))
 
     @staticmethod
     def players_operation(
@@ -319,10 +322,10 @@ f"""scoreboard players set {score_holder} {board_name} {value}
         """等同于`scoreboard players operation <score_holder_to>
           <board_name_to> <operation> <score_holder_from> <board_name_from>`
         """
-        MCF.write(
-f"""scoreboard players operation {score_holder_to} {board_name_to} {operation} {score_holder_from} {board_name_from}
-"""
-        , macro)
+        MCF.command(ScoreOperation(
+            score_holder_to, board_name_to, operation,
+            score_holder_from, board_name_from, macro
+        ))
 
     @staticmethod
     def players_add(
@@ -332,10 +335,7 @@ f"""scoreboard players operation {score_holder_to} {board_name_to} {operation} {
         macro: bool = False
     ) -> None:
         """等同于`scoreboard players add <score_holder> <board_name> <value>`"""
-        MCF.write(
-f"""scoreboard players add {score_holder} {board_name} {value}
-"""
-        , macro)
+        MCF.command(ScorePlayers('add', score_holder, board_name, value, macro))
 
     @staticmethod
     def players_reset(
@@ -344,10 +344,7 @@ f"""scoreboard players add {score_holder} {board_name} {value}
         macro: bool = False
     ) -> None:
         """等同于`scoreboard players reset <score_holder> <board_name>`"""
-        MCF.write(
-f"""scoreboard players reset {score_holder} {board_name}
-"""
-        , macro)
+        MCF.command(ScorePlayers('reset', score_holder, board_name, None, macro))
 
     @staticmethod
     def players_remove(
@@ -356,10 +353,7 @@ f"""scoreboard players reset {score_holder} {board_name}
         value: int | str,
         macro: bool = False
     ) -> None:
-        MCF.write(
-f"""scoreboard players remove {score_holder} {board_name} {value}
-"""
-        , macro)
+        MCF.command(ScorePlayers('remove', score_holder, board_name, value, macro))
 
     @staticmethod
     def players_get(
@@ -368,10 +362,7 @@ f"""scoreboard players remove {score_holder} {board_name} {value}
         macro: bool = False
     ) -> None:
         """等同于`scoreboard players get <score_holder> <board_name>`"""
-        MCF.write(
-f"""scoreboard players get {score_holder} {board_name}
-"""
-        , macro)
+        MCF.command(ScorePlayers('get', score_holder, board_name, None, macro))
 
     @staticmethod
     def to_storage(
@@ -385,10 +376,11 @@ f"""scoreboard players get {score_holder} {board_name}
         """将位于`<score_holder> <board_name>`位置的计分板数据移动至项目储存
         的`<dist>`路径内，并乘上`<scale>`。
         """
-        MCF.write(
-f"""execute store result storage {MCF.storage} {dist} {_type} {scale} run scoreboard players get {score_holder} {board_name}
-"""
-        , macro)
+        MCF.command(ExecuteCommand(
+            [f"store result storage {MCF.storage} {dist} {_type} {scale}"],
+            ScorePlayers('get', score_holder, board_name),
+            macro
+        ))
     
     @staticmethod
     def from_storage(
@@ -401,10 +393,11 @@ f"""execute store result storage {MCF.storage} {dist} {_type} {scale} run scoreb
         """将位于项目储存的`<src>`路径位置的数据移动至计分板的
         的`<score_holder> <board_name>`位置，并乘上`<scale>`。
         """
-        MCF.write(
-f"""execute store result score {score_holder} {board_name} run data get storage {MCF.storage} {src} {scale}
-"""
-        , macro)
+        MCF.command(ExecuteCommand(
+            [f"store result score {score_holder} {board_name}"],
+            DataQuery('get', f"storage {MCF.storage}", src, str(scale)),
+            macro
+        ))
 
 _DataModification = NewType("_DataModification", None)
 
@@ -422,12 +415,12 @@ class _DataTarget:
         """对指定的操作对象做get操作，等价于`data get (target)
         [nbt_path] [scale]`
         """
-        contents = ['data get', self._target]
+        operands = []
         if nbt_path is not None:
-            contents.append(nbt_path)
+            operands.append(nbt_path)
         if scale is not None:
-            contents.append(str(scale))
-        MCF.write(' '.join(contents) + '\n', macro)
+            operands.append(str(scale))
+        MCF.command(DataQuery('get', self._target, *operands, macro=macro))
 
     def merge(
         self,
@@ -437,10 +430,7 @@ class _DataTarget:
         """对指定的操作对象做merge操作，等价于`data merge (target)
         <compiled_snbt>`
         """
-        MCF.write(
-            ' '.join(['data merge', self._target, compiled_snbt]) + '\n',
-            macro
-        )
+        MCF.command(DataQuery('merge', self._target, compiled_snbt, macro=macro))
 
     def remove(
         self,
@@ -448,10 +438,7 @@ class _DataTarget:
         macro: bool = False
     ) -> None:
         """对指定的操作对象做remove操作，等价于`data remove (target) <nbt_path>`"""
-        MCF.write(
-            ' '.join(['data remove', self._target, nbt_path]) + '\n',
-            macro
-        )
+        MCF.command(DataQuery('remove', self._target, nbt_path, macro=macro))
 
     def modify_append(
         self,
@@ -461,9 +448,7 @@ class _DataTarget:
         """对指定操作目标做modify操作，具体模式为append，等价于
         `data modify (target) <nbt_path> append ...`
         """
-        return _DataModification(
-            ' '.join(['data modify', self._target, f'{nbt_path} append']), macro
-        )
+        return _DataModification(self._target, nbt_path, 'append', macro)
 
     def modify_insert(
         self,
@@ -474,10 +459,7 @@ class _DataTarget:
         """对指定操作目标做modify操作，具体模式为insert，等价于
         `data modify (target) <nbt_path> insert <index> ...`
         """
-        return _DataModification(
-            ' '.join(['data modify', self._target, f'{nbt_path} insert {index}']),
-            macro
-        )
+        return _DataModification(self._target, nbt_path, f'insert {index}', macro)
 
     def modify_merge(
         self,
@@ -487,9 +469,7 @@ class _DataTarget:
         """对指定操作目标做modify操作，具体模式为merge，等价于
         `data modify (target) <nbt_path> merge ...`
         """
-        return _DataModification(
-            ' '.join(['data modify', self._target, f'{nbt_path} merge']), macro
-        )
+        return _DataModification(self._target, nbt_path, 'merge', macro)
 
     def modify_prepend(
         self,
@@ -499,9 +479,7 @@ class _DataTarget:
         """对指定操作目标做modify操作，具体模式为prepend，等价于
         `data modify (target) <nbt_path> prepend ...`
         """
-        return _DataModification(
-            ' '.join(['data modify', self._target, f'{nbt_path} prepend']), macro
-        )
+        return _DataModification(self._target, nbt_path, 'prepend', macro)
 
     def modify_set(self,
         nbt_path: str,
@@ -510,17 +488,24 @@ class _DataTarget:
         """对指定操作目标做modify操作，具体模式为set，等价于
         `data modify (target) <nbt_path> set ...`
         """
-        return _DataModification(
-            ' '.join(['data modify', self._target, f'{nbt_path} set']), macro
-        )
+        return _DataModification(self._target, nbt_path, 'set', macro)
 
 class _DataModification:
-    _built: str
+    _target: str
+    _path: str
+    _mode: str
     _macro: bool
-    def __init__(self, built: str, macro: bool):
-        self._built = built
+    def __init__(self, target: str, path: str, mode: str, macro: bool):
+        self._target = target
+        self._path = path
+        self._mode = mode
         self._macro = macro
 
+    def _modify(self, source_type: str, *source: str) -> None:
+        MCF.command(DataModify(
+            self._target, self._path, self._mode, source_type, *source, macro=self._macro
+        ))
+
     def via(
         self, 
         target: _DataTarget,
@@ -529,9 +514,8 @@ class _DataModification:
         """指定modify的方式为from，等价于
         `data modify ... from (target) [nbt_path]`
         """
-        contents = [self._built, 'from', target._target]
-        if nbt_path is not None: contents.append(nbt_path)
-        MCF.write(' '.join(contents) + '\n', self._macro)
+        if nbt_path is None: self._modify('from', target._target)
+        else: self._modify('from', target._target, nbt_path)
 
     def string(
         self,
@@ -543,15 +527,15 @@ class _DataModification:
         """指定modify的方式为string，等价于
         `data modify ... string (target) [nbt_path] [start] [end]`
         """
-        contents = [self._built, 'string', target._target]
-        if nbt_path is not None: contents.append(nbt_path)
-        if start is not None: contents.append(start)
-        if end is not None: contents.append(end)
-        MCF.write(' '.join(contents) + '\n', self._macro)
+        source = [target._target]
+        if nbt_path is not None: source.append(nbt_path)
+        if start is not None: source.append(str(start))
+        if end is not None: source.append(str(end))
+        self._modify('string', *source)
 
     def value(self, value: str) -> None:
         """指定modify的方式为value，等价于`data modify ... value <value>`"""
-        MCF.write(' '.join([self._built, 'value', value]) + '\n', self._macro)
+        self._modify('value', value)
 
 class Data:
     """data系列命令的封装"""    
@@ -585,9 +569,10 @@ class Function:
     
     def call(self, compiled_snbt: str | None = None) -> None:
         """使用函数，等价于`function <signature> [compiled_snbt]`"""
-        contents = ['function', self._signature]
-        if compiled_snbt is not None: contents.append(compiled_snbt)
-        MCF.write(' '.join(contents) + '\n', self._macro)
+        if compiled_snbt is None:
+            MCF.command(FunctionCall(self._signature, macro=self._macro))
+        else:
+            MCF.command(FunctionCall(self._signature, compiled_snbt, macro=self._macro))
 
     def with_args(
         self,
@@ -595,9 +580,9 @@ class Function:
         nbt_path: str | None = None
     ) -> None:
         """使用函数，等价于`function <signature> with (target) [nbt_path]`"""
-        contents = ['function', self._signature, 'with', target._target]
-        if nbt_path is not None: contents.append(nbt_path)
-        MCF.write(' '.join(contents) + '\n', self._macro)
+        arguments = ['with', target._target]
+        if nbt_path is not None: arguments.append(nbt_path)
+        MCF.command(FunctionCall(self._signature, *arguments, macro=self._macro))
 
 class ReturN:
     """return命令的封装"""
@@ -613,7 +598,7 @@ class ReturN:
     def value(self, value: int | str) -> None:
         """返回值，等价于`return <value>`"""
         MCF.redirect(self._last_redirect)
-        MCF.write(f'return {value}\n', self._macro)
+        MCF.command(ReturnCommand(value, macro=self._macro))
         
 
     def run(self, run_command: None) -> None:
@@ -621,15 +606,58 @@ class ReturN:
         接收其返回值作为参数（返回值始终为`None`）
         """
         MCF.redirect(self._last_redirect)
-        MCF.write(
-            'return run ' + self._collect._buffer.removeprefix('$'),
-            self._macro
+        MCF.command(ReturnCommand(
+            run=toCommand(self._collect._buffer), macro=self._macro
+        ))
+
+def _check_signal(signal: str, value: int) -> None:
+    """信号寄存器`signal`被置位时以`value`返回当前函数"""
+    Execute().condition('if').score_matches(
+        signal, MCF.sb_sys, 1, 1
+    ).run(
+        ReturN().value(value)
+    )
+
+def _check_signals(
+    signals: set[str],
+    value: int,
+    checked: tuple[str, ...] = MCF.SIGNALS
+) -> None:
+    """依次检查`checked`中的信号寄存器，只写出`signals`中的信号（即之前的代码块可能
+    置位的信号）的检查，其余的检查计入`MCF.elideChecks`
+    """
+    for signal in checked:
+        if signal in signals:
+            _check_signal(signal, value)
+        else:
+            MCF.elideChecks(1)
+
+class _LoopChecks:
+    """循环控制函数开头的信号检查与`LOOP_CONT`的重置。
+
+    写出时循环体尚未编译，命令先写为占位节点，循环体结束后再由`settle`根据其可能
+    置位的信号决定是否生效。
+    """
+    _terminate: DeferredCommand
+    _exit: DeferredCommand
+    _skip: DeferredCommand
+
+    def __init__(self):
+        self._terminate = MCF.placeholder(lambda: _check_signal(MCF.TERMINATE, 0))
+        self._exit = MCF.placeholder(lambda: _check_signal(MCF.LOOP_EXIT, 0))
+        self._skip = MCF.placeholder(
+            lambda: ScoreBoard.players_set(MCF.LOOP_CONT, MCF.sb_sys, 0)
         )
 
+    def settle(self, signals: set[str]) -> None:
+        """需在离开循环控制函数之前调用"""
+        self._terminate.active = MCF.TERMINATE in signals
+        self._exit.active = MCF.LOOP_EXIT in signals
+        self._skip.active = MCF.LOOP_CONT in signals
+        MCF.elideChecks((not self._terminate.active) + (not self._exit.active))
+
 def Say(content: str, macro: bool = False) -> None:
-    MCF.write(
-        f"say {content}\n", macro
-    )
+    MCF.command(RawCommand(f"say {content}", macro))
 
 class Tag:
     _select: str
@@ -639,26 +667,17 @@ class Tag:
         self._macro = macro
     
     def add(self, tag: str) -> None:
-        MCF.write(
-            f"tag {self._select} add {tag}\n", self._macro
-        )
+        MCF.command(RawCommand(f"tag {self._select} add {tag}", self._macro))
     
     def list(self) -> None:
-        MCF.write(
-            f"tag {self._select} list\n", self._macro
-        )
+        MCF.command(RawCommand(f"tag {self._select} list", self._macro))
     
     def remove(self, tag: str) -> None:
-        MCF.write(
-            f"tag {self._select} remove {tag}\n", self._macro
-        )
+        MCF.command(RawCommand(f"tag {self._select} remove {tag}", self._macro))
 
 def TellRaw(
     compiled_selector: str,
     text_component: str,
     macro: bool = False
 ) -> None:
-    MCF.write(
-        f"tellraw {compiled_selector} {text_component}\n",
-        macro
-    )
+    MCF.command(RawCommand(f"tellraw {compiled_selector} {text_component}", macro))
@@ -17,15 +17,15 @@ def get_keys(hash_map: HashMap):
     front = Integer(0)
     back = Integer(0)
     _in_text = Text("-")
-    result = ArrayList()
-    stack = ArrayList()
+    result = ArrayList[Text]()
+    stack = ArrayList[Text]()
     with While()(back < map_string.size()):
-        cur = map_string[back].to(Text)
+        cur = map_string[back]
         with If((cur == '"') | (cur == "'")):
             pre_index = back - 1
             with If(pre_index < 0):
                 pre_index.assign(0)
-            previous = map_string[pre_index].to(Text)
+            previous = map_string[pre_index]
             with If(previous != '\\'):
                 with If(_in_text != '-'):
                     _in_text.assign(cur)
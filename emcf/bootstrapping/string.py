@@ -14,7 +14,7 @@ __all__ = [
 
 @MCFunction(ArrayList[Text])
 def text_to_string(text: Text):
-    string = ArrayList()
+    string = ArrayList[Text]()
     for index in Range(0, text.size()):
         string.append(
             text.substr(index, index + 1)
@@ -24,7 +24,7 @@ def text_to_string(text: Text):
 @MCFunction(Text)
 def string_to_text(string: ArrayList[Text]):
     text = Text()
-    for char in string.iterate(Text):
+    for char in string.iterate(strategy='consume'):
         text.concat(char)
     Return(text)
 
@@ -35,19 +35,19 @@ def string_compare(a: ArrayList[Text], b: ArrayList[Text]):
     with If(a_size != b_size):
         Return(Condition(False))
     for index in Range(a_size):
-        with If(a[index].to(Text) != b[index].to(Text)):
+        with If(a[index] != b[index]):
             Return(Condition(False))
     Return(Condition(True))
 
 @MCFunction(ArrayList[Text])
 def split_string(string: ArrayList[Text], split: Text):
-    result: ArrayList[Text] = ArrayList()
+    result = ArrayList[Text]()
     front = Integer(0)
     back = Integer(0)
     text_size = string.size()
 
     with While()(back < text_size):
-        with If(string[back].to(Text) == split):
+        with If(string[back] == split):
             result.append(
                 string_to_text(string[front:back])
             )
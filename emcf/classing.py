@@ -3,6 +3,7 @@ from .types import *
 from ._writers import *
 from ._utils import console
 from .functional import push_stack, new_stack, pop_stack
+from .control import Scope
 from .core import MCF
 from ._exceptions import MCFSyntaxError, MCFValueError, MCFTypeError
 from typing import ( 
@@ -56,6 +57,7 @@ Args = TypeVarTuple("Args")
 class MCFClass(MCFVariable):
     """MCF的类支持，继承自MCFVariable"""
     _meta: MetaInfo
+    _storage_backed = True
 
     def __init__(
         self,
@@ -193,7 +195,7 @@ class MCFClass(MCFVariable):
                     return ret_val
 
                 # save present context
-                push_stack()
+                flags = push_stack()
 
                 # collect self data
                 if not static:
@@ -235,7 +237,10 @@ class MCFClass(MCFVariable):
                     Function(body_detail[1]).call()
                     # forward to body
                     MCF.forward(body_detail[0])
-                    method(*collected)
+                    MCF.beginSignals()
+                    with Scope(isolated=True):
+                        method(*collected)
+                    MCF.endSignals(())
                     MCF.rewind()
 
                     # gc
@@ -252,7 +257,7 @@ class MCFClass(MCFVariable):
                 )
                 
                 # recover context
-                pop_stack()
+                pop_stack(flags=flags)
 
                 # collect return value
                 if issubclass(ret_tp, FakeNone):
@@ -297,7 +302,10 @@ class MCFClass(MCFVariable):
             body_path, body_sig = MCF.makeFunction()
             # forward to body
             MCF.forward(body_path)
-            func(*new_args, **new_kwargs)
+            MCF.beginSignals()
+            with Scope(isolated=True):
+                func(*new_args, **new_kwargs)
+            MCF.endSignals(())
             MCF.rewind()
             # call function
             Function(body_sig).call()
@@ -392,7 +400,7 @@ class MCFClass(MCFVariable):
             index += 1
 
         # push frame to call construct
-        push_stack()
+        flags = push_stack()
 
         # add members to context
         new_stack()
@@ -410,7 +418,7 @@ class MCFClass(MCFVariable):
         )
 
         # pop stack
-        pop_stack()
+        pop_stack(flags=flags)
 
         # save back to class
         for shadow in self._meta.name_shadow_map.values():
@@ -1,22 +1,28 @@
 
-from .core import MCF
+from .core import MCF, BranchState
 from ._utils import console
 from ._exceptions import MCFTypeError, MCFSyntaxError, MCFValueError
 from .types import Condition, Integer, IntegerConvertible
 from ._writers import *
-from ._writers import _MultiCollector
+from ._writers import _MultiCollector, _LoopChecks, _check_signals
+from ._commands import toCommand, DeferredCommand
+from ._emission import FunctionHandle
 from traceback import extract_stack
-from typing import Self, Callable, Any
+from typing import Self, Callable, Any, Literal, TypeAlias
 import os
 
 __all__ = [
     'If',
     'Elif',
     'Else',
+    'Switch',
+    'Case',
+    'Default',
     'While',
     'Break',
     'Continue',
-    'Range'
+    'Range',
+    'Scope'
 ]
 
 class ConditionControl:
@@ -24,136 +30,162 @@ class ConditionControl:
     _condition: Condition | None
     _func_path: str
     _func_sig: str
+    _kind: Literal['if', 'elif', 'else']
+    _mode: Literal['runtime', 'inline', 'drop']
+    _branch: BranchState
+    _value: int
     
-    def __init__(self, writer: Callable, condition: Condition | None):
+    def __init__(
+        self,
+        writer: Callable,
+        condition: Condition | None,
+        kind: Literal['if', 'elif', 'else']
+    ):
         self._enter = writer
         self._condition = condition
+        self._kind = kind
         self._func_path, self._func_sig = MCF.makeFunction()
 
-    def __enter__(self) -> Self:
-        if self._condition is None:
-            self._enter(self._func_sig)
+    def _resolve(self) -> None:
+        """根据编译期已知的条件与前序分支决定本分支的编译方式：
+
+        - `runtime`: 通过条件标志在运行时判断
+        - `inline`: 条件恒为真，直接将分支内容写入当前函数
+        - `drop`: 条件恒为假或前序分支必定执行，分支函数不会被调用
+        """
+        known = None
+        if self._kind == 'else':
+            known = True
+        elif isinstance(self._condition, Condition):
+            known = self._condition._known()
+        previous = MCF._branch_state
+        if self._kind == 'if' or previous == 'none':
+            # head of a chain, or every previous branch is known to be skipped
+            if known is None:
+                self._mode, self._branch = 'runtime', 'runtime'
+                self._enter = ConditionControl._write_if
+            elif known:
+                self._mode, self._branch = 'inline', 'taken'
+            else:
+                self._mode, self._branch = 'drop', 'none'
+        elif previous == 'taken':
+            self._mode, self._branch = 'drop', 'taken'
         else:
-            if not isinstance(self._condition, Condition):
-                console.error(
-                    MCFTypeError(
-                        "Can not use {} as a condition.",
-                        self._condition
-                    )
-                )
+            self._branch = 'runtime'
+            if known is False:
+                self._mode = 'drop'
             else:
-                self._enter(self._condition._mcf_id, self._func_sig)
+                self._mode = 'runtime'
+
+    def __enter__(self) -> Self:
+        MCF.beginSignals()
+        if self._kind != 'if':
+            ConditionControl._check_chain(self._kind)
+        if self._condition is not None and not isinstance(self._condition, Condition):
+            console.error(
+                MCFTypeError(
+                    "Can not use {} as a condition.",
+                    self._condition
+                )
+            )
+            self._mode, self._branch = 'drop', 'runtime'
+        else:
+            self._resolve()
+        if self._mode != 'runtime':
+            MCF._context_type.append(self._kind)
+            MCF._last_ctx_type = 'norm'
+            if self._mode == 'drop':
+                MCF.forward(self._func_path)
+            return self
+        # every chain nested at the same depth shares one flag, see `_write_if`
+        flag = MCF.condFlag(MCF.condDepth())
+        if self._enter is ConditionControl._write_else:
+            self._enter(flag, self._func_sig)
+        elif self._enter is ConditionControl._write_if:
+            self._value = 1
+            self._enter(self._condition._test(), flag, self._func_sig)
+        else:
+            self._value = MCF._branch_flag + 1
+            known = self._condition._known()
+            self._enter(
+                None if known else self._condition._test(),
+                flag, self._value, self._func_sig
+            )
         MCF.forward(self._func_path)
         return self
     
     def __exit__(self, type, value, traceback) -> None:
-        MCF._last_ctx_type = MCF._context_type.pop()
+        MCF._context_type.pop()
+        MCF._last_ctx_type = self._kind
+        MCF._branch_state = self._branch
+        # a dropped branch never runs, so nothing it sets reaches the outer blocks
+        signals = MCF.endSignals(() if self._mode == 'drop' else MCF.SIGNALS)
+        if self._mode == 'inline': return
         MCF.rewind()
-        Execute().store('result').score(MCF.COND_LAST, MCF.sb_sys).run(
-            Data.storage(MCF.storage).get("cond_stack[-1]", 1.0)
-        )
-        Data.storage(MCF.storage).remove("cond_stack[-1]")
-        Execute().condition('if').score_matches(
-            MCF.TERMINATE, MCF.sb_sys, 1, 1
-        ).run(
-            ReturN().value(1)
-        )
-        Execute().condition('if').score_matches(
-            MCF.LOOP_EXIT, MCF.sb_sys, 1, 1
-        ).run(
-            ReturN().value(1)
-        )
-        Execute().condition('if').score_matches(
-            MCF.LOOP_CONT, MCF.sb_sys, 1, 1
-        ).run(
-            ReturN().value(1)
-        )
+        if self._mode == 'drop': return
+        if self._kind != 'else':
+            MCF._branch_flag = self._value
+        _check_signals(signals, 1)
 
     @staticmethod
-    def _write_if(that: str, sig: str) -> None:
+    def _write_if(
+        test: Callable[[Execute], Execute],
+        flag: str,
+        sig: str
+    ) -> None:
+        """写出条件链的第一个分支。
+
+        条件链的标志在链中的分支被执行后不为0：`If`执行时为1，第n个`Elif`执行时为n + 1，
+        因此每个分支只需判断标志是否为自己的值。分支内嵌套的条件链使用更深一层的标志，
+        调用可能改写标志的函数前由`push_stack`保存标志。
+        """
         MCF._context_type.append('if')
         MCF._last_ctx_type = 'norm'
-        Execute().store('result').storage(
-            MCF.storage, "register", 'byte', 1.0
-        ).run(
-            ScoreBoard.players_get(that, MCF.sb_general)
-        )
-        Data.storage(MCF.storage).modify_append("cond_stack").via(
-            Data.storage(MCF.storage), "register"
-        )
+        test(Execute().store('success').score(flag, MCF.sb_sys)).check()
         Execute().condition('if').score_matches(
-            that, MCF.sb_general, 1, 1
+            flag, MCF.sb_sys, 1, 1
         ).run(
             Function(sig).call()
         )
 
     @staticmethod
-    def _write_elif(that: str, sig: str) -> None:
+    def _check_chain(kind: Literal['elif', 'else']) -> None:
         if MCF._last_ctx_type != 'if' and MCF._last_ctx_type != 'elif':
             console.error(
                 MCFSyntaxError(
-                    "elif used not after an elif or if context."
+                    f"{kind} used not after an elif or if context."
                 )
             )
+
+    @staticmethod
+    def _write_elif(
+        test: Callable[[Execute], Execute] | None,
+        flag: str,
+        value: int,
+        sig: str
+    ) -> None:
+        """`test`为`None`时分支的条件恒为真"""
         MCF._context_type.append('elif')
         MCF._last_ctx_type = 'norm'
-        ScoreBoard.players_set(MCF.GENERAL, MCF.sb_sys, 0)
-        Execute().condition('if').score_matches(
-            MCF.COND_LAST, MCF.sb_sys, 0, 0
-        ).condition('if').score_matches(
-            that, MCF.sb_general, 1, 1
-        ).run(
-            ScoreBoard.players_set(MCF.GENERAL, MCF.sb_sys, 1)
-        )
-        Execute().condition('if').score_matches(
-            MCF.GENERAL, MCF.sb_sys, 1, 1
-        ).store('result').storage(
-            MCF.storage, "register", 'byte', 1.0
-        ).run(
-            ScoreBoard.players_get(MCF.GENERAL, MCF.sb_sys)
-        )
-        Execute().condition('if').score_matches(
-            MCF.GENERAL, MCF.sb_sys, 0, 0
-        ).store('result').storage(
-            MCF.storage, "register", 'byte', 1.0
-        ).run(
-            ScoreBoard.players_get(MCF.COND_LAST, MCF.sb_sys)
-        )
-        Data.storage(MCF.storage).modify_append("cond_stack").via(
-            Data.storage(MCF.storage), "register"
+        execute = Execute().condition('if').score_matches(flag, MCF.sb_sys, 0, 0)
+        if test is not None:
+            execute = test(execute)
+        execute.run(
+            ScoreBoard.players_set(flag, MCF.sb_sys, value)
         )
         Execute().condition('if').score_matches(
-            MCF.GENERAL, MCF.sb_sys, 1, 1
+            flag, MCF.sb_sys, value, value
         ).run(
             Function(sig).call()
         )
 
     @staticmethod
-    def _write_else(sig: str) -> None:
-        if MCF._last_ctx_type != 'if' and MCF._last_ctx_type != 'elif':
-            console.error(
-                MCFSyntaxError(
-                    "else used not after an elif or if context."
-                )
-            )
+    def _write_else(flag: str, sig: str) -> None:
+        # nothing follows an else, so the flag is left as it is
         MCF._context_type.append('else')
         MCF._last_ctx_type = 'norm'
-        ScoreBoard.players_set(MCF.GENERAL, MCF.sb_sys, 0)
-        Execute().condition('if').score_matches(
-            MCF.COND_LAST, MCF.sb_sys, 0, 0
-        ).run(
-            ScoreBoard.players_set(MCF.GENERAL, MCF.sb_sys, 1)
-        )
-        Execute().store('result').storage(
-            MCF.storage, "register", 'byte', 1.0
-        ).run(
-            ScoreBoard.players_get(MCF.GENERAL, MCF.sb_sys)
-        )
-        Data.storage(MCF.storage).modify_append("cond_stack").via(
-            Data.storage(MCF.storage), "register"
-        )
         Execute().condition('if').score_matches(
-            MCF.GENERAL, MCF.sb_sys, 1, 1
+            flag, MCF.sb_sys, 0, 0
         ).run(
             Function(sig).call()
         )
@@ -161,27 +193,299 @@ class ConditionControl:
 class If(ConditionControl):
     def __init__(self, condition: Condition):
         super().__init__(
-            ConditionControl._write_if, condition
+            ConditionControl._write_if, condition, 'if'
         )
 
 class Elif(ConditionControl):
     def __init__(self, condition: Condition):
         super().__init__(
-            ConditionControl._write_elif, condition
+            ConditionControl._write_elif, condition, 'elif'
         )
 
 class Else(ConditionControl):
     def __init__(self):
         super().__init__(
-            ConditionControl._write_else, None
+            ConditionControl._write_else, None, 'else'
         )
 
+# (low, high, signature) covering low..high, None bounds are unbounded and
+# a None signature runs nothing
+_Interval: TypeAlias = tuple[int | None, int | None, str | None]
+
+class Switch:
+    """按整数的值选择分支执行。
+
+    ```
+    with Switch(state):
+        with Case(0): ...
+        with Case(range(1, 4)): ...
+        with Default(): ...
+    ```
+
+    每个`Case`编译为独立的函数，离开`Switch`时写出分派函数：各分支的取值范围按顺序
+    构成一棵平衡的二叉查找树，每个节点以`execute if score ... matches ..<b> run return
+    run function`进入左子树，查找的深度为O(log n)。`jump_table`为真时改为按值生成
+    表项函数，以宏命令直接调用与值同名的表项，适用于取值稠密的情形。
+
+    只会执行一个分支。分支中的`Break`与`Continue`作用于外层的循环。
+    """
+    _value: Integer
+    _jump_table: bool
+    _cases: list[_Interval]
+    _default: str | None
+    _temporary: bool
+
+    # innermost last, for Case to find its Switch
+    _stack: list['Switch'] = []
+
+    # intervals written as plain tests instead of a further split
+    LEAF_SIZE = 4
+
+    def __init__(self, value: Integer, jump_table: bool = False):
+        if not isinstance(value, Integer):
+            console.error(
+                MCFTypeError(
+                    "Can not use {} as the value for Switch.", type(value)
+                )
+            )
+            value = Integer(0)
+        self._value = value
+        self._jump_table = jump_table
+        self._cases = []
+        self._default = None
+        self._temporary = MCF._context.get(value._mcf_id, None) is None
+
+    def __enter__(self) -> Self:
+        Switch._stack.append(self)
+        MCF._context_type.append('switch')
+        MCF._last_ctx_type = 'norm'
+        MCF.beginSignals()
+        return self
+
+    def __exit__(self, type, value, traceback) -> None:
+        signals = MCF.endSignals()
+        Switch._stack.pop()
+        MCF._last_ctx_type = MCF._context_type.pop()
+        if self._cases or self._default is not None:
+            path, sig = MCF.makeFunction()
+            MCF.forward(path)
+            if self._jump_table: self._write_table()
+            else: self._write_tree(self._intervals())
+            MCF.rewind()
+            Function(sig).call()
+        _check_signals(signals, 1)
+        # remove temporary value
+        if self._temporary: del self._value
+
+    def _add(self, low: int | None, high: int | None, sig: str) -> None:
+        """登记一个分支，`low`为`None`时为`Default`"""
+        if low is None:
+            if self._default is not None:
+                console.error(
+                    MCFSyntaxError("Switch can only have one Default.")
+                )
+            self._default = sig
+            return
+        for case in self._cases:
+            if low <= case[1] and case[0] <= high:
+                console.error(
+                    MCFValueError(
+                        f"Case {low}..{high} overlaps with Case {case[0]}..{case[1]}."
+                    )
+                )
+                return
+        self._cases.append((low, high, sig))
+
+    def _intervals(self) -> list[_Interval]:
+        """按顺序覆盖全部整数的区间，分支之间与之外的部分属于`Default`"""
+        intervals = []
+        last = None
+        for low, high, sig in sorted(self._cases):
+            if last is None or low > last + 1:
+                intervals.append((
+                    None if last is None else last + 1, low - 1, self._default
+                ))
+            intervals.append((low, high, sig))
+            last = high
+        intervals.append((None if last is None else last + 1, None, self._default))
+        # adjacent ranges running the same function need one test only
+        merged = []
+        for interval in intervals:
+            if merged and merged[-1][2] == interval[2]:
+                merged[-1] = (merged[-1][0], interval[1], interval[2])
+            else:
+                merged.append(interval)
+        return merged
+
+    def _write_tree(self, intervals: list[_Interval]) -> None:
+        """在当前函数中写出`intervals`的查找树，`intervals`按顺序覆盖全部整数。
+
+        每次将剩余的区间二等分，左半部分由子函数处理，右半部分留在当前函数中继续二分，
+        因此任意值经过的判断不超过O(log n)次。
+        """
+        while len(intervals) > Switch.LEAF_SIZE:
+            middle = len(intervals) // 2
+            left, intervals = intervals[:middle], intervals[middle:]
+            path, sig = MCF.makeFunction()
+            self._test(left[-1][1]).run(
+                ReturN().run(Function(sig).call())
+            )
+            MCF.forward(path)
+            self._write_tree(left)
+            MCF.rewind()
+        for _, high, target in intervals[:-1]:
+            self._leaf(self._test(high), target)
+        self._leaf(None, intervals[-1][2])
+
+    def _test(self, high: int) -> Execute:
+        # lower bounds are excluded by the tests before
+        return Execute().condition('if').score_matches(
+            self._value._mcf_id, MCF.sb_general, None, high
+        )
+
+    @staticmethod
+    def _leaf(execute: Execute | None, target: str | None) -> None:
+        """`execute`成立时执行`target`并返回，`execute`为`None`时无条件执行"""
+        if execute is None:
+            if target is None: ReturN().value(0)
+            else: ReturN().run(Function(target).call())
+        elif target is None:
+            execute.run(ReturN().value(0))
+        else:
+            execute.run(ReturN().run(Function(target).call()))
+
+    def _write_table(self) -> None:
+        """写出跳转表：范围之外的值执行`Default`，范围之内的值以宏命令调用同名的表项"""
+        cases = sorted(self._cases)
+        if not cases:
+            Switch._leaf(None, self._default)
+            return
+        low, high = cases[0][0], cases[-1][1]
+        Switch._leaf(
+            Execute().condition('unless').score_matches(
+                self._value._mcf_id, MCF.sb_general, low, high
+            ),
+            self._default
+        )
+        table = MCF.getFID()
+        for index in range(low, high + 1):
+            path, _ = MCF.makeFunction(f"emcf/{table}/{index}")
+            MCF.forward(path)
+            target = self._default
+            for case in cases:
+                if case[0] <= index <= case[1]:
+                    target = case[2]
+                    break
+            Switch._leaf(None, target)
+            MCF.rewind()
+        path, sig = MCF.makeFunction()
+        MCF.forward(path)
+        ReturN(macro=True).run(
+            Function(f"{MCF._namespace}:emcf/{table}/$(m0)").call()
+        )
+        MCF.rewind()
+        Execute().store('result').storage(MCF.storage, "call.m0", 'int', 1.0).run(
+            ScoreBoard.players_get(self._value._mcf_id, MCF.sb_general)
+        )
+        ReturN().run(
+            Function(sig).with_args(Data.storage(MCF.storage), "call")
+        )
+
+class Case:
+    """`Switch`的分支，`value`为整数或步长为1的`range`"""
+    _low: int | None
+    _high: int | None
+    _func_path: str
+    _func_sig: str
+
+    def __init__(self, value: int | range):
+        self._low = self._high = None
+        if isinstance(value, bool) or not isinstance(value, (int, range)):
+            console.error(
+                MCFTypeError(
+                    "Case expects an int or a range, not {}", type(value)
+                )
+            )
+        elif isinstance(value, int):
+            self._low = self._high = value
+        elif value.step != 1 or len(value) == 0:
+            console.error(
+                MCFValueError(
+                    f"Case expects a non-empty range with step 1, not {value}"
+                )
+            )
+        else:
+            self._low, self._high = value[0], value[-1]
+        self._func_path, self._func_sig = MCF.makeFunction()
+
+    def _register(self, switch: Switch) -> None:
+        if self._low is not None:
+            switch._add(self._low, self._high, self._func_sig)
+
+    def __enter__(self) -> Self:
+        if MCF._context_type[-1] != 'switch':
+            console.error(
+                MCFSyntaxError(
+                    f"{type(self).__name__} used out of a Switch context."
+                )
+            )
+        else:
+            self._register(Switch._stack[-1])
+        MCF.forward(self._func_path)
+        MCF._context_type.append('case')
+        MCF._last_ctx_type = 'norm'
+        MCF.beginSignals()
+        return self
+
+    def __exit__(self, type, value, traceback) -> None:
+        MCF.endSignals()
+        MCF._last_ctx_type = MCF._context_type.pop()
+        # the dispatch stops only when the branch returns
+        ReturN().value(1)
+        MCF.rewind()
+
+class Default(Case):
+    """`Switch`中其他`Case`均不匹配时执行的分支"""
+
+    def __init__(self):
+        self._low = self._high = None
+        self._func_path, self._func_sig = MCF.makeFunction()
+
+    def _register(self, switch: Switch) -> None:
+        switch._add(None, None, self._func_sig)
+
+class Scope:
+    """变量作用域。
+
+    作用域内创建的storage变量（`Float`、`Text`、`ArrayList`等）储存在同一个复合标签
+    `mem.<frame>`下，离开作用域时以一条`data remove`全部清除，而不是在各个变量析构时
+    分别清除，因此这些变量在离开作用域后不可再使用。作用域可以嵌套，内层作用域的
+    复合标签位于外层之下。
+
+    `MCFunction`的函数体与各循环的循环体会自动使用作用域。
+
+    - `isolated`: 是否不位于外层作用域之下，用于函数体
+    """
+    _isolated: bool
+
+    def __init__(self, isolated: bool = False):
+        self._isolated = isolated
+
+    def __enter__(self) -> Self:
+        MCF.enterScope(self._isolated)
+        return self
+
+    def __exit__(self, type, value, traceback) -> None:
+        MCF.exitScope()
+
 class While:
     _used: bool
     _have_with: bool
     _redirect: _MultiCollector
     _old_redirect: Any
     _condition: Condition
+    _fused: bool
+    _checks: _LoopChecks
     _context_temp: dict[str, Any]
     _control_func_path: str
     _control_func_sig: str
@@ -190,6 +494,8 @@ class While:
     _temporary: bool
 
     def __init__(self):
+        # the condition is evaluated again after every iteration
+        MCF.enterLoop()
         self._redirect = _MultiCollector()
         self._used = False
         self._have_with = False
@@ -216,20 +522,8 @@ class While:
         
         # forward to loop entry
         MCF.forward(self._control_func_path)
-        # check terminate flg
-        Execute().condition('if').score_matches(
-            MCF.TERMINATE, MCF.sb_sys, 1, 1
-        ).run(
-            ReturN().value(0)
-        )
-        # reset loop skip flg
-        ScoreBoard.players_set(MCF.LOOP_CONT, MCF.sb_sys, 0)
-        # check exit flg
-        Execute().condition('if').score_matches(
-            MCF.LOOP_EXIT, MCF.sb_sys, 1, 1
-        ).run(
-            ReturN().value(0)
-        )
+        # check terminate & exit flg, reset loop skip flg
+        self._checks = _LoopChecks()
         MCF.redirect(self._redirect)
 
     def __call__(self, condition: Condition) -> Self:
@@ -247,8 +541,16 @@ class While:
             self._temporary = True
         # write logic expression update
         for cmd in self._redirect._buffer_list:
-            MCF.write(cmd, False)
+            MCF.command(toCommand(cmd))
         # check condition, call main body
+        self._fused = MCF.isLatest(condition._mcf_id)
+        if self._fused:
+            # test the comparison once, before the body changes what it reads
+            condition._test(negate=True)(Execute()).run(
+                ReturN().value(0)
+            )
+            Function(self._main_sig).call()
+            return self
         Execute().condition('if').score_matches(
             condition._mcf_id, MCF.sb_general, 1, 1
         ).run(
@@ -272,22 +574,37 @@ class While:
 
     def __enter__(self) -> Self:
         MCF.forward(self._main_path)
+        # 循环体的作用域在循环结束后才清除，每次迭代不需要额外的命令
+        MCF.enterScope(keep_live=True)
         MCF._context_type.append('loop')
         MCF._last_ctx_type = 'norm'
+        MCF.beginSignals()
         return self
 
     def __exit__(self, type, value, traceback) -> None:
         self._have_with = True
+        signals = MCF.endSignals((MCF.TERMINATE,))
         MCF._last_ctx_type = MCF._context_type.pop()
         # return to entry
         MCF.rewind()
-        Execute().condition('if').score_matches(
-            self._condition._mcf_id, MCF.sb_general, 1, 1
-        ).run(
+        if self._fused:
+            # reached only when the condition held before the body
             Function(self._control_func_sig).call()
-        )
+        else:
+            Execute().condition('if').score_matches(
+                self._condition._mcf_id, MCF.sb_general, 1, 1
+            ).run(
+                Function(self._control_func_sig).call()
+            )
+        if self._temporary and MCF.isDeferred(self._condition._mcf_id):
+            # never read, release it while its assignment can still be dropped
+            del self._condition
+            self._temporary = False
+        self._checks.settle(signals)
         # return to outer context
         MCF.rewind()
+        MCF.exitLoop()
+        MCF.exitScope()
         # remove temporary condition variable
         if self._temporary: del self._condition
         # recover loop stack
@@ -299,19 +616,28 @@ class While:
         )
         Data.storage(MCF.storage).remove("loop_stack[-1]")
         # check terminate flg
-        Execute().condition('if').score_matches(
-            MCF.TERMINATE, MCF.sb_sys, 1, 1
-        ).run(
-            ReturN().value(0)
-        )
+        _check_signals(signals, 0, (MCF.TERMINATE,))
 
 class Range:
-    
+    """整数区间上的循环，参数与Python的`range`相同。
+
+    步长在编译期已知时，控制函数只需按一个方向比较下标。起点、终点与步长均为Python
+    整数时循环的次数在编译期已知：次数不超过配置项`unroll`时循环被完全展开，每份循环
+    体中的下标都是编译期常量；否则运行时的每轮迭代依次执行`unroll_factor`份循环体，
+    不足一轮的迭代先以常量下标展开。展开的循环体会多次执行其Python代码。
+    """
     _used: bool
     _index: Integer
     _step: Integer
     _last: Integer
     _positive: Condition
+    _stride: int | None
+    _bounds: range | None
+    _peeled: int
+    _plan: list[int | None]
+    _copies: list[tuple[FunctionHandle, set[str]]]
+    _index_set: DeferredCommand
+    _checks: _LoopChecks
     _context: tuple[str]
     _control_path: str
     _control_sig: str
@@ -337,19 +663,36 @@ class Range:
                 )
                 return Integer(0)
 
-        self._positive = Condition(True)
+        if not 1 <= len(args) <= 3:
+            console.error(
+                MCFValueError(
+                    f"Range expects 1, 2 or 3 arguments, not {len(args)}"
+                )
+            )
+            args = (0,)
         if len(args) == 1:
-            self._index = _type_reduction(0)
-            self._last = _type_reduction(args[0])
-            self._step = _type_reduction(1)
-        elif len(args) == 2:
-            self._index = _type_reduction(args[0])
-            self._last = _type_reduction(args[1])
-            self._step = _type_reduction(1)
-        elif len(args) == 3:
-            self._index = _type_reduction(args[0])
-            self._last = _type_reduction(args[1])
-            self._step = _type_reduction(args[2])
+            start, stop, step = 0, args[0], 1
+        else:
+            start, stop, step = (*args, 1)[:3]
+        if isinstance(step, int) and step == 0:
+            console.error(
+                MCFValueError(
+                    "Range step can not be zero."
+                )
+            )
+            step = 1
+        self._stride = step if isinstance(step, int) else None
+        self._bounds = None
+        if isinstance(start, int) and isinstance(stop, int) and self._stride is not None:
+            # every copy of the body assigns the index itself
+            self._bounds = range(start, stop, step)
+            self._index = Integer(None)
+            return
+        self._index = _type_reduction(start)
+        self._last = _type_reduction(stop)
+        if self._stride is None:
+            self._step = _type_reduction(step)
+            self._positive = Condition(True)
             Execute().condition('if').score_matches(
                 self._step._mcf_id, MCF.sb_general, None, -1
             ).run(
@@ -357,12 +700,7 @@ class Range:
                     self._positive._mcf_id, MCF.sb_general, 0
                 )
             )
-        else:
-            console.error(
-                MCFValueError(
-                    f"Range expects 1, 2 or 3 arguments, not {len(args)}"
-                )
-            )
+            self._positive._forget()
 
         self._control_path, self._control_sig = MCF.makeFunction()
         self._main_path, self._main_sig = MCF.makeFunction()
@@ -377,89 +715,236 @@ class Range:
             )
 
     def __iter__(self) -> Self:
-        # save to loop stack
-        Data.storage(MCF.storage).modify_set("register").value(r"{}")
-        ScoreBoard.to_storage(
-            "register.exit", MCF.LOOP_EXIT, MCF.sb_sys, 1.0, 'byte'
-        )
-        ScoreBoard.to_storage(
-            "register.skip", MCF.LOOP_CONT, MCF.sb_sys, 1.0, 'byte'
-        )
-        Data.storage(MCF.storage).modify_append("loop_stack").via(
-            Data.storage(MCF.storage), "register"
-        )
-        # reset loop exit flg
-        ScoreBoard.players_set(MCF.LOOP_EXIT, MCF.sb_sys, 0)
+        if self._bounds is not None:
+            count = len(self._bounds)
+            if count <= MCF._unroll:
+                self._peeled, rounds = count, 0
+            else:
+                self._peeled, rounds = count % MCF._unroll_factor, count // MCF._unroll_factor
+            self._plan = list(self._bounds[:self._peeled])
+            if rounds: self._plan.extend([None] * MCF._unroll_factor)
+            self._copies = []
+            MCF.enterScope(keep_live=True)
+            MCF._context_type.append('loop')
+            return self
+        MCF.enterLoop()
+        Range._save_loop_stack()
         # entry
         Function(self._control_sig).call()
         MCF.forward(self._control_path)
-        # check terminate flg
-        Execute().condition('if').score_matches(
-            MCF.TERMINATE, MCF.sb_sys, 1, 1
-        ).run(
-            ReturN().value(0)
-        )
-        # check break flg
-        Execute().condition('if').score_matches(
-            MCF.LOOP_EXIT, MCF.sb_sys, 1, 1
-        ).run(
-            ReturN().value(0)
-        )
-        ScoreBoard.players_set(MCF.LOOP_CONT, MCF.sb_sys, 0)
-        Execute().condition('if').score_matches(
-            self._positive._mcf_id, MCF.sb_general, 1, 1
-        ).condition('if').score_compare(
-            self._index._mcf_id, MCF.sb_general, ">=",
-            self._last._mcf_id, MCF.sb_general
-        ).run(
-            ReturN().value(1)
-        )
-        Execute().condition('if').score_matches(
-            self._positive._mcf_id, MCF.sb_general, 0, 0
-        ).condition('if').score_compare(
-            self._index._mcf_id, MCF.sb_general, "<=",
-            self._last._mcf_id, MCF.sb_general
-        ).run(
-            ReturN().value(1)
-        )
+        # check terminate & break flg, reset loop skip flg
+        self._checks = _LoopChecks()
+        if self._stride is not None:
+            Execute().condition('if').score_compare(
+                self._index._mcf_id, MCF.sb_general, ">=" if self._stride > 0 else "<=",
+                self._last._mcf_id, MCF.sb_general
+            ).run(
+                ReturN().value(1)
+            )
+        else:
+            Execute().condition('if').score_matches(
+                self._positive._mcf_id, MCF.sb_general, 1, 1
+            ).condition('if').score_compare(
+                self._index._mcf_id, MCF.sb_general, ">=",
+                self._last._mcf_id, MCF.sb_general
+            ).run(
+                ReturN().value(1)
+            )
+            Execute().condition('if').score_matches(
+                self._positive._mcf_id, MCF.sb_general, 0, 0
+            ).condition('if').score_compare(
+                self._index._mcf_id, MCF.sb_general, "<=",
+                self._last._mcf_id, MCF.sb_general
+            ).run(
+                ReturN().value(1)
+            )
         # call main
         Function(self._main_sig).call()
         MCF.forward(self._main_path)
+        MCF.enterScope(keep_live=True)
         MCF._context_type.append('loop')
         MCF._last_ctx_type = 'norm'
+        MCF.beginSignals()
         return self
 
     def __next__(self) -> Integer:
+        if self._bounds is not None:
+            return self._next_copy()
         if self._used:
+            signals = MCF.endSignals((MCF.TERMINATE,))
             # leave
             MCF.rewind()
-            ScoreBoard.players_operation(
-                self._index._mcf_id, MCF.sb_general, "+=",
-                self._step._mcf_id, MCF.sb_general
-            )
+            if self._stride is not None:
+                self._advance()
+            else:
+                ScoreBoard.players_operation(
+                    self._index._mcf_id, MCF.sb_general, "+=",
+                    self._step._mcf_id, MCF.sb_general
+                )
+            self._index._forget()
             Function(self._control_sig).call()
             MCF._last_ctx_type = MCF._context_type.pop()
+            self._checks.settle(signals)
             MCF.rewind()
-            # recover loop stack
-            ScoreBoard.from_storage(
-                "loop_stack[-1].exit", MCF.LOOP_EXIT, MCF.sb_sys, 1.0
-            )
-            ScoreBoard.from_storage(
-                "loop_stack[-1].skip", MCF.LOOP_CONT, MCF.sb_sys, 1.0
-            )
-            Data.storage(MCF.storage).remove("loop_stack[-1]")
+            MCF.exitLoop()
+            MCF.exitScope()
+            Range._restore_loop_stack()
             # do gc
-            del self._index, self._last, self._positive, self._step
+            del self._index, self._last
+            if self._stride is None: del self._positive, self._step
             # check terminate flg
-            Execute().condition('if').score_matches(
-                MCF.TERMINATE, MCF.sb_sys, 1, 1
-            ).run(
-                ReturN().value(0)
-            )
+            _check_signals(signals, 0, (MCF.TERMINATE,))
             raise StopIteration
         self._used = True
         return self._index
 
+    def _next_copy(self) -> Integer:
+        """编译期已知次数的循环：每次迭代将循环体编译为一份暂存的副本，全部编译后由
+        `_write_copies`组装。`_plan`中为`None`的副本属于运行时的一轮迭代。
+        """
+        if self._used:
+            touched = MCF.endTouch()
+            signals = MCF.endSignals((MCF.TERMINATE,))
+            # the assignment of a constant index is dropped once every read has
+            # been folded, except after the last iteration where it may be read
+            self._index_set.active = (
+                touched is None or self._index._mcf_id in touched
+                or len(self._copies) + 1 == len(self._plan)
+            )
+            self._copies.append((MCF.release(), signals))
+        self._used = True
+        if len(self._copies) == len(self._plan):
+            self._write_copies()
+            raise StopIteration
+        value = self._plan[len(self._copies)]
+        if len(self._copies) == self._peeled:
+            # copies with a constant index run once, like straight-line code,
+            # while the copies of a round run repeatedly
+            MCF.enterLoop()
+        MCF.capture()
+        if value is not None:
+            self._index_set = MCF.placeholder(
+                lambda: ScoreBoard.players_set(self._index._mcf_id, MCF.sb_general, value)
+            )
+            self._index._learn(value)
+        else:
+            self._index_set = DeferredCommand()
+        MCF._last_ctx_type = 'norm'
+        MCF.beginSignals()
+        MCF.beginTouch()
+        return self._index
+
+    def _write_copies(self) -> None:
+        """写出各份循环体。
+
+        常量下标的副本直接写入当前函数，其中有`Break`时则写入一个循环函数，`Break`
+        以返回结束该函数。运行时的迭代由控制函数递归调用，每次调用执行一轮，即
+        `unroll_factor`份副本。
+        """
+        MCF._last_ctx_type = MCF._context_type.pop()
+        signals = set().union(*(signals for _, signals in self._copies))
+        jumps = MCF.LOOP_EXIT in signals or MCF.LOOP_CONT in signals
+        peeled = self._copies[:self._peeled]
+        rounds = self._copies[self._peeled:]
+        breaks = any(MCF.LOOP_EXIT in copy_signals for _, copy_signals in peeled)
+        if jumps: Range._save_loop_stack()
+        if breaks:
+            loop_path, loop_sig = MCF.makeFunction()
+            Function(loop_sig).call()
+            MCF.forward(loop_path)
+        for handle, copy_signals in peeled:
+            Range._write_copy(handle, copy_signals)
+        if rounds:
+            self._write_rounds(rounds)
+        if breaks: MCF.rewind()
+        if rounds: MCF.exitLoop()
+        MCF.exitScope()
+        if jumps: Range._restore_loop_stack()
+        del self._index, self._copies
+        if breaks or rounds:
+            _check_signals(signals, 0, (MCF.TERMINATE,))
+        else:
+            # a return in an inlined copy leaves the current function directly
+            MCF.elideChecks(1)
+
+    def _write_rounds(self, rounds: list[tuple[FunctionHandle, set[str]]]) -> None:
+        first = self._bounds[self._peeled]
+        stop = self._bounds.start + len(self._bounds) * self._stride
+        signals = set().union(*(signals for _, signals in rounds))
+        ScoreBoard.players_set(self._index._mcf_id, MCF.sb_general, first)
+        control_path, control_sig = MCF.makeFunction()
+        Function(control_sig).call()
+        MCF.forward(control_path)
+        _check_signals(signals, 0, (MCF.TERMINATE, MCF.LOOP_EXIT))
+        # the last copy ends the round, a continue in it simply leaves the round
+        if MCF.LOOP_CONT in rounds[-1][1]:
+            ScoreBoard.players_set(MCF.LOOP_CONT, MCF.sb_sys, 0)
+        Execute().condition('if').score_matches(
+            self._index._mcf_id, MCF.sb_general,
+            *((stop, None) if self._stride > 0 else (None, stop))
+        ).run(
+            ReturN().value(1)
+        )
+        main_path, main_sig = MCF.makeFunction()
+        Function(main_sig).call()
+        MCF.forward(main_path)
+        for handle, copy_signals in rounds[:-1]:
+            Range._write_copy(handle, copy_signals)
+            self._advance()
+        MCF.splice(rounds[-1][0])
+        MCF.rewind()
+        self._advance()
+        Function(control_sig).call()
+        MCF.rewind()
+
+    @staticmethod
+    def _write_copy(handle: FunctionHandle, signals: set[str]) -> None:
+        """`Continue`以返回结束当前函数，含有`Continue`的副本需要单独的函数"""
+        if MCF.LOOP_CONT not in signals:
+            MCF.splice(handle)
+            return
+        path, sig = MCF.makeFunction()
+        Function(sig).call()
+        MCF.forward(path)
+        MCF.splice(handle)
+        MCF.rewind()
+        _check_signals(signals, 1, (MCF.TERMINATE, MCF.LOOP_EXIT))
+        ScoreBoard.players_set(MCF.LOOP_CONT, MCF.sb_sys, 0)
+
+    def _advance(self) -> None:
+        """将下标增加一个编译期已知的步长"""
+        if self._stride > 0:
+            ScoreBoard.players_add(self._index._mcf_id, MCF.sb_general, self._stride)
+        else:
+            ScoreBoard.players_remove(self._index._mcf_id, MCF.sb_general, -self._stride)
+
+    @staticmethod
+    def _save_loop_stack() -> None:
+        # save to loop stack
+        Data.storage(MCF.storage).modify_set("register").value(r"{}")
+        ScoreBoard.to_storage(
+            "register.exit", MCF.LOOP_EXIT, MCF.sb_sys, 1.0, 'byte'
+        )
+        ScoreBoard.to_storage(
+            "register.skip", MCF.LOOP_CONT, MCF.sb_sys, 1.0, 'byte'
+        )
+        Data.storage(MCF.storage).modify_append("loop_stack").via(
+            Data.storage(MCF.storage), "register"
+        )
+        # reset loop exit flg
+        ScoreBoard.players_set(MCF.LOOP_EXIT, MCF.sb_sys, 0)
+
+    @staticmethod
+    def _restore_loop_stack() -> None:
+        # recover loop stack
+        ScoreBoard.from_storage(
+            "loop_stack[-1].exit", MCF.LOOP_EXIT, MCF.sb_sys, 1.0
+        )
+        ScoreBoard.from_storage(
+            "loop_stack[-1].skip", MCF.LOOP_CONT, MCF.sb_sys, 1.0
+        )
+        Data.storage(MCF.storage).remove("loop_stack[-1]")
+
 
 def Break():
     if 'loop' not in MCF._context_type:
@@ -468,6 +953,7 @@ def Break():
                 "Break used out of a loop context."
             )
         )
+    MCF.raiseSignal(MCF.LOOP_EXIT)
     ReturN().run(
         ScoreBoard.players_set(
             MCF.LOOP_EXIT, MCF.sb_sys, 1
@@ -481,6 +967,7 @@ def Continue():
                 "Continue used out of a loop context."
             )
         )
+    MCF.raiseSignal(MCF.LOOP_CONT)
     ReturN().run(
         ScoreBoard.players_set(
             MCF.LOOP_CONT, MCF.sb_sys, 1
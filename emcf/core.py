@@ -1,12 +1,15 @@
 
 from ._database import *
-from ._exceptions import MCFComponentError
+from ._emission import *
+from ._commands import Command, DeferredCommand
+from ._optimizer import optimizeCommands
+from ._exceptions import MCFComponentError, MCFValueError
 from ._utils import getMultiPaths, console
 from typing import (
     TypeAlias, Any, Literal, TextIO, Callable, Protocol, TypeVarTuple,
     TypedDict, Required
 )
-import os, random, atexit
+import os, re, json, random, atexit, hashlib
 
 __all__ = [
     'MCF',
@@ -17,6 +20,13 @@ EMCF = "a0.2.4"
 
 GCSign: TypeAlias = Literal['shadow', 'norm', 'none']
 
+_NAME = re.compile(r'\w+')
+
+# 'random': Fool ID的字符顺序在每次构建时随机打乱
+# 'stable': 名称由函数的限定名与函数内的生成顺序决定，相同的源码产生相同的输出，
+#           修改一个函数不会改变其他函数的名称
+NamingMode: TypeAlias = Literal['random', 'stable']
+
 class ConfigMap(TypedDict, total=False):
     namespace: Required[str]
     version: Required[Literal[57]]
@@ -24,27 +34,43 @@ class ConfigMap(TypedDict, total=False):
     prefix: str
     gc: bool
     log: bool
+    emitter: EmitterType
+    optimize: bool
+    overflow_check: bool
+    naming: NamingMode
+    archive: str
+    archive_level: int
+    component_cache: str
+    jobs: int
+    tree_shake: bool
+    unroll: int
+    unroll_factor: int
     
 ContextType: TypeAlias = Literal[
-    'norm', 'loop', 'if', 'elif', 'else'
+    'norm', 'loop', 'if', 'elif', 'else', 'switch', 'case'
 ]
 
+BranchState: TypeAlias = Literal['taken', 'none', 'runtime']
+
 MCFVersion: TypeAlias = Literal[1204, 1211]
 
 class FoolID:
     _present: list[int]
     _chars: list[str]
-    def __init__(self):
+    _prefix: str
+    def __init__(self, prefix: str = '', shuffle: bool = True):
         self._present = []
         self._chars = []
+        self._prefix = prefix
 
         self._present = [0]
         for i in range(ord('a'), ord('z')):
             self._chars.append(chr(i))
-        random.shuffle(self._chars)
+        if shuffle:
+            random.shuffle(self._chars)
     
     def get(self) -> str:
-        fid = ''.join([self._chars[idx] for idx in self._present])
+        fid = self._prefix + ''.join([self._chars[idx] for idx in self._present])
         last = len(self._present)
         self._present[last - 1] += 1
         for i in range(last - 1, -1, -1):
@@ -58,6 +84,21 @@ class FoolID:
                     self._present[i - 1] += 1
         return fid
 
+class ScopeFrame:
+    """`Scope`在storage中对应的复合标签`mem.<path>`"""
+    path: str
+    isolated: bool
+    keep_live: bool
+    members: list[str]
+    used: bool
+
+    def __init__(self, path: str, isolated: bool, keep_live: bool):
+        self.path = path
+        self.isolated = isolated
+        self.keep_live = keep_live
+        self.members = []
+        self.used = False
+
 class MCFCore:
     _namespace: str
     _mcf_version: MCFVersion
@@ -66,6 +107,10 @@ class MCFCore:
 
     _operation_stack: list
     _fool_id_generator: FoolID
+    _naming: NamingMode
+    _generators: dict[str, FoolID]
+    _naming_stack: list[tuple[FoolID, dict[type, list[str]], list]]
+    _stable_names: dict[str, str]
     _prefix: str
     _current_io: TextIO
     _io_stack: list[TextIO]
@@ -77,8 +122,34 @@ class MCFCore:
     _context_stack: list[dict[str, Any]]
     _context_type: list[ContextType]
     _last_ctx_type: ContextType
+    _branch_state: BranchState
+    _branch_flag: int
+    _call_generation: int
     _init_helper: list[Callable]
     _func_queue: list[Any]
+    _emitter_type: EmitterType
+    _emitter: FileEmitter | BufferedEmitter | IncrementalEmitter | ArchiveEmitter
+    _archive: str | None
+    _archive_level: int
+    _component_cache: str | None
+    _jobs: int
+    _tree_shake: bool
+    _unroll: int
+    _unroll_factor: int
+    _registers: dict[str, type]
+    _register_pool: dict[type, list[str]]
+    _register_holds: list[list[tuple[type, str]]]
+    _pending_resets: dict[str, Any]
+    _deferred: dict[str, tuple[DeferredCommand, Any, int, bool]]
+    _overwritten: set[str]
+    _serial: int
+    _touch_stack: list[set[str] | None]
+    _signal_stack: list[set[str]]
+    _elided_checks: int
+    _scopes: list[ScopeFrame]
+    _scope_stack: list[list[ScopeFrame]]
+    _scoped: set[str]
+    _released: set[str]
 
     sb_general: str
     sb_sys: str
@@ -86,6 +157,10 @@ class MCFCore:
     database: MCFDataBase
     do_gc: bool
     stop_gc: bool
+    do_log: bool
+    optimize: bool
+    optimize_report: dict[str, int]
+    overflow_check: bool
 
     GENERAL = "reg1"
     BUFFER1 = "reg5"
@@ -95,10 +170,11 @@ class MCFCore:
     BUFFER5 = "reg9"
     BUFFER6 = "re10"
     CALC_CONST = "reg2"
-    COND_LAST = "reg3"
     TERMINATE = "reg4"
     LOOP_EXIT = "re11"
     LOOP_CONT = "re12"
+    # signal registers, in the order they are checked after a block
+    SIGNALS = (TERMINATE, LOOP_EXIT, LOOP_CONT)
 
     def __init__(self):
         self._operation_stack = []
@@ -108,6 +184,10 @@ class MCFCore:
         self._namespace = "default"
         self._prefix = """--- Generated by EMCF ---"""
         self._fool_id_generator = FoolID()
+        self._naming = 'random'
+        self._generators = {}
+        self._naming_stack = []
+        self._stable_names = {}
         self._io_stack = []
         self._current_io = None
         self._component_reg = dict()
@@ -117,11 +197,41 @@ class MCFCore:
         self._context_stack = []
         self._context_type = ['norm']
         self._last_ctx_type = 'norm'
+        self._branch_state = 'runtime'
+        self._branch_flag = 0
+        self._call_generation = 0
         self._init_helper = []
         self._io_redirect = None
         self.do_gc = True
         self.stop_gc = False
+        self.do_log = False
+        self.optimize = False
+        self.optimize_report = {}
+        self.overflow_check = False
         self._func_queue = []
+        self._emitter_type = 'buffer'
+        self._emitter = makeEmitter(self._emitter_type)
+        self._archive = None
+        self._archive_level = 6
+        self._component_cache = None
+        self._jobs = 1
+        self._tree_shake = False
+        self._unroll = 8
+        self._unroll_factor = 4
+        self._registers = {}
+        self._register_pool = {}
+        self._register_holds = []
+        self._pending_resets = {}
+        self._deferred = {}
+        self._overwritten = set()
+        self._serial = 0
+        self._touch_stack = []
+        self._signal_stack = []
+        self._elided_checks = 0
+        self._scopes = []
+        self._scope_stack = []
+        self._scoped = set()
+        self._released = set()
         atexit.register(self._deconstruct)
         console.info(f'EMCF initialized, version: {EMCF}')
 
@@ -146,7 +256,6 @@ data remove storage {self.storage} call
 data remove storage {self.storage} version
 data remove storage {self.storage} frame
 data remove storage {self.storage} stack
-data remove storage {self.storage} cond_stack
 data remove storage {self.storage} loop_stack
 data remove storage {self.storage} register
 data remove storage {self.storage} cache
@@ -159,10 +268,53 @@ data remove storage {self.storage} constants
         # close main io
         MCF.rewind()
 
+        # write all buffered functions
+        self.optimize_report.clear()
+        self._emitter.flush(self._optimize if self.optimize else None)
+        if self.optimize:
+            removed = sum(self.optimize_report.values())
+            console.info(
+                f"Optimizer removed {removed} commands in "
+                f"{len(self.optimize_report)} functions."
+            )
+        if self._elided_checks > 0:
+            console.info(
+                f"Elided {self._elided_checks} control signal checks "
+                "that no block could trigger."
+            )
+
         if not self._final_export:
             self.exportComponents()
+        if isinstance(self._emitter, IncrementalEmitter):
+            saved = self._emitter.finish(self.wk_root)
+            console.info(
+                f"Incremental build: {self._emitter.unchanged} unchanged, "
+                f"{self._emitter.rewritten} rewritten, {self._emitter.deleted} deleted "
+                f"(about {saved * 1000:.1f} ms of writes saved)."
+            )
+        elif isinstance(self._emitter, ArchiveEmitter):
+            self._emitter.finish(json.dumps({
+                "pack": {
+                    "pack_format": self._mcf_version,
+                    "description": self._prefix
+                }
+            }, indent=4))
+            console.info(
+                f"Datapack archived to {self._archive} "
+                f"(compression level {self._emitter.level})."
+            )
         console.summarize()
 
+    def _optimize(self, path: str, content: str) -> str:
+        optimized, removed = optimizeCommands(content, self.storage)
+        if removed > 0:
+            rel = os.path.relpath(path, self.wk_root).removesuffix('.mcfunction')
+            sig = f"{self._namespace}:{rel.replace(os.path.sep, '/')}"
+            self.optimize_report[sig] = removed
+            if self.do_log:
+                console.info(f"Optimized {sig}: removed {removed} commands.")
+        return optimized
+
     def initializeHelper(self, target: Callable) -> None:
         self._init_helper.append(target)
 
@@ -174,6 +326,66 @@ data remove storage {self.storage} constants
         self._dist = cfg_map.get("dist", self._dist)
         self._prefix = cfg_map.get("prefix", self._prefix)
         self.do_gc = cfg_map.get("gc", self.do_gc)
+        self.do_log = cfg_map.get("log", self.do_log)
+        self.optimize = cfg_map.get("optimize", self.optimize)
+        self.overflow_check = cfg_map.get("overflow_check", self.overflow_check)
+        self._naming = cfg_map.get("naming", self._naming)
+        if self._naming not in ('random', 'stable'):
+            console.error(
+                MCFValueError(
+                    f"Unknown naming mode '{self._naming}'."
+                )
+            )
+            self._naming = 'random'
+        self._emitter_type = cfg_map.get("emitter", self._emitter_type)
+        if self._emitter_type not in ('buffer', 'file', 'incremental'):
+            console.error(
+                MCFValueError(
+                    f"Unknown emitter type '{self._emitter_type}'."
+                )
+            )
+            self._emitter_type = 'buffer'
+        self._archive = cfg_map.get("archive", self._archive)
+        self._archive_level = cfg_map.get("archive_level", self._archive_level)
+        self._component_cache = cfg_map.get("component_cache", self._component_cache)
+        self._jobs = cfg_map.get("jobs", self._jobs)
+        self._tree_shake = cfg_map.get("tree_shake", self._tree_shake)
+        if not isinstance(self._jobs, int) or self._jobs < 1:
+            console.error(
+                MCFValueError(
+                    f"Invalid number of jobs '{self._jobs}'."
+                )
+            )
+            self._jobs = 1
+        self._unroll = cfg_map.get("unroll", self._unroll)
+        if not isinstance(self._unroll, int) or self._unroll < 0:
+            console.error(
+                MCFValueError(
+                    f"Invalid unroll limit '{self._unroll}'."
+                )
+            )
+            self._unroll = 8
+        self._unroll_factor = cfg_map.get("unroll_factor", self._unroll_factor)
+        if not isinstance(self._unroll_factor, int) or self._unroll_factor < 1:
+            console.error(
+                MCFValueError(
+                    f"Invalid unroll factor '{self._unroll_factor}'."
+                )
+            )
+            self._unroll_factor = 4
+        if self._archive is not None:
+            if self._emitter_type != 'buffer':
+                console.warn(
+                    f"Emitter '{self._emitter_type}' is ignored when writing to an archive."
+                )
+            self._emitter = ArchiveEmitter(
+                self._archive, self._dist, self._archive_level
+            )
+        else:
+            self._emitter = makeEmitter(
+                self._emitter_type,
+                os.path.join(self._dist, f".emcf_{self._namespace}.json")
+            )
         self._component_reg.clear()
         self._final_export = False
         self._tidied_up = False
@@ -182,6 +394,27 @@ data remove storage {self.storage} constants
         self._context_stack.clear()
         self._context_type = ['norm']
         self._last_ctx_type = 'norm'
+        self._branch_state = 'runtime'
+        self._branch_flag = 0
+        self._call_generation = 0
+        self._registers.clear()
+        self._register_pool.clear()
+        self._register_holds.clear()
+        self._pending_resets.clear()
+        self._deferred.clear()
+        self._overwritten.clear()
+        self._touch_stack.clear()
+        self._signal_stack.clear()
+        self._elided_checks = 0
+        self._generators.clear()
+        self._naming_stack.clear()
+        self._stable_names.clear()
+        if self._naming == 'stable':
+            self._fool_id_generator = FoolID(f"{self._stableName('')}_", False)
+        self._scopes = []
+        self._scope_stack.clear()
+        self._scoped.clear()
+        self._released.clear()
 
         # name defines
         self.sb_general = f"emcf_{self._namespace}"
@@ -195,14 +428,19 @@ data remove storage {self.storage} constants
         path_build = f"{self._dist}/{self._namespace}/function/emcf"
         self.wk_root = f"{self._dist}/{self._namespace}/function"
         self.database._mcf_path = os.path.join(self._dist, self._namespace)
-        os.makedirs(path_build, exist_ok=True)
-        files, _ = getMultiPaths(self.wk_root)
-        for file in files:
-            os.remove(file)
+        self.database._cache_path = self._component_cache
+        # nothing is written to the loose tree when archiving, and the incremental
+        # emitter removes stale files itself after writing
+        if not isinstance(self._emitter, ArchiveEmitter):
+            os.makedirs(path_build, exist_ok=True)
+        if type(self._emitter) in (FileEmitter, BufferedEmitter):
+            files, _ = getMultiPaths(self.wk_root)
+            for file in files:
+                os.remove(file)
 
         # file io
-        self._current_io = open(
-            f"{self.wk_root}/main.mcfunction", 'a', encoding='utf-8'
+        self._current_io = self._emitter.open(
+            f"{self.wk_root}/main.mcfunction"
         )
 
         # component initialize entrance
@@ -217,7 +455,6 @@ data modify storage {self.storage} call set value """ + r"{}" + f"""
 data modify storage {self.storage} frame set value """ + r"{}" + f"""
 data modify storage {self.storage} stack set value []
 data modify storage {self.storage} ret_val set value ""
-data modify storage {self.storage} cond_stack set value []
 data modify storage {self.storage} loop_stack set value []
 data modify storage {self.storage} register set value ""
 data modify storage {self.storage} cache set value """ + r"{}" + f"""
@@ -225,7 +462,6 @@ data modify storage {self.storage} mem set value """ + r"{}" + f"""
 data modify storage {self.storage} constants set value """ + r"{}" + f"""
 scoreboard players set {MCF.GENERAL} {self.sb_sys} 0
 scoreboard players set {MCF.CALC_CONST} {self.sb_sys} 0
-scoreboard players set {MCF.COND_LAST} {self.sb_sys} 0
 scoreboard players set {MCF.TERMINATE} {self.sb_sys} 0
 scoreboard players set {MCF.BUFFER1} {self.sb_sys} 0
 scoreboard players set {MCF.BUFFER2} {self.sb_sys} 0
@@ -243,13 +479,49 @@ function {init_sig}
         for call in self._init_helper: call(self)
         # fill up mc functions paths
         for func_meta in self._func_queue:
+            self.enterNaming(func_meta._qualname)
             func_meta._entry_path, func_meta._entry_sig = MCF.makeFunction()
             func_meta._body_path, func_meta._body_sig = MCF.makeFunction()
+            self.exitNaming()
             func_meta._export_func.__mcfsignature__ = func_meta._entry_sig
 
     def getFID(self) -> str:
         return self._fool_id_generator.get()
 
+    def _stableName(self, key: str) -> str:
+        """由`key`的摘要得到稳定的名称，与其他`key`的名称冲突时加长"""
+        digest = hashlib.sha1(key.encode('utf-8')).digest()
+        letters = [chr(ord('a') + byte % 26) for byte in digest]
+        length = 4
+        name = ''.join(letters[:length])
+        while self._stable_names.setdefault(name, key) != key:
+            length += 1
+            name = ''.join(letters[:length])
+        return name
+
+    def enterNaming(self, key: str) -> None:
+        """进入`key`（函数的限定名）的命名空间，直到对应的`exitNaming`。
+
+        稳定命名模式下，命名空间内生成的名称以`key`的摘要为前缀，并且不复用命名空间
+        之外释放的Fool ID，因此只取决于`key`与函数自身。随机命名模式下名称不变。
+        """
+        self._naming_stack.append(
+            (self._fool_id_generator, self._register_pool, self._register_holds)
+        )
+        if self._naming != 'stable': return
+        generator = self._generators.get(key, None)
+        if generator is None:
+            generator = FoolID(f"{self._stableName(key)}_", False)
+            self._generators[key] = generator
+        self._fool_id_generator = generator
+        self._register_pool = {}
+        self._register_holds = []
+
+    def exitNaming(self) -> None:
+        (
+            self._fool_id_generator, self._register_pool, self._register_holds
+        ) = self._naming_stack.pop()
+
     def makeFunction(self, name: str | None = None) -> tuple[str, str]:
         if name is None:
             name = self._fool_id_generator.get()
@@ -278,7 +550,11 @@ function {init_sig}
                     "maybe it's not exported or does not exist."
                 )
             )
-        signature = f"{self._namespace}:emcf/{self._fool_id_generator.get()}"
+        if self._naming == 'stable':
+            name = self._stableName(func_id)
+        else:
+            name = self._fool_id_generator.get()
+        signature = f"{self._namespace}:emcf/{name}"
         self._component_reg[func_id] = signature
         return signature
 
@@ -290,6 +566,10 @@ function {init_sig}
                 fid = here[here.rfind('/') + 1:]
                 target[cp_id].append(f"{self.wk_root}/emcf/{fid}.mcfunction")
                 target[cp_id].append(here)
+            elif self._naming == 'stable':
+                new_path, fid = self.makeFunction(f"emcf/{self._stableName(cp_id)}")
+                target[cp_id].append(new_path)
+                target[cp_id].append(fid)
             else:
                 new_path, fid = self.makeFunction()
                 target[cp_id].append(new_path)
@@ -300,29 +580,346 @@ function {init_sig}
         console.info("Exporting used components...")
         self.database.writeComponents(
             self._merge_signatures,
-            self._cp_init_path
+            self._cp_init_path,
+            self._emitter.emit,
+            self._emitter.emitFrom,
+            self._jobs,
+            self._emitter.ordered,
+            set(self._component_reg) if self._tree_shake else None
         )
 
     def write(self, command_lines: str, macro: bool) -> None:
-        """向当前函数文件内写入命令"""
+        """向当前函数文件内写入命令文本"""
         prefix = '$' if macro else ''
+        if self._touch_stack and self._touch_stack[-1] is not None:
+            self._touch_stack[-1].update(_NAME.findall(command_lines))
+        if self._deferred:
+            names = _NAME.findall(command_lines)
+            self._readDeferred(None, names)
+            if 'function' in names or 'return' in names: self._escapeDeferred()
+        self._serial += 1
         if self._io_redirect is not None:
             self._io_redirect.write(prefix + command_lines)
         else:
+            if self._pending_resets:
+                # deferred resets must not pass a function call or a return
+                tokens = command_lines.split()
+                if 'function' in tokens or 'return' in tokens:
+                    self._flush_resets()
             self._current_io.write(prefix + command_lines)
 
+    def command(self, command: Command) -> None:
+        """向当前函数文件内写入命令节点，节点在函数写出时才序列化"""
+        if self._touch_stack and self._touch_stack[-1] is not None:
+            self._touch_stack[-1].update(command.names())
+        if self._io_redirect is not None:
+            self._io_redirect.write(command)
+        else:
+            # deferred resets must not pass a function call or a return
+            if self._pending_resets and command.barrier:
+                self._flush_resets()
+            self._current_io.write(command)
+        self._serial += 1
+        if self._deferred:
+            self._readDeferred(command, command.names())
+            if command.barrier: self._escapeDeferred()
+
+    def defer(self, fid: str, writer: Callable[[], Any], escape: bool = False) -> None:
+        """写入只在之后有命令读取`fid`时才生效的命令。
+
+        `writer`写出的命令被收集为一个占位节点写入当前位置。之后写入的命令中出现`fid`时
+        占位节点生效；离开当前函数时仍未释放的`fid`也会使其生效。`fid`在占位节点生效前
+        被释放时不需要清除。
+
+        `escape`表示`fid`可能被已写出的函数读取，之后的函数调用或返回也会使占位节点生效。
+        """
+        deferred = self.placeholder(writer)
+        self._deferred[fid] = (deferred, self._sink(), self._serial, escape)
+
+    def placeholder(self, writer: Callable[[], Any]) -> DeferredCommand:
+        """将`writer`写出的命令收集为一个占位节点写入当前位置，节点的`active`被置为真
+        之后其中的命令才会输出。节点需在离开当前函数之前决定是否生效。
+        """
+        deferred = DeferredCommand()
+        redirect, self._io_redirect = self._io_redirect, deferred
+        writer()
+        self._io_redirect = redirect
+        self.command(deferred)
+        return deferred
+
+    def isLatest(self, fid: str) -> bool:
+        """`fid`的占位命令是否尚未生效，且是当前位置之前最后写入的命令。
+
+        此时`fid`的值与产生它的条件在当前位置等价，可以直接使用该条件而不必读取`fid`。
+        """
+        entry = self._deferred.get(fid, None)
+        return (
+            entry is not None and entry[1] is self._sink()
+            and entry[2] == self._serial
+        )
+
+    def isDeferred(self, fid: str) -> bool:
+        """`fid`的占位命令是否尚未生效"""
+        return fid in self._deferred
+
+    def _sink(self) -> Any:
+        return self._io_redirect if self._io_redirect is not None else self._current_io
+
+    def _readDeferred(self, command: Command | None, names: list[str]) -> None:
+        for name in names:
+            entry = self._deferred.get(name, None)
+            if entry is None: continue
+            if entry[0] is command:
+                # written again, e.g. the condition of a While replayed into its loop
+                self._deferred[name] = (command, self._sink(), self._serial, entry[3])
+            else:
+                entry[0].active = True
+                del self._deferred[name]
+
+    def _escapeDeferred(self) -> None:
+        for fid in [fid for fid, entry in self._deferred.items() if entry[3]]:
+            self._deferred.pop(fid)[0].active = True
+
+    def _settleDeferred(self, sink: Any) -> None:
+        for fid in [fid for fid, entry in self._deferred.items() if entry[1] is sink]:
+            self._deferred.pop(fid)[0].active = True
+
     def forward(self, path: str) -> None:
+        self._flush_resets()
         self._io_stack.append(self._current_io)
-        self._current_io = open(path, 'a', encoding='utf-8')
+        self._current_io = self._emitter.open(path)
 
     def rewind(self) -> None:
+        self._flush_resets()
+        # the function may be written out once closed
+        if self._deferred: self._settleDeferred(self._current_io)
         self._current_io.close()
         if len(self._io_stack) <= 0: self._current_io = None
         else: self._current_io = self._io_stack.pop()
 
+    def capture(self) -> None:
+        """之后写入的命令暂存于一个不对应任何文件的句柄，直到对应的`release`"""
+        self._flush_resets()
+        self._io_stack.append(self._current_io)
+        self._current_io = FunctionHandle()
+
+    def release(self) -> FunctionHandle:
+        """结束`capture`并返回暂存的命令，之后可由`splice`写入任意函数"""
+        handle = self._current_io
+        self.rewind()
+        return handle
+
+    def splice(self, handle: FunctionHandle) -> None:
+        """将`release`返回的命令依次写入当前函数"""
+        self._flush_resets()
+        for chunk in handle._chunks:
+            self._current_io.write(chunk)
+        self._serial += 1
+
     def redirect(self, dist: Any | None) -> None:
         self._io_redirect = dist
 
+    def constScope(self) -> tuple[Any, int] | None:
+        """返回当前编译期常量的作用域。
+
+        常量仅在记录它的函数内、且期间没有发生MCFunction调用时可信。输出被重定向时
+        （如`Execute().run`或`While`的条件）命令不一定被执行，此时返回`None`。
+        """
+        if self._io_redirect is not None: return None
+        return (self._current_io, self._call_generation)
+
+    def invalidateConstants(self) -> None:
+        """使当前所有已记录的编译期常量失效"""
+        self._call_generation += 1
+
+    def allocFID(self, kind: type, overwrite: bool) -> str:
+        """为`kind`类型的变量分配Fool ID，优先复用同类型变量已释放的ID。
+
+        `overwrite`表示新变量会立即完整地写入自身，此时若旧变量的清除指令尚未写出，
+        则可以省去这条清除指令。新变量的赋值被延迟且最终没有写出时，释放时仍需清除。
+
+        在作用域内创建的storage变量的ID形如`<frame>.<id>`，位于作用域的复合标签下。
+        """
+        pool = self._register_pool.get(kind, None)
+        fid = pool.pop() if pool else self._fool_id_generator.get()
+        if self._scopes and getattr(kind, '_storage_backed', False):
+            frame = self._scopes[-1]
+            fid = f"{frame.path}.{fid}"
+            frame.members.append(fid)
+            self._scoped.add(fid)
+            for outer in self._scopes: outer.used = True
+        shadow = self._pending_resets.pop(fid, None)
+        if shadow is not None:
+            if overwrite and self._io_redirect is None: self._overwritten.add(fid)
+            else: self._write_reset(shadow)
+        self._registers[fid] = kind
+        return fid
+
+    def freeFID(self, variable: Any, reset: bool) -> None:
+        """释放变量的Fool ID，`reset`表示需要清除变量的值。
+
+        清除指令会延后至下一次函数调用、返回、离开当前函数或ID被复用时写出。在循环内
+        释放的ID直到循环结束才会被复用，因为循环的下一次迭代仍会执行释放前的命令。
+        作用域内的storage变量的清除指令则留到离开作用域时一并处理。
+        """
+        fid = variable._mcf_id
+        kind = self._registers.pop(fid, None)
+        if self._deferred.pop(fid, None) is not None and fid not in self._overwritten:
+            # never written
+            reset = False
+        self._overwritten.discard(fid)
+        if fid in self._released:
+            # already cleared along with its scope
+            self._released.discard(fid)
+            reset = False
+        if reset:
+            if kind is None or self._io_redirect is not None or self._current_io is None:
+                variable.rm()
+            else:
+                shadow = variable.duplicate(None, True)
+                shadow._mcf_id = fid
+                shadow._gc_sign = 'shadow'
+                self._pending_resets[fid] = shadow
+        if kind is None: return
+        fid = fid[fid.rfind('.') + 1:]
+        if self._register_holds:
+            self._register_holds[-1].append((kind, fid))
+        else:
+            self._register_pool.setdefault(kind, []).append(fid)
+
+    def enterLoop(self) -> None:
+        """标记循环的开始，循环内释放的Fool ID暂不复用"""
+        self._register_holds.append([])
+
+    def exitLoop(self) -> None:
+        """标记循环的结束，将循环内释放的Fool ID交还给外层"""
+        held = self._register_holds.pop()
+        if self._register_holds:
+            self._register_holds[-1].extend(held)
+            return
+        for kind, fid in held:
+            self._register_pool.setdefault(kind, []).append(fid)
+
+    def enterScope(self, isolated: bool = False, keep_live: bool = False) -> None:
+        """进入新的作用域。
+
+        - `isolated`: 作用域不位于外层作用域之下，用于函数体
+        - `keep_live`: 离开作用域时保留仍存活的变量，用于循环体
+        """
+        if isolated:
+            self._scope_stack.append(self._scopes)
+            self._scopes = []
+        fid = self._fool_id_generator.get()
+        path = f"{self._scopes[-1].path}.{fid}" if self._scopes else fid
+        self._scopes.append(ScopeFrame(path, isolated, keep_live))
+
+    def exitScope(self) -> None:
+        """离开当前作用域并清除其中的storage变量。
+
+        作用域内的变量以一条`data remove`清除整个复合标签。`keep_live`的作用域中若
+        仍有存活的变量（例如在Python中于循环之后仍被引用），则只清除已析构的变量，
+        存活的变量归入外层作用域。
+        """
+        frame = self._scopes.pop()
+        live = []
+        dead = []
+        for fid in frame.members:
+            self._scoped.discard(fid)
+            if fid in self._registers:
+                if frame.keep_live: live.append(fid)
+                else: self._released.add(fid)
+                continue
+            shadow = self._pending_resets.pop(fid, None)
+            if shadow is not None: dead.append(shadow)
+        if self.do_gc and frame.members:
+            if not live:
+                self.write(f"data remove storage {self.storage} mem.{frame.path}\n", False)
+            else:
+                for shadow in dead:
+                    self._write_reset(shadow)
+        if frame.isolated:
+            self._scopes = self._scope_stack.pop()
+        elif live and self._scopes:
+            self._scopes[-1].members.extend(live)
+            self._scoped.update(live)
+
+    def scopeRoot(self) -> str | None:
+        """返回当前函数体的作用域路径，函数体内未曾创建storage变量时返回`None`"""
+        if not self._scopes or not self._scopes[0].used: return None
+        return self._scopes[0].path
+
+    def _write_reset(self, shadow: Any) -> None:
+        # resets belong to the current function, not to a pending redirect
+        redirect, self._io_redirect = self._io_redirect, None
+        shadow.rm()
+        self._io_redirect = redirect
+
+    def _flush_resets(self) -> None:
+        pending, self._pending_resets = self._pending_resets, {}
+        for fid, shadow in pending.items():
+            if fid in self._scoped:
+                # cleared along with its scope
+                self._pending_resets[fid] = shadow
+            else:
+                self._write_reset(shadow)
+
+    def condFlag(self, depth: int) -> str:
+        """嵌套在第`depth`层分支中的条件链的标志，标志在链中有分支被执行后不为0"""
+        return f"#cond_d{depth}"
+
+    def condDepth(self) -> int:
+        """当前位置所在的分支的嵌套层数"""
+        return sum(1 for kind in self._context_type if kind in ('if', 'elif', 'else'))
+
+    def liveCondDepths(self) -> list[int]:
+        """之后仍可能读取的条件标志的层数：当前位置所在的各层分支，以及当前层之后可能
+        还有`Elif`或`Else`跟随的条件链
+        """
+        depth = self.condDepth()
+        if self._last_ctx_type in ('if', 'elif'): depth += 1
+        return list(range(depth))
+
+    def beginTouch(self) -> None:
+        """开始记录之后写入的命令中出现的名称，用于判断一段函数可能访问的变量"""
+        self._touch_stack.append(set())
+
+    def endTouch(self) -> set[str] | None:
+        """结束记录并返回记录到的名称，无法确定时返回`None`。
+
+        记录的结果同时并入外层的记录中。
+        """
+        touched = self._touch_stack.pop()
+        self.markTouched(touched)
+        return touched
+
+    def markTouched(self, names: set[str] | None) -> None:
+        """将`names`并入当前的记录，`None`表示可能访问任意变量"""
+        if not self._touch_stack or self._touch_stack[-1] is None: return
+        if names is None: self._touch_stack[-1] = None
+        else: self._touch_stack[-1].update(names)
+
+    def beginSignals(self) -> None:
+        """开始记录之后的代码可能置位的信号寄存器（`TERMINATE`、`LOOP_EXIT`与`LOOP_CONT`）"""
+        self._signal_stack.append(set())
+
+    def raiseSignal(self, signal: str) -> None:
+        """记录当前位置会置位信号寄存器`signal`"""
+        if self._signal_stack: self._signal_stack[-1].add(signal)
+
+    def endSignals(self, passed: tuple[str, ...] = SIGNALS) -> set[str]:
+        """结束记录并返回记录到的信号，其中属于`passed`的信号并入外层的记录。
+
+        分支中置位的信号在分支结束后仍需由外层检查；循环在结束时恢复`LOOP_EXIT`与
+        `LOOP_CONT`，函数调用结束时恢复所有信号，因此这些信号不再传递到外层。
+        """
+        signals = self._signal_stack.pop()
+        if self._signal_stack: self._signal_stack[-1].update(signals.intersection(passed))
+        return signals
+
+    def elideChecks(self, count: int) -> None:
+        """记录省去的信号检查数量，在构建结束时报告"""
+        self._elided_checks += count
+
     def addContext(self, variable: Any) -> None:
         shadow = variable.duplicate(None, True)
         shadow._mcf_id = variable._mcf_id
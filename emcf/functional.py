@@ -1,11 +1,12 @@
 
 from .core import MCF
-from ._exceptions import MCFTypeError, MCFSyntaxError
+from ._exceptions import MCFTypeError, MCFSyntaxError, MCFValueError
 from .types import *
+from .control import Scope
 from ._writers import *
 from ._utils import console
 from typing import (
-    Callable, TypeVar, Generic,
+    Callable, TypeVar, Generic, Literal,
     Any, get_origin, TypeAlias, Annotated, ParamSpec
 )
 from functools import wraps
@@ -17,6 +18,7 @@ __all__ = [
     'FloatRef',
     'TextRef',
     'ArrayListRef',
+    'CallConvention',
     'MCFunction',
     'Return'
 ]
@@ -40,60 +42,97 @@ FloatRef: TypeAlias = Annotated[Float, Ref]
 TextRef: TypeAlias = Annotated[Text, Ref]
 ArrayListRef: TypeAlias = Annotated[ArrayList, Ref]
 
+# 'static': 参数在调用处被复制到函数固定的存储位置，入口不含宏命令
+# 'macro': 参数以Fool ID的形式通过`with storage`传入，由入口的宏命令收集
+# 'auto': 由编译器决定，目前所有可传入的类型均可静态复制，因此等同于'static'
+CallConvention: TypeAlias = Literal['auto', 'static', 'macro']
+
 # default argument value is not supported at present
 
-def push_stack() -> None:
+def push_stack(
+    spill: list[MCFVariable] | None = None,
+    stacks: bool = True,
+    flags: list[int] | None = None
+) -> list[int]:
+    """保存当前上下文，返回保存的条件标志的层数，用于对应的`pop_stack`。
+
+    - `spill`: 需要保存的变量，为`None`时保存上下文中的所有变量
+    - `stacks`: 是否保存`loop_stack`
+    - `flags`: 需要保存的条件标志的层数，为`None`时保存所有仍可能被读取的条件标志
+    """
+    # the callee may write to any variable
+    MCF.invalidateConstants()
+    if spill is None:
+        # an unknown callee makes the present function unknown to its callers
+        MCF.markTouched(None)
+        spill = MCF._context.values()
     index = 0
-    for var in MCF._context.values():
+    for var in spill:
         var.move(f"frame.m{index}")
         index += 1
     # 保存栈帧
-    Data.storage(MCF.storage).modify_set("frame.cond_stack").via(
-        Data.storage(MCF.storage), "cond_stack"
-    )
+    if flags is None:
+        flags = MCF.liveCondDepths()
+    for depth in flags:
+        ScoreBoard.to_storage(
+            f"frame.cond_d{depth}", MCF.condFlag(depth), MCF.sb_sys, 1.0, 'byte'
+        )
     Execute().store('result').storage(
         MCF.storage, "frame.terminate", 'byte', 1.0
     ).run(
         ScoreBoard.players_get(MCF.TERMINATE, MCF.sb_sys)
     )
-    Data.storage(MCF.storage).modify_set("frame.loop_stack").via(
-        Data.storage(MCF.storage), "loop_stack"
-    )
+    if stacks:
+        Data.storage(MCF.storage).modify_set("frame.loop_stack").via(
+            Data.storage(MCF.storage), "loop_stack"
+        )
     Data.storage(MCF.storage).modify_append("stack").via(
         Data.storage(MCF.storage), "frame"
     )
     Data.storage(MCF.storage).modify_set("frame").value(r"{}")
     MCF._context_stack.append(MCF._context.copy())
     MCF._context.clear()
+    return flags
 
-def new_stack() -> None:
+def new_stack(stacks: bool = True) -> None:
     # 于此添加更多的栈帧默认值
-    Data.storage(MCF.storage).modify_set("cond_stack").value("[]")
-    Data.storage(MCF.storage).modify_set("loop_stack").value("[]")
+    if stacks:
+        Data.storage(MCF.storage).modify_set("loop_stack").value("[]")
     ScoreBoard.players_set(MCF.TERMINATE, MCF.sb_sys, 0)
 
-def pop_stack() -> None:
+def pop_stack(
+    spill: list[MCFVariable] | None = None,
+    stacks: bool = True,
+    flags: list[int] | None = None
+) -> None:
+    """恢复由`push_stack`保存的上下文，参数需与对应的`push_stack`一致，`flags`为其返回值"""
     MCF._context = MCF._context_stack.pop()
     Data.storage(MCF.storage).modify_set("frame").via(
         Data.storage(MCF.storage), "stack[-1]"
     )
     Data.storage(MCF.storage).remove("stack[-1]")
     # 恢复更多信号寄存器
-    Data.storage(MCF.storage).modify_set("cond_stack").via(
-        Data.storage(MCF.storage), "frame.cond_stack"
-    )
+    for depth in flags or ():
+        ScoreBoard.from_storage(
+            f"frame.cond_d{depth}", MCF.condFlag(depth), MCF.sb_sys, 1.0
+        )
     Execute().store('result').score(MCF.TERMINATE, MCF.sb_sys).run(
         Data.storage(MCF.storage).get("frame.terminate", 1.0)
     )
-    Data.storage(MCF.storage).modify_set("loop_stack").via(
-        Data.storage(MCF.storage), "frame.loop_stack"
-    )
+    if stacks:
+        Data.storage(MCF.storage).modify_set("loop_stack").via(
+            Data.storage(MCF.storage), "frame.loop_stack"
+        )
+    if spill is None:
+        spill = MCF._context.values()
     index = 0
-    for var in MCF._context.values():
+    for var in spill:
         var.collect(f"frame.m{index}")
         index += 1
 
 Ret = TypeVar('Ret', bound=MCFVariable)
+# 正在导出的函数声明的返回类型，`Return`据此检查返回值
+_ret_types: list[type[MCFVariable]] = []
 _P = ParamSpec('_P')
 class MCFunction(Generic[Ret]):
     _entry_path: str
@@ -108,11 +147,25 @@ class MCFunction(Generic[Ret]):
     _ref_args: dict[str, MCFVariable]
     _collected: list[MCFVariable]
     _export_func: Callable
+    _qualname: str
+    _touched: set[str] | None
+    _stacks: bool
+    _convention: Literal['static', 'macro']
+    _params: list[MCFVariable]
 
     def __init__(
         self,
-        ret_type: type[Ret] = FakeNone
+        ret_type: type[Ret] = FakeNone,
+        convention: CallConvention = 'auto'
     ):
+        if convention not in ('auto', 'static', 'macro'):
+            console.error(
+                MCFValueError(
+                    "Unknown calling convention: {}", convention
+                )
+            )
+            convention = 'auto'
+        self._convention = 'macro' if convention == 'macro' else 'static'
         self._ret_addr = MCF.getFID()
         self._exported = False
         self._ret_type = ret_type
@@ -120,6 +173,17 @@ class MCFunction(Generic[Ret]):
         self._context = {}
         self._ref_args = {}
         self._collected = []
+        self._touched = None
+        self._stacks = True
+        self._params = []
+
+    def _construct_param(self, arg: MCFVariable, index: int) -> MCFVariable:
+        if self._convention == 'macro':
+            return arg.macro_construct(f"m{index}", self._input_addr[index])
+        # 调用者已将参数复制到固定位置，入口无需收集
+        new: MCFVariable = type(arg)(init_val=None, void=True)
+        new._mcf_id = self._input_addr[index]
+        return new
 
     def _collect_params(self, args: tuple[object]) -> tuple[MCFVariable]:
         collected = []
@@ -127,16 +191,12 @@ class MCFunction(Generic[Ret]):
         for arg in args:
             if isinstance(arg, Ref):
                 arg: MCFVariable = arg._wrapped
-                new: MCFVariable = arg.macro_construct(
-                    f"m{index}", self._input_addr[index]
-                )
+                new: MCFVariable = self._construct_param(arg, index)
                 collected.append(new)
                 index += 1
                 self._ref_args[new._mcf_id] = arg
             elif isinstance(arg, MCFVariable):
-                new: MCFVariable = arg.macro_construct(
-                    f"m{index}", self._input_addr[index]
-                )
+                new: MCFVariable = self._construct_param(arg, index)
                 collected.append(new)
                 index += 1
             else:
@@ -148,7 +208,89 @@ class MCFunction(Generic[Ret]):
                 return args
         return tuple(collected)
 
+    def _convertible(self, args: tuple[object]) -> bool:
+        for arg in args:
+            if isinstance(arg, Ref):
+                arg = arg._wrapped
+            if not isinstance(arg, MCFVariable):
+                return False
+        return True
+
+    def _export(self, func: Callable, args: tuple[object]) -> None:
+        """导出函数的入口与函数体，同时记录函数可能访问的名称"""
+        self._exported = True
+        # the caller may be in the middle of an if/elif chain
+        chain = MCF._last_ctx_type, MCF._branch_state, MCF._branch_flag
+        MCF.enterNaming(self._qualname)
+        # 函数体内不可见调用者的上下文
+        MCF._context_stack.append(MCF._context)
+        MCF._context = {}
+        MCF.beginTouch()
+        MCF.forward(self._entry_path)
+        collected = self._collect_params(args)
+
+        # 储存为函数上下文
+        for var in collected:
+            var._gc_sign = 'shadow'
+            self._context[var._mcf_id] = var
+        self._params = list(collected)
+
+        # 更新当前上下文
+        MCF._context.update(self._context)
+        MCF.beginTouch()
+        MCF.forward(self._body_path)
+        # the caller restores every signal register after the call
+        MCF.beginSignals()
+        _ret_types.append(self._ret_type)
+        with Scope(isolated=True):
+            func(*collected)
+        _ret_types.pop()
+        MCF.endSignals(())
+        MCF.rewind()
+        body = MCF.endTouch()
+        self._stacks = body is None or 'loop_stack' in body
+        new_stack(self._stacks)
+        Function(self._body_sig).call()
+
+        # update collected & gc
+        for var in collected:
+            src = self._ref_args.get(var._mcf_id, None)
+            if src is not None:
+                self._collected.append(var)
+            else:
+                if MCF.do_gc:
+                    var.rm()
+
+        MCF.rewind()
+        self._touched = MCF.endTouch()
+        MCF._context = MCF._context_stack.pop()
+        MCF.exitNaming()
+        MCF._last_ctx_type, MCF._branch_state, MCF._branch_flag = chain
+
+    def _call_convention(self) -> tuple[list[MCFVariable] | None, bool, list[int]]:
+        """返回调用时需要保存的变量（`None`为全部）、是否需要保存信号栈以及需要保存的
+        条件标志的层数。
+
+        函数在导出时记录了其命令中出现的所有名称，只有出现在其中的变量与条件标志才可能
+        被函数修改。递归调用时函数尚未导出完毕，此时需要保存全部的上下文。
+        """
+        flags = MCF.liveCondDepths()
+        if self._touched is None:
+            return None, True, flags
+        # 作用域内的变量也会随其所在的复合标签一同被访问
+        spill = [
+            var for var in MCF._context.values()
+            if any(name in self._touched for name in var._mcf_id.split('.'))
+        ]
+        # touched names are words, the flag without its leading '#'
+        flags = [
+            depth for depth in flags if MCF.condFlag(depth)[1:] in self._touched
+        ]
+        return spill, self._stacks, flags
+
     def _export_params(self, args: tuple[object]) -> bool:
+        if self._convention == 'static':
+            return self._copy_params(args)
         index = 0
         for arg in args:
             if isinstance(arg, Ref):
@@ -169,6 +311,37 @@ class MCFunction(Generic[Ret]):
                 return False
         return True
 
+    def _copy_params(self, args: tuple[object]) -> bool:
+        """将参数复制到函数固定的参数位置。
+
+        参数本身可能就是该函数的参数（如递归调用时交换两个参数），此时需先复制到临时
+        变量中，以免在读取之前被覆盖。
+        """
+        values = [arg._wrapped if isinstance(arg, Ref) else arg for arg in args]
+        if not self._convertible(values) or len(values) != len(self._params):
+            return False
+        staged = []
+        temps = []
+        for index, value in enumerate(values):
+            if (
+                value._mcf_id in self._input_addr
+                and value._mcf_id != self._input_addr[index]
+            ):
+                temp = value.duplicate(None, True)
+                temp._mcf_id = MCF.getFID()
+                temp._gc_sign = 'shadow'
+                temp.assign(value)
+                temps.append(temp)
+                value = temp
+            staged.append(value)
+        for param, value in zip(self._params, staged):
+            if param._mcf_id != value._mcf_id:
+                param.assign(value)
+        if MCF.do_gc:
+            for temp in temps:
+                temp.rm()
+        return True
+
     def __call__(self, func: Callable[_P, None]) -> Callable[_P, Ret]:
 
         def early_exit():
@@ -236,14 +409,13 @@ class MCFunction(Generic[Ret]):
 
             # 为每个参数生成一个Fool ID
             if not self._exported:
+                MCF.enterNaming(self._qualname)
                 for _ in range(len(args)):
                     self._input_addr.append(MCF.getFID())
+                MCF.exitNaming()
 
-            # 将当前上下文压入栈中
-            push_stack()
-
-            # 将参数导出到存储中
-            valid = self._export_params(args)
+            # 如果函数未导出，则先导出函数，以便根据函数体决定调用方式
+            valid = self._convertible(args)
             if not valid:
                 console.error(
                     MCFTypeError(
@@ -251,53 +423,42 @@ class MCFunction(Generic[Ret]):
                         func.__name__
                     )
                 )
+            elif not self._exported:
+                self._export(func, args)
 
-            # 如果函数未导出，则导出函数
-            if not self._exported and valid:
-                self._exported = True
-                MCF.forward(self._entry_path)
-                collected = self._collect_params(args)
-
-                # 储存为函数上下文
-                for var in collected:
-                    var._gc_sign = 'shadow'
-                    self._context[var._mcf_id] = var
-                
-                # 更新当前上下文
-                MCF._context.update(self._context)
-                new_stack()
-                Function(self._body_sig).call()
-
-                MCF.forward(self._body_path)
-                func(*collected)
-                MCF.rewind()
-
-                # update collected & gc
-                for var in collected:
-                    src = self._ref_args.get(var._mcf_id, None)
-                    if src is not None:
-                        self._collected.append(var)
-                    else:
-                        if MCF.do_gc:
-                            var.rm()
-
-                MCF.rewind()
+            # 将当前上下文中可能被修改的部分压入栈中
+            spill, stacks, flags = self._call_convention()
+            framed = spill is None or len(spill) > 0 or stacks or len(flags) > 0
+            if framed:
+                push_stack(spill, stacks, flags)
             else:
-                # 更新当前上下文
-                MCF._context.update(self._context)
+                MCF.invalidateConstants()
+            MCF.markTouched(self._touched)
 
-            Function(self._entry_sig).with_args(
-                Data.storage(MCF.storage), "call"
-            )
+            # 将参数导出到存储中
+            self._export_params(args)
+
+            if self._convention == 'static':
+                Function(self._entry_sig).call()
+            else:
+                Function(self._entry_sig).with_args(
+                    Data.storage(MCF.storage), "call"
+                )
+            # 参数位置上的已知常量在调用后不再可信
+            MCF.invalidateConstants()
 
             ret_val = self._ret_type(init_val=None, void=False)
             if isinstance(ret_val, FakeNone):
                 ret_val = None
-                pop_stack()       # 恢复上下文
             else:
                 ret_val.collect("ret_val")
-                pop_stack()           # 恢复上下文
-                MCF.addContext(ret_val)     # 将返回值添加至当前上下文
+            if framed:
+                pop_stack(spill, stacks, flags)     # 恢复上下文
+                if ret_val is not None:
+                    MCF.addContext(ret_val)     # 将返回值添加至当前上下文
+            else:
+                # a call is only reached while not terminating
+                ScoreBoard.players_set(MCF.TERMINATE, MCF.sb_sys, 0)
             
             # update ref
             for var in self._collected:
@@ -309,15 +470,29 @@ class MCFunction(Generic[Ret]):
             return ret_val
         
         self._export_func = wrapper
+        self._qualname = f"{func.__module__}.{func.__qualname__}"
         MCF._func_queue.append(self)
         return wrapper
 
+def _returnable(ret_value: MCFVariable) -> bool:
+    """调用者按声明的返回类型读取返回值，返回列表时其元素的储存方式须与之一致"""
+    if not _ret_types: return True
+    declared = _ret_types[-1]
+    if (
+        isinstance(ret_value, ArrayList) and isinstance(declared, type)
+        and issubclass(declared, ArrayList)
+    ):
+        return declared._check_list(ret_value)
+    return True
+
 def Return(ret_value: MCFVariable = FakeNone()) -> None:
+    MCF.raiseSignal(MCF.TERMINATE)
     if isinstance(ret_value, FakeNone):
         ScoreBoard.players_set(MCF.TERMINATE, MCF.sb_sys, 1)
     elif isinstance(ret_value, MCFVariable):
         ScoreBoard.players_set(MCF.TERMINATE, MCF.sb_sys, 1)
-        ret_value.move("ret_val")
+        if _returnable(ret_value):
+            ret_value.move("ret_val")
     else:
         console.error(
             MCFTypeError(
@@ -326,7 +501,12 @@ def Return(ret_value: MCFVariable = FakeNone()) -> None:
             )
         )
     if MCF.do_gc:
+        # 函数体作用域内的storage变量随作用域一并清除
+        root = MCF.scopeRoot()
+        if root is not None:
+            Data.storage(MCF.storage).remove(f"mem.{root}")
         for shadow in MCF._context.values():
-            if shadow._var_meta == 'norm':
-                shadow.rm()
+            if shadow._var_meta != 'norm': continue
+            if root is not None and shadow._mcf_id.startswith(f"{root}."): continue
+            shadow.rm()
     ReturN().value(1)
@@ -0,0 +1 @@
+$data modify storage __st__ cache.type set from storage __st__ mem.$(m1)[$(m0)]
@@ -0,0 +1 @@
+$execute store result score __gen__ __bd__ run data get storage __st__ mem.$(m1)[$(m0)]
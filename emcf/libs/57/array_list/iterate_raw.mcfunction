@@ -0,0 +1,2 @@
+$execute store success score __gen__ __bd__ run data get storage __st__ mem.$(m0)[$(m1)]
+$data modify storage __st__ register set from storage __st__ mem.$(m0)[$(m1)]
@@ -0,0 +1,2 @@
+$data modify storage __st__ register set from storage __st__ mem.$(m1)[$(m0)]
+$data remove storage __st__ mem.$(m1)[$(m0)]
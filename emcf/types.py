@@ -6,11 +6,14 @@ from .core import MCF, GCSign
 from ._utils import console, iterable
 from ._exceptions import *
 from ._writers import *
+from ._writers import _ExecuteConditionContext, _LoopChecks, _check_signals
 from ._components import builtin_components as built_cps
 from typing import (
     TypeAlias, Any, Union, Self, Literal, Iterable,
     Generic, TypeVar, overload, Optional, Callable
 )
+from fractions import Fraction
+import math, operator
 
 
 __all__ = [
@@ -19,13 +22,16 @@ __all__ = [
     'Condition',
     'Integer',
     'Float',
+    'Fixed',
     'ArrayList',
     'Text',
     'HashMap',
+    'IterationStrategy',
     'TextConvertible',
     'ConditionConvertible',
     'IntegerConvertible',
     'FloatConvertible',
+    'FixedConvertible',
     'HashMapConvertible'
 ]
 
@@ -40,6 +46,10 @@ class MCFVariable:
     _mcf_id: str
     _gc_sign: GCSign
     _var_meta: str
+    _const_value: Any
+    _const_scope: Any
+    # 值储存在storage的`mem.<Fool ID>`处，在`Scope`内创建时归入作用域的复合标签
+    _storage_backed: bool = False
 
     def __init__(self, init_val: Any, void: bool):
         """初始化MCF变量
@@ -49,7 +59,7 @@ class MCFVariable:
 
         当初始值设置为`None`时，将不会做初始的赋值操作。因此，创建一个初始值为`None`
         的MCF变量将不会体现在生成的函数内，但是该变量会被记录至当前的上下文，
-        且会生成Fool ID。
+        且会分配Fool ID。Fool ID可能来自已被回收的同类型变量。
 
         当`void`参数为`True`时，创建的该MCF变量成为“空值”。空值将不会做初始化，不
         创建Fool ID，且不会被记录至当前的上下文。目前空值仅在上下文列表中使用，列表
@@ -57,8 +67,10 @@ class MCFVariable:
         """
         self._var_meta = 'norm'
         self._gc_sign = 'norm' if MCF.do_gc else 'none'
+        self._const_value = None
+        self._const_scope = None
         if not void:
-            self._mcf_id = MCF.getFID()
+            self._mcf_id = MCF.allocFID(type(self), init_val is not None)
             MCF.addContext(self)
             if init_val is not None:
                 self.assign(init_val)
@@ -66,8 +78,7 @@ class MCFVariable:
     def __del__(self) -> None:
         if self._gc_sign != 'shadow':
             MCF.removeContext(self)
-        if self._gc_sign == 'norm' and not MCF.stop_gc:
-            self.rm()
+            MCF.freeFID(self, self._gc_sign == 'norm' and not MCF.stop_gc)
 
     def assign(self, value: Any):
         """将`value`赋值至自身"""
@@ -112,6 +123,22 @@ class MCFVariable:
         """写清除指令，但不将自身移出上下文"""
         raise NotImplementedError
 
+    def _known(self) -> Any | None:
+        """返回变量在当前位置的编译期常量值，未知时返回`None`"""
+        if self._const_scope is None or self._const_scope != MCF.constScope():
+            return None
+        return self._const_value
+
+    def _learn(self, value: Any | None) -> None:
+        """记录变量在当前位置的编译期常量值，`value`为`None`时视为未知"""
+        scope = MCF.constScope() if value is not None else None
+        self._const_value = value if scope is not None else None
+        self._const_scope = scope
+
+    def _forget(self) -> None:
+        self._const_value = None
+        self._const_scope = None
+
     def to_text(self) -> 'Text': ...
 
 
@@ -146,6 +173,9 @@ class FakeNone(MCFVariable):
 ConditionConvertible: TypeAlias = 'Condition | bool'
 class Condition(MCFVariable):
     """布尔值类型"""
+    # the execute condition this value was compared from, see `_compared`
+    _guard: 'tuple[str, Callable[[_ExecuteConditionContext], Execute]] | None' = None
+
     def __init__(
         self,
         init_val: 'ConditionConvertible | None' = False,
@@ -154,18 +184,26 @@ class Condition(MCFVariable):
         super().__init__(init_val, void)
 
     def assign(self, value: ConditionConvertible) -> None:
-        """向布尔值赋值，可使用`Condition`或`bool`类型。"""
+        """向布尔值赋值，可使用`Condition`或`bool`类型。
+
+        赋值为常量时，赋值命令只在之后有命令读取该布尔值时才生效，见`MCF.defer`。
+        """
+        if isinstance(value, Condition) and value._known() is not None:
+            value = value._known()
         if isinstance(value, bool):
-            ScoreBoard.players_set(
-                self._mcf_id,
-                MCF.sb_general,
-                '1' if value else '0'
-            )
+            mcf_id = self._mcf_id
+            MCF.defer(mcf_id, lambda: ScoreBoard.players_set(
+                mcf_id, MCF.sb_general, '1' if value else '0'
+            ), escape=True)
+            # no longer the result of a comparison
+            self._guard = None
+            self._learn(value)
         elif isinstance(value, Condition):
             ScoreBoard.players_operation(
                 self._mcf_id, MCF.sb_general,
                 '=', value._mcf_id, MCF.sb_general
             )
+            self._forget()
         else:
             console.error(
                 MCFTypeError(
@@ -201,6 +239,7 @@ class Condition(MCFVariable):
         ScoreBoard.from_storage(
             src, self._mcf_id, MCF.sb_general, 1.0
         )
+        self._forget()
 
     def extract(self, dist: str) -> None:
         ScoreBoard.to_storage(
@@ -211,9 +250,59 @@ class Condition(MCFVariable):
         ScoreBoard.from_storage(
             src, self._mcf_id, MCF.sb_general, 1.0
         )
+        self._forget()
+
+    @staticmethod
+    def _compared(
+        mode: Literal['if', 'unless'],
+        condition: 'Callable[[_ExecuteConditionContext], Execute]'
+    ) -> 'Condition':
+        """创建值为条件子命令`<mode> <condition>`是否成立的布尔值。
+
+        赋值命令只在之后有命令读取该布尔值时才生效。比较的结果紧接着用作`If`、`Elif`或
+        `While`的条件时，直接使用该条件子命令判断，不需要写出赋值命令。
+        """
+        temp = Condition(None)
+        temp._guard = (mode, condition)
+        mcf_id = temp._mcf_id
+        MCF.defer(mcf_id, lambda: (
+            ScoreBoard.players_set(mcf_id, MCF.sb_general, 0),
+            condition(Execute().condition(mode)).run(
+                ScoreBoard.players_set(mcf_id, MCF.sb_general, 1)
+            )
+        ))
+        return temp
+
+    def _test(self, negate: bool = False) -> Callable[[Execute], Execute]:
+        """返回向`Execute`添加“布尔值为真”（`negate`时为假）条件子命令的函数。
+
+        需要在写出其他命令之前调用，此时由比较得到的布尔值直接使用比较的条件。
+        """
+        if self._guard is not None and MCF.isLatest(self._mcf_id):
+            mode, condition = self._guard
+        else:
+            mode, condition = 'if', lambda context: context.score_matches(
+                self._mcf_id, MCF.sb_general, 1, 1
+            )
+        if negate: mode = 'unless' if mode == 'if' else 'if'
+        return lambda execute: condition(execute.condition(mode))
+
+    @staticmethod
+    def _known_bool(value: ConditionConvertible) -> bool | None:
+        if isinstance(value, bool): return value
+        if isinstance(value, Condition): return value._known()
+        return None
 
     def _and(self, value: ConditionConvertible) -> 'Condition':
         """与另一`Condition`或`bool`做逻辑与操作，返回新布尔值"""
+        left = self._known()
+        right = Condition._known_bool(value)
+        if left is False or right is False:
+            return Condition(False)
+        if right is True:
+            return Condition(self)
+        if left is True and isinstance(value, Condition):
+            return Condition(value)
         temp = Condition(self)
         if isinstance(value, bool):
             if not value:
@@ -242,6 +331,14 @@ class Condition(MCFVariable):
 
     def _or(self, value: ConditionConvertible) -> 'Condition':
         """与另一`Condition`或`bool`做逻辑或操作，返回新布尔值"""
+        left = self._known()
+        right = Condition._known_bool(value)
+        if left is True or right is True:
+            return Condition(True)
+        if right is False:
+            return Condition(self)
+        if left is False and isinstance(value, Condition):
+            return Condition(value)
         temp = Condition(self)
         if isinstance(value, bool):
             if value:
@@ -272,12 +369,19 @@ class Condition(MCFVariable):
 
     def __invert__(self) -> 'Condition':
         """返回值与自身逻辑非后值一致的新布尔值"""
+        known = self._known()
+        if known is not None:
+            return Condition(not known)
         temp = Condition(self)
         self._not(temp._mcf_id)
         return temp
 
     def invert(self) -> None:
         """对自身做逻辑非，无返回值"""
+        known = self._known()
+        if known is not None:
+            self.assign(not known)
+            return
         self._not(self._mcf_id)
 
     def _not(self, this: str) -> None:
@@ -294,6 +398,28 @@ class Condition(MCFVariable):
 # Integer Implementation
 
 IntegerConvertible: TypeAlias = 'Integer | int'
+
+def _int32(value: int) -> int:
+    """按计分板的32位有符号整数溢出规则截断"""
+    return (value + 0x80000000) % 0x100000000 - 0x80000000
+
+_INTEGER_OPERATIONS: dict[str, Callable[[int, int], int]] = {
+    '+': operator.add,
+    '-': operator.sub,
+    '*': operator.mul,
+    '/': operator.floordiv,
+    '%': operator.mod
+}
+
+_COMPARISONS: dict[str, Callable[[Any, Any], bool]] = {
+    '=': operator.eq,
+    '!=': operator.ne,
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge
+}
+
 class Integer(MCFVariable):
 
     def __init__(
@@ -304,18 +430,27 @@ class Integer(MCFVariable):
         super().__init__(init_val, void)
 
     def assign(self, value: 'IntegerConvertible | Float') -> None:
+        if isinstance(value, Integer) and value._known() is not None:
+            value = value._known()
         if isinstance(value, int):
-            ScoreBoard.players_set(self._mcf_id, MCF.sb_general, value)
+            # written only once something reads the value, see `MCF.defer`
+            mcf_id = self._mcf_id
+            MCF.defer(mcf_id, lambda: ScoreBoard.players_set(
+                mcf_id, MCF.sb_general, value
+            ), escape=True)
+            self._learn(value)
         elif isinstance(value, Integer):
             ScoreBoard.players_operation(
                 self._mcf_id, MCF.sb_general, "=",
                 value._mcf_id, MCF.sb_general
             )
+            self._forget()
         elif isinstance(value, Float):
             value.extract("register")
             ScoreBoard.from_storage(
                 "register", self._mcf_id, MCF.sb_general, 1.0
             )
+            self._forget()
         else:
             console.error(
                 MCFTypeError(
@@ -336,6 +471,7 @@ class Integer(MCFVariable):
         ScoreBoard.from_storage(
             src, self._mcf_id, MCF.sb_general, 1.0
         )
+        self._forget()
 
     def extract(self, dist: str, _type: IntegerVariableTypes = 'int') -> None:
         ScoreBoard.to_storage(
@@ -346,6 +482,7 @@ class Integer(MCFVariable):
         ScoreBoard.from_storage(
             src, self._mcf_id, MCF.sb_general, 1.0
         )
+        self._forget()
 
     @staticmethod
     def macro_construct(slot: str, mcf_id: str) -> 'Integer':
@@ -365,10 +502,43 @@ class Integer(MCFVariable):
     ) -> 'Integer':
         return Integer(init_val, void)
 
+    @staticmethod
+    def _known_int(value: IntegerConvertible) -> int | None:
+        if isinstance(value, int): return value
+        if isinstance(value, Integer): return value._known()
+        return None
+
+    @staticmethod
+    def _fold(left: int | None, right: int | None, ops: str) -> int | None:
+        """在编译期计算`left ops right`，无法计算时返回`None`"""
+        if left is None or right is None: return None
+        # division by zero leaves the score untouched at runtime
+        if ops in ('/', '%') and right == 0: return None
+        return _int32(_INTEGER_OPERATIONS[ops](left, right))
+
+    @staticmethod
+    def _operate_constant(mcf_id: str, value: int, ops: str) -> None:
+        """对`mcf_id`做`ops=`常量`value`，加减使用`add`/`remove`，其余经由`CALC_CONST`"""
+        if ops in ('+', '-') and value != -0x80000000:
+            if value == 0: return
+            if (value > 0) == (ops == '+'):
+                ScoreBoard.players_add(mcf_id, MCF.sb_general, abs(value))
+            else:
+                ScoreBoard.players_remove(mcf_id, MCF.sb_general, abs(value))
+            return
+        ScoreBoard.players_set(MCF.CALC_CONST, MCF.sb_sys, value)
+        ScoreBoard.players_operation(
+            mcf_id, MCF.sb_general, f"{ops}=",
+            MCF.CALC_CONST, MCF.sb_sys
+        )
+
     def __pos__(self) -> 'Integer':
         return Integer(self)
 
     def __neg__(self) -> 'Integer':
+        known = self._known()
+        if known is not None:
+            return Integer(_int32(-known))
         temp = Integer(self)
         ScoreBoard.players_set(MCF.CALC_CONST, MCF.sb_sys, -1)
         ScoreBoard.players_operation(
@@ -378,6 +548,9 @@ class Integer(MCFVariable):
         return temp
 
     def __abs__(self) -> 'Integer':
+        known = self._known()
+        if known is not None:
+            return Integer(_int32(abs(known)))
         temp = Integer(self)
         ScoreBoard.players_set(MCF.CALC_CONST, MCF.sb_sys, '-1')
         Execute().condition('if').score_matches(
@@ -395,31 +568,29 @@ class Integer(MCFVariable):
         other: IntegerConvertible,
         ops: str
     ) -> 'Integer':
-        temp = Integer(None)
-        if isinstance(other, int):
-            ScoreBoard.players_operation(
-                temp._mcf_id, MCF.sb_general, "=",
-                self._mcf_id, MCF.sb_general
-            )
-            ScoreBoard.players_set(MCF.CALC_CONST, MCF.sb_sys, other)
-            ScoreBoard.players_operation(
-                temp._mcf_id, MCF.sb_general, f"{ops}=",
-                MCF.CALC_CONST, MCF.sb_sys
-            )
-        elif isinstance(other, Integer):
-            ScoreBoard.players_operation(
-                temp._mcf_id, MCF.sb_general, "=",
-                self._mcf_id, MCF.sb_general
+        left = self._known()
+        right = Integer._known_int(other)
+        folded = Integer._fold(left, right, ops)
+        if folded is not None:
+            return Integer(folded)
+        if not isinstance(other, (int, Integer)):
+            raise MCFTypeError(
+                "Can not operate {} with an Integer.",
+                other
             )
+        if left is not None and right is None:
+            # the known operand is written as a constant instead of read from its score
+            return other._r_operation(left, ops)
+        # initialize from self so that a recycled Fool ID needs no reset
+        temp = Integer(self)
+        temp._forget()
+        if right is not None:
+            Integer._operate_constant(temp._mcf_id, right, ops)
+        else:
             ScoreBoard.players_operation(
                 temp._mcf_id, MCF.sb_general, f"{ops}=",
                 other._mcf_id, MCF.sb_general
             )
-        else:
-            raise MCFTypeError(
-                "Can not operate {} with an Integer.",
-                other
-            )
         return temp
 
     def _r_operation(
@@ -427,27 +598,24 @@ class Integer(MCFVariable):
         left: IntegerConvertible,
         ops: str
     ) -> 'Integer':
-        temp = Integer(None)
-        if isinstance(left, int):
-            ScoreBoard.players_set(temp._mcf_id, MCF.sb_general, left)
-            ScoreBoard.players_operation(
-                temp._mcf_id, MCF.sb_general, f"{ops}=",
-                self._mcf_id, MCF.sb_general
-            )
-        elif isinstance(left, Integer):
-            ScoreBoard.players_operation(
-                temp._mcf_id, MCF.sb_general, "=",
-                left._mcf_id, MCF.sb_general
+        known = self._known()
+        folded = Integer._fold(Integer._known_int(left), known, ops)
+        if folded is not None:
+            return Integer(folded)
+        if not isinstance(left, (int, Integer)):
+            raise MCFTypeError(
+                "Can not operate {} with an Integer.",
+                left
             )
+        temp = Integer(left)
+        temp._forget()
+        if known is not None:
+            Integer._operate_constant(temp._mcf_id, known, ops)
+        else:
             ScoreBoard.players_operation(
                 temp._mcf_id, MCF.sb_general, f"{ops}=",
                 self._mcf_id, MCF.sb_general
             )
-        else:
-            raise MCFTypeError(
-                "Can not operate {} with an Integer.",
-                left
-            )
         return temp
 
     def _i_operation(
@@ -455,17 +623,13 @@ class Integer(MCFVariable):
         other: IntegerConvertible,
         ops: str
     ) -> None:
-        if isinstance(other, int):
-            if ops == '+':
-                ScoreBoard.players_add(self._mcf_id, MCF.sb_general, other)
-            elif ops == '-':
-                ScoreBoard.players_remove(self._mcf_id, MCF.sb_general, other)
-            else:
-                ScoreBoard.players_set(MCF.CALC_CONST, MCF.sb_sys, other)
-                ScoreBoard.players_operation(
-                    self._mcf_id, MCF.sb_general, f"{ops}=",
-                    MCF.CALC_CONST, MCF.sb_sys
-                )
+        right = Integer._known_int(other)
+        folded = Integer._fold(self._known(), right, ops)
+        if folded is not None:
+            self.assign(folded)
+            return
+        if right is not None:
+            Integer._operate_constant(self._mcf_id, right, ops)
         elif isinstance(other, Integer):
             ScoreBoard.players_operation(
                 self._mcf_id, MCF.sb_general, f"{ops}=",
@@ -476,6 +640,7 @@ class Integer(MCFVariable):
                 "Can not operate {} with an Integer.",
                 other
             )
+        self._forget()
 
     def __iadd__(self, other: IntegerConvertible) -> 'Integer':
         try:
@@ -575,38 +740,38 @@ class Integer(MCFVariable):
         offset: int = 0,
         reverse: bool = False
     ) -> Condition:
-        temp = Condition(False)
+        left = self._known()
+        right = Integer._known_int(value)
+        if left is not None and right is not None:
+            return Condition(_COMPARISONS[compare](left, right) != reverse)
+        if right is not None:
+            value = right
+        elif left is not None and isinstance(value, Integer):
+            # compare the other way round so that the known operand is a constant
+            if reverse: return value != left
+            return {
+                '=': value.__eq__, '<=': value.__ge__, '>': value.__lt__,
+                '>=': value.__le__, '<': value.__gt__
+            }[compare](left)
+        # the guard keeps the operands alive, so temporaries are not reset before use
+        mode = 'unless' if reverse else 'if'
         if isinstance(value, int):
             cmp_range: list[int | None] = [None, None]
             for idx in index:
                 cmp_range[idx] = value + offset
-            Execute().condition(
-                'unless' if reverse else 'if'
-            ).score_matches(
-                self._mcf_id, MCF.sb_general, cmp_range[0],
-                cmp_range[1]
-            ).run(
-                ScoreBoard.players_set(
-                    temp._mcf_id, MCF.sb_general, 1
-                )
-            )
+            return Condition._compared(mode, lambda context: context.score_matches(
+                self._mcf_id, MCF.sb_general, cmp_range[0], cmp_range[1]
+            ))
         elif isinstance(value, Integer):
-            Execute().condition(
-                'unless' if reverse else 'if'
-            ).score_compare(
+            return Condition._compared(mode, lambda context: context.score_compare(
                 self._mcf_id, MCF.sb_general, compare,
                 value._mcf_id, MCF.sb_general
-            ).run(
-                ScoreBoard.players_set(
-                    temp._mcf_id, MCF.sb_general, 1
-                )
-            )
+            ))
         else:
             raise MCFTypeError(
                 "Can not compare between {} and Integer",
                 value
             )
-        return temp
 
     def __eq__(self, value: IntegerConvertible) -> Condition:
         try:
@@ -648,7 +813,19 @@ class Integer(MCFVariable):
 # Float Implementation
 
 FloatConvertible: TypeAlias = 'Float | float | int'
+
+# comparison -> (mode, low, high) for the sign left by math.float.compare
+_FLOAT_MATCHES: dict[str, tuple[str, int | None, int | None]] = {
+    '>': ('if', 1, 1),
+    '>=': ('if', 0, None),
+    '=': ('if', 0, 0),
+    '<': ('if', -1, -1),
+    '<=': ('if', None, 0),
+    '!=': ('unless', 0, 0)
+}
 class Float(MCFVariable):
+    _storage_backed = True
+
     def __init__(
         self,
         init_val: 'FloatConvertible | Integer | None' = 0.0,
@@ -677,6 +854,8 @@ class Float(MCFVariable):
         return (front, back, size)
 
     def assign(self, value: 'FloatConvertible | Integer') -> None:
+        if isinstance(value, Integer) and value._known() is not None:
+            value = value._known()
         if isinstance(value, int):
             value = float(value)
         if isinstance(value, float):
@@ -685,11 +864,14 @@ class Float(MCFVariable):
             Data.storage(MCF.storage).modify_set(f"mem.{self._mcf_id}").value(
                 '{' + f"a:{a},e:{e}b,v:{v}b" + '}'
             )
+            self._learn(Float._represent(value))
         elif isinstance(value, Float):
             Data.storage(MCF.storage).modify_set(f"mem.{self._mcf_id}").via(
                 Data.storage(MCF.storage), f"mem.{value._mcf_id}"
             )
+            self._learn(value._known())
         elif isinstance(value, Integer):
+            self._forget()
             Data.storage(MCF.storage).modify_set(f"mem.{self._mcf_id}").value("{}")
             value.move("register")
             Function(MCF.builtinSign('math.float.construct.make')).call()
@@ -719,8 +901,10 @@ class Float(MCFVariable):
         Data.storage(MCF.storage).modify_set(f"mem.{self._mcf_id}").via(
             Data.storage(MCF.storage), src
         )
+        self._forget()
 
     def construct(self, src: str) -> None:
+        self._forget()
         Data.storage(MCF.storage).modify_set(f"mem.{self._mcf_id}").value("{}")
         Data.storage(MCF.storage).modify_set("register").via(
             Data.storage(MCF.storage), src
@@ -760,6 +944,32 @@ class Float(MCFVariable):
         )
         return temp
 
+    @staticmethod
+    def _represent(f: float) -> float:
+        """返回`f`在储存格式下实际表示的值"""
+        return float("{:.8e}".format(f))
+
+    @staticmethod
+    def _known_float(value: FloatConvertible) -> float | None:
+        if isinstance(value, (int, float)): return Float._represent(float(value))
+        if isinstance(value, Float): return value._known()
+        return None
+
+    @staticmethod
+    def _fold(left: float | None, right: float | None, ops: str) -> float | None:
+        """在编译期计算`left ops right`，无法计算时返回`None`。
+
+        折叠使用宿主的双精度浮点计算，结果与运行时的软件浮点在末位上可能存在差异。
+        """
+        if left is None or right is None: return None
+        if ops == '+': result = left + right
+        elif ops == '-': result = left - right
+        elif ops == '*': result = left * right
+        elif ops == '/' and right != 0.0: result = left / right
+        else: return None
+        if not math.isfinite(result): return None
+        return result
+
     @staticmethod
     def _type_reduction(other: FloatConvertible) -> 'Float':
         reduced = float(other) if isinstance(other, int) else other
@@ -792,16 +1002,26 @@ class Float(MCFVariable):
         return temp
 
     def _operation(self, other: FloatConvertible, ops: str) -> 'Float':
+        folded = Float._fold(self._known(), Float._known_float(other), ops)
+        if folded is not None:
+            return Float(folded)
         target = Float._type_reduction(other)
         temp = Float._operate(self, target, ops)
         return temp
 
     def _r_operation(self, left: FloatConvertible, ops: str) -> 'Float':
+        folded = Float._fold(Float._known_float(left), self._known(), ops)
+        if folded is not None:
+            return Float(folded)
         target = Float._type_reduction(left)
         temp = Float._operate(target, self, ops)
         return temp
 
     def _i_operation(self, other: FloatConvertible, ops: str) -> None:
+        folded = Float._fold(self._known(), Float._known_float(other), ops)
+        if folded is not None:
+            self.assign(folded)
+            return
         target = Float._type_reduction(other)
         self.move("cache.left")
         target.move("cache.right")
@@ -900,52 +1120,24 @@ class Float(MCFVariable):
 
 
     def _compare(self, other: FloatConvertible, _type: str) -> Condition:
-        result = Condition(False, False)
+        left = self._known()
+        right = Float._known_float(other)
+        if left is not None and right is not None and _type in _COMPARISONS:
+            return Condition(_COMPARISONS[_type](left, right))
+        # the compare function leaves the sign of left - right in GENERAL
+        matches = _FLOAT_MATCHES.get(_type, None)
+        if matches is None:
+            raise MCFTypeError(
+                "Unsupported comparison type '{}' for Float.", _type
+            )
         other = Float._type_reduction(other)
         self.move("cache.left")
         other.move("cache.right")
         Function(MCF.builtinSign('math.float.compare.run')).call()
-        if _type == '>':
-            Execute().condition('if').score_matches(
-                MCF.GENERAL, MCF.sb_sys, 1, 1
-            ).run(
-                ScoreBoard.players_set(result._mcf_id, MCF.sb_general, 1)
-            )
-        elif _type == '>=':
-            Execute().condition('if').score_matches(
-                MCF.GENERAL, MCF.sb_sys, 0, None
-            ).run(
-                ScoreBoard.players_set(result._mcf_id, MCF.sb_general, 1)
-            )
-        elif _type == '=':
-            Execute().condition('if').score_matches(
-                MCF.GENERAL, MCF.sb_sys, 0, 0
-            ).run(
-                ScoreBoard.players_set(result._mcf_id, MCF.sb_general, 1)
-            )
-        elif _type == '<':
-            Execute().condition('if').score_matches(
-                MCF.GENERAL, MCF.sb_sys, -1, -1
-            ).run(
-                ScoreBoard.players_set(result._mcf_id, MCF.sb_general, 1)
-            )
-        elif _type == '<=':
-            Execute().condition('if').score_matches(
-                MCF.GENERAL, MCF.sb_sys, None, 0
-            ).run(
-                ScoreBoard.players_set(result._mcf_id, MCF.sb_general, 1)
-            )
-        elif _type == '!=':
-            Execute().condition('unless').score_matches(
-                MCF.GENERAL, MCF.sb_sys, 0, 0
-            ).run(
-                ScoreBoard.players_set(result._mcf_id, MCF.sb_general, 1)
-            )
-        else:
-            raise MCFTypeError(
-                "Unsupported comparison type '{}' for Float.", _type
-            )
-        return result
+        mode, low, high = matches
+        return Condition._compared(mode, lambda context: context.score_matches(
+            MCF.GENERAL, MCF.sb_sys, low, high
+        ))
         
     def __eq__(self, value: FloatConvertible) -> Condition:
         try:
@@ -987,6 +1179,733 @@ class Float(MCFVariable):
         Data.storage(MCF.storage).remove(f"mem.{self._mcf_id}")
 
 
+
+# Fixed-point Implementation
+
+FixedConvertible: TypeAlias = 'Fixed | float | int'
+
+_INT32_MAX = 0x7fffffff
+_INT32_MIN = -0x80000000
+
+# 计分板运算的操作数：整数为常量，字符串为`sb_general`上的分数持有者
+_Operand: TypeAlias = 'int | str'
+# 乘法中两个余数之积小于scale的平方，须在32位范围内
+_FIXED_SCALE_MAX = math.isqrt(_INT32_MAX)
+
+class Fixed(MCFVariable):
+    """定点数，以`值 * scale`取整后的整数储存在计分板上。
+
+    加减法只需一次计分板运算，乘除法拆分为商与余数计算，均不调用函数。`Fixed`的
+    scale为1000，`Fixed[100]`等为其他scale的特化类型（scale的平方须在32位范围内），
+    与不同scale的值运算时先换算至左操作数的scale。乘除法按精确值向下取整；32位溢出
+    默认按补码回绕，启用`overflow_check`配置后，加减乘除的结果在溢出时饱和至边界值。
+    """
+    _scale: int = 1000
+
+    def __class_getitem__(cls, scale: int) -> type['Fixed']:
+        if (
+            isinstance(scale, bool) or not isinstance(scale, int)
+            or not 0 < scale <= _FIXED_SCALE_MAX
+        ):
+            console.error(
+                MCFValueError(
+                    f"Scale of Fixed must be a positive int not greater than "
+                    f"{_FIXED_SCALE_MAX}, not {scale}."
+                )
+            )
+            return Fixed
+        return _fixed_type(scale)
+
+    def __init__(
+        self,
+        init_val: 'FixedConvertible | Integer | Float | None' = 0,
+        void: bool = False
+    ):
+        super().__init__(init_val, void)
+
+    @staticmethod
+    def _wrap(value: int) -> int:
+        if not MCF.overflow_check: return _int32(value)
+        return min(max(value, _INT32_MIN), _INT32_MAX)
+
+    def _raw(self, value: float | int) -> int | None:
+        """常量在当前scale下的储存值"""
+        if isinstance(value, float) and not math.isfinite(value): return None
+        return self._wrap(round(Fraction(value) * self._scale))
+
+    def _known_raw(self, value: Any) -> int | None:
+        """`value`在当前scale下的编译期常量储存值"""
+        if isinstance(value, (int, float)): return self._raw(value)
+        if isinstance(value, Integer):
+            known = value._known()
+            return None if known is None else self._raw(known)
+        if isinstance(value, Fixed):
+            known = value._known()
+            if known is None: return None
+            return _int32(known * self._scale // value._scale)
+        return None
+
+    def _rescale(self, src_scale: int) -> None:
+        """由`src_scale`换算至自身scale，两个scale之积总在32位范围内"""
+        ratio = Fraction(self._scale, src_scale)
+        self._times_ratio(ratio.numerator, ratio.denominator, False)
+
+    def assign(self, value: 'FixedConvertible | Integer | Float') -> None:
+        known = self._known_raw(value)
+        if known is not None:
+            ScoreBoard.players_set(self._mcf_id, MCF.sb_general, known)
+            self._learn(known)
+            return
+        if isinstance(value, (Fixed, Integer)):
+            ScoreBoard.players_operation(
+                self._mcf_id, MCF.sb_general, "=",
+                value._mcf_id, MCF.sb_general
+            )
+            self._rescale(value._scale if isinstance(value, Fixed) else 1)
+        elif isinstance(value, Float):
+            value.extract("register", 'double')
+            ScoreBoard.from_storage(
+                "register", self._mcf_id, MCF.sb_general, self._scale
+            )
+        else:
+            console.error(
+                MCFTypeError(
+                    "Can not use {} as value for Fixed.",
+                    value
+                )
+            )
+        self._forget()
+
+    def rm(self) -> None:
+        ScoreBoard.players_reset(self._mcf_id, MCF.sb_general)
+
+    def move(self, dist: str) -> None:
+        ScoreBoard.to_storage(
+            dist, self._mcf_id, MCF.sb_general, 1.0
+        )
+
+    def collect(self, src: str) -> None:
+        ScoreBoard.from_storage(
+            src, self._mcf_id, MCF.sb_general, 1.0
+        )
+        self._forget()
+
+    def extract(self, dist: str, _type: FloatingPointVariableTypes = 'double') -> None:
+        ScoreBoard.to_storage(
+            dist, self._mcf_id, MCF.sb_general, 1 / self._scale, _type
+        )
+
+    def construct(self, src: str) -> None:
+        ScoreBoard.from_storage(
+            src, self._mcf_id, MCF.sb_general, self._scale
+        )
+        self._forget()
+
+    def macro_construct(self, slot: str, mcf_id: str) -> 'Fixed':
+        temp = type(self)(None, True)
+        temp._mcf_id = mcf_id
+        ScoreBoard.players_operation(
+            temp._mcf_id, MCF.sb_general, "=",
+            f"$({slot})", MCF.sb_general,
+            macro=True
+        )
+        return temp
+
+    def duplicate(
+        self,
+        init_val: 'FixedConvertible | None' = 0,
+        void: bool = False
+    ) -> 'Fixed':
+        return type(self)(init_val, void)
+
+    def to_integer(self) -> Integer:
+        """向下取整转换为`Integer`"""
+        known = self._known()
+        if known is not None:
+            return Integer(known // self._scale)
+        ret_val = Integer(None, False)
+        ScoreBoard.players_operation(
+            ret_val._mcf_id, MCF.sb_general, "=",
+            self._mcf_id, MCF.sb_general
+        )
+        ScoreBoard.players_set(MCF.CALC_CONST, MCF.sb_sys, self._scale)
+        ScoreBoard.players_operation(
+            ret_val._mcf_id, MCF.sb_general, "/=",
+            MCF.CALC_CONST, MCF.sb_sys
+        )
+        return ret_val
+
+    def to_float(self) -> Float:
+        known = self._known()
+        if known is not None:
+            return Float(known / self._scale)
+        self.extract("register")
+        ret_val = Float(None, False)
+        ret_val.construct("register")
+        return ret_val
+
+    def _fold(self, left: int | None, right: int | None, ops: str) -> int | None:
+        """在编译期计算储存值`left ops right`，无法计算时返回`None`"""
+        if left is None or right is None: return None
+        if ops == '+': return self._wrap(left + right)
+        if ops == '-': return self._wrap(left - right)
+        if ops == '*': return self._wrap(left * right // self._scale)
+        if ops == '/' and right != 0: return self._wrap(left * self._scale // right)
+        return None
+
+    def _operand(self, other: Any) -> 'Fixed | int | float':
+        """将`other`化为常量或与自身scale相同的定点数"""
+        if isinstance(other, bool) or not isinstance(
+            other, (int, float, Fixed, Integer, Float)
+        ):
+            raise MCFTypeError("Can not operate {} with a Fixed.", other)
+        if isinstance(other, Integer) and other._known() is not None:
+            other = other._known()
+        if isinstance(other, (int, float)):
+            if self._raw(other) is None:
+                raise MCFTypeError("Can not operate {} with a Fixed.", other)
+            return other
+        if isinstance(other, Fixed) and other._scale == self._scale:
+            return other
+        return type(self)(other)
+
+    @staticmethod
+    def _score(operand: _Operand) -> tuple[str, str]:
+        if isinstance(operand, int):
+            ScoreBoard.players_set(MCF.CALC_CONST, MCF.sb_sys, operand)
+            return MCF.CALC_CONST, MCF.sb_sys
+        return operand, MCF.sb_general
+
+    @staticmethod
+    def _when(
+        conditions: list[tuple[str, str, int | None, int | None]],
+        command: Callable[[], None]
+    ) -> None:
+        """在所有分数范围条件都满足时执行`command`"""
+        execute = Execute()
+        for holder, board, left, right in conditions:
+            execute.condition('if').score_matches(holder, board, left, right)
+        execute.run(command())
+
+    @staticmethod
+    def _sign(operand: _Operand, positive: bool) -> list | None:
+        """操作数非负（或为负）的条件，常量时返回`[]`（恒成立）或`None`（恒不成立）"""
+        if isinstance(operand, int):
+            return [] if (operand >= 0) == positive else None
+        return [(operand, MCF.sb_general, 0, None) if positive
+                else (operand, MCF.sb_general, None, -1)]
+
+    def _apply(self, other: 'Fixed | int | float', ops: str) -> None:
+        """对自身做`ops`运算，`other`为常量或scale相同的定点数"""
+        if isinstance(other, Fixed) and other._mcf_id == self._mcf_id:
+            # 操作数就是自身，先复制以免在运算中被修改
+            other = type(self)(other)
+        if ops in ('*', '/'):
+            self._apply_product(other, ops)
+            return
+        operand = other._mcf_id if isinstance(other, Fixed) else self._raw(other)
+        if MCF.overflow_check:
+            ScoreBoard.players_operation(
+                MCF.BUFFER1, MCF.sb_sys, "=", self._mcf_id, MCF.sb_general
+            )
+        if isinstance(operand, int) and operand >= 0:
+            if ops == '+':
+                ScoreBoard.players_add(self._mcf_id, MCF.sb_general, operand)
+            else:
+                ScoreBoard.players_remove(self._mcf_id, MCF.sb_general, operand)
+        else:
+            holder, board = Fixed._score(operand)
+            ScoreBoard.players_operation(
+                self._mcf_id, MCF.sb_general, f"{ops}=", holder, board
+            )
+        if MCF.overflow_check:
+            self._saturate_sum(ops, operand)
+
+    def _apply_product(self, other: 'Fixed | int | float', ops: str) -> None:
+        """乘以或除以`other`，结果为精确值向下取整。
+
+        乘除法不直接计算`a * b`或`a * scale`，而是把被乘数（被除数）拆成商与余数分别
+        计算，参与除法的中间值不会溢出。结果在32位范围内时总是精确的，只有除数的绝对值
+        与scale之积超过32位时余数部分先将余数与除数同时缩小，结果可能相差几个最小单位；
+        启用`overflow_check`时只在最终结果超出范围时饱和。
+        """
+        if isinstance(other, Fixed):
+            raw, holder = other._known(), other._mcf_id
+        else:
+            # 整数按精确值参与运算，不经过储存值的回绕
+            raw = other * self._scale if isinstance(other, int) else self._raw(other)
+            holder = None
+        if ops == '/' and raw == 0:
+            # 与计分板的除法相同，除以零时保持不变
+            return
+        factor = None
+        if raw is not None:
+            factor = Fraction(raw, self._scale) if ops == '*' else Fraction(self._scale, raw)
+            if abs(factor.numerator) * factor.denominator > _INT32_MAX: factor = None
+        # 除以正整数不会溢出
+        checked = MCF.overflow_check and (factor is None or factor.numerator != 1)
+        if checked:
+            ScoreBoard.players_operation(
+                MCF.BUFFER1, MCF.sb_sys, "=", self._mcf_id, MCF.sb_general
+            )
+            ScoreBoard.players_set(MCF.BUFFER4, MCF.sb_sys, 0)
+        if factor is not None:
+            self._times_ratio(factor.numerator, factor.denominator, checked)
+            sign: _Operand = factor.numerator
+        else:
+            if holder is None:
+                ScoreBoard.players_set(MCF.GENERAL, MCF.sb_sys, raw)
+                operand = (MCF.GENERAL, MCF.sb_sys)
+            else:
+                operand = (holder, MCF.sb_general)
+            if ops == '*': self._multiply(operand, checked)
+            else: self._divide(operand, raw, checked)
+            sign = holder if raw is None else raw
+        if checked:
+            self._saturate_product(sign)
+
+    @staticmethod
+    def _operate(target: tuple[str, str], ops: str, source: tuple[str, str]) -> None:
+        ScoreBoard.players_operation(target[0], target[1], f"{ops}=", source[0], source[1])
+
+    def _split(self, divisor: tuple[str, str], checked: bool, positive: bool | None) -> None:
+        """将自身拆分为除以`divisor`的商（留在自身）与余数（`BUFFER2`）。
+
+        计分板的除法向下取整，余数与除数同号；检查溢出时改为向零取整，使商与余数
+        都与被除数同号，之后各部分同号相加，由结果是否变号即可判断溢出。`positive`为
+        除数的符号，未知时为`None`。
+        """
+        me = (self._mcf_id, MCF.sb_general)
+        remainder = (MCF.BUFFER2, MCF.sb_sys)
+        ScoreBoard.players_operation(remainder[0], remainder[1], "=", me[0], me[1])
+        Fixed._operate(remainder, '%', divisor)
+        Fixed._operate(me, '/', divisor)
+        if not checked: return
+        for negative in (True, False):
+            if positive is not None and positive != negative: continue
+            conditions = [
+                (MCF.BUFFER1, MCF.sb_sys, None, -1) if negative
+                else (MCF.BUFFER1, MCF.sb_sys, 0, None),
+                (MCF.BUFFER2, MCF.sb_sys, 1, None) if negative
+                else (MCF.BUFFER2, MCF.sb_sys, None, -1)
+            ]
+            if positive is None:
+                conditions.append(
+                    (divisor[0], divisor[1], 1, None) if negative
+                    else (divisor[0], divisor[1], None, -1)
+                )
+            Fixed._when(
+                conditions,
+                lambda: ScoreBoard.players_add(self._mcf_id, MCF.sb_general, 1)
+            )
+            Fixed._when(conditions, lambda: Fixed._operate(remainder, '-', divisor))
+
+    def _add_part(self, part: str, checked: bool) -> None:
+        """加上`part`中的余数部分，检查溢出时两者同号，相加后变号即为溢出"""
+        if checked:
+            ScoreBoard.players_operation(
+                MCF.BUFFER5, MCF.sb_sys, "=", self._mcf_id, MCF.sb_general
+            )
+        ScoreBoard.players_operation(
+            self._mcf_id, MCF.sb_general, "+=", part, MCF.sb_sys
+        )
+        if not checked: return
+        flag = lambda: ScoreBoard.players_set(MCF.BUFFER4, MCF.sb_sys, 1)
+        Fixed._when([
+            (MCF.BUFFER5, MCF.sb_sys, 0, None), (part, MCF.sb_sys, 0, None),
+            (self._mcf_id, MCF.sb_general, None, -1)
+        ], flag)
+        Fixed._when([
+            (MCF.BUFFER5, MCF.sb_sys, None, -1), (self._mcf_id, MCF.sb_general, 0, None)
+        ], flag)
+
+    def _times_ratio(self, numerator: int, denominator: int, checked: bool) -> None:
+        """乘以`numerator / denominator`，分母为正，分子与分母之积在32位范围内"""
+        me = (self._mcf_id, MCF.sb_general)
+        const = (MCF.CALC_CONST, MCF.sb_sys)
+        if denominator == 1:
+            if numerator == 1: return
+            if checked: self._check_range(numerator)
+            ScoreBoard.players_set(const[0], const[1], numerator)
+            Fixed._operate(me, '*', const)
+            return
+        ScoreBoard.players_set(const[0], const[1], denominator)
+        if numerator == 1:
+            Fixed._operate(me, '/', const)
+            return
+        # a = q * d + r，a * n / d = q * n + (r * n) / d，其中|r * n| < |n| * d
+        self._split(const, checked, True)
+        if checked: self._check_range(numerator)
+        ScoreBoard.players_set(const[0], const[1], numerator)
+        Fixed._operate(me, '*', const)
+        Fixed._operate((MCF.BUFFER2, MCF.sb_sys), '*', const)
+        ScoreBoard.players_set(const[0], const[1], denominator)
+        Fixed._operate((MCF.BUFFER2, MCF.sb_sys), '/', const)
+        self._add_part(MCF.BUFFER2, checked)
+
+    def _multiply(self, factor: tuple[str, str], checked: bool) -> None:
+        """乘以储存值在`factor`中的定点数。
+
+        a = qa * s + ra、b = qb * s + rb，a * b / s = qa * b + ra * qb + (ra * rb) / s，
+        其中|ra * qb| < |b|、|ra * rb| < s^2，只有qa * b可能回绕，而它不参与除法。
+        """
+        me = (self._mcf_id, MCF.sb_general)
+        const = (MCF.CALC_CONST, MCF.sb_sys)
+        ra, part = (MCF.BUFFER2, MCF.sb_sys), (MCF.BUFFER3, MCF.sb_sys)
+        qb = (MCF.BUFFER5, MCF.sb_sys)
+        ScoreBoard.players_set(const[0], const[1], self._scale)
+        self._split(const, checked, True)
+        ScoreBoard.players_operation(part[0], part[1], "=", factor[0], factor[1])
+        Fixed._operate(part, '%', const)
+        ScoreBoard.players_operation(qb[0], qb[1], "=", factor[0], factor[1])
+        Fixed._operate(qb, '/', const)
+        Fixed._operate(qb, '*', ra)
+        Fixed._operate(part, '*', ra)
+        Fixed._operate(part, '/', const)
+        Fixed._operate(part, '+', qb)
+        if checked:
+            ScoreBoard.players_operation(
+                MCF.BUFFER6, MCF.sb_sys, "=", self._mcf_id, MCF.sb_general
+            )
+        Fixed._operate(me, '*', factor)
+        if checked: self._check_product(factor)
+        self._add_part(MCF.BUFFER3, checked)
+
+    def _divide(self, divisor: tuple[str, str], known: int | None, checked: bool) -> None:
+        """除以储存值在`divisor`中的定点数，`known`为编译期已知的储存值。
+
+        a = q * b + r，a * s / b = q * s + (r * s) / b。|b| * s不超过32位时r * s不会
+        溢出；否则将r与b同除以g，使b / g不超过`2^31 / s`后再计算余数部分。
+        """
+        me = (self._mcf_id, MCF.sb_general)
+        const = (MCF.CALC_CONST, MCF.sb_sys)
+        part = (MCF.BUFFER2, MCF.sb_sys)
+        shrink, shrunk = (MCF.BUFFER5, MCF.sb_sys), (MCF.BUFFER6, MCF.sb_sys)
+        self._split(divisor, checked, None if known is None else known > 0)
+        ScoreBoard.players_set(const[0], const[1], self._scale)
+        if checked: self._check_range(self._scale)
+        Fixed._operate(me, '*', const)
+        # 缩小后的余数可能比除数大1，乘以s时仍不会溢出
+        limit = _INT32_MAX // self._scale - 1
+        if known is not None:
+            if abs(known) <= limit:
+                Fixed._operate(part, '*', const)
+                Fixed._operate(part, '/', divisor)
+            else:
+                factor = known // limit + (1 if known > 0 else 0)
+                ScoreBoard.players_set(shrink[0], shrink[1], factor)
+                Fixed._operate(part, '/', shrink)
+                ScoreBoard.players_set(shrunk[0], shrunk[1], known // factor)
+                Fixed._operate(part, '*', const)
+                Fixed._operate(part, '/', shrunk)
+            self._add_part(MCF.BUFFER2, checked)
+            return
+        ScoreBoard.players_set(MCF.BUFFER3, MCF.sb_sys, limit)
+        steps = [
+            ('if', [], lambda: Fixed._operate(part, '*', const)),
+            ('if', [], lambda: Fixed._operate(part, '/', divisor)),
+            # g = ⌈|b| / limit⌉，符号与b相同
+            ('unless', [], lambda: ScoreBoard.players_operation(
+                shrink[0], shrink[1], "=", divisor[0], divisor[1]
+            )),
+            ('unless', [], lambda: Fixed._operate(shrink, '/', (MCF.BUFFER3, MCF.sb_sys))),
+            ('unless', [(shrink, 0, None)], lambda: ScoreBoard.players_add(
+                shrink[0], shrink[1], 1
+            )),
+            ('unless', [], lambda: Fixed._operate(part, '/', shrink)),
+            ('unless', [], lambda: ScoreBoard.players_operation(
+                shrunk[0], shrunk[1], "=", divisor[0], divisor[1]
+            )),
+            ('unless', [], lambda: Fixed._operate(shrunk, '/', shrink)),
+            ('unless', [], lambda: Fixed._operate(part, '*', const)),
+            ('unless', [], lambda: Fixed._operate(part, '/', shrunk))
+        ]
+        for cond, extra, command in steps:
+            execute = Execute().condition(cond).score_matches(
+                divisor[0], divisor[1], -limit, limit
+            )
+            for (holder, board), left, right in extra:
+                execute.condition('if').score_matches(holder, board, left, right)
+            execute.run(command())
+        self._add_part(MCF.BUFFER2, checked)
+
+    def _check_range(self, multiplier: int) -> None:
+        """乘以常量前检查自身是否会溢出，溢出时将`BUFFER4`置为1"""
+        if multiplier == 0: return
+        bounds = (Fraction(_INT32_MIN, multiplier), Fraction(_INT32_MAX, multiplier))
+        left, right = math.ceil(min(bounds)), math.floor(max(bounds))
+        Execute().condition('unless').score_matches(
+            self._mcf_id, MCF.sb_general, left, right
+        ).run(
+            ScoreBoard.players_set(MCF.BUFFER4, MCF.sb_sys, 1)
+        )
+
+    def _check_product(self, factor: tuple[str, str]) -> None:
+        """乘以分数后由乘积还原被乘数，与`BUFFER6`不符即为溢出"""
+        ScoreBoard.players_operation(
+            MCF.BUFFER5, MCF.sb_sys, "=", self._mcf_id, MCF.sb_general
+        )
+        Fixed._operate((MCF.BUFFER5, MCF.sb_sys), '/', factor)
+        Execute().condition('unless').score_matches(
+            factor[0], factor[1], 0, 0
+        ).condition('unless').score_compare(
+            MCF.BUFFER5, MCF.sb_sys, "=", MCF.BUFFER6, MCF.sb_sys
+        ).run(
+            ScoreBoard.players_set(MCF.BUFFER4, MCF.sb_sys, 1)
+        )
+
+    def _saturate_sum(self, ops: str, operand: _Operand) -> None:
+        """同号相加（异号相减）而结果变号即为溢出"""
+        for positive in (True, False):
+            sign = Fixed._sign(operand, positive == (ops == '+'))
+            if sign is None: continue
+            bound = _INT32_MAX if positive else _INT32_MIN
+            Fixed._when(
+                sign + [
+                    (MCF.BUFFER1, MCF.sb_sys, 0, None) if positive
+                    else (MCF.BUFFER1, MCF.sb_sys, None, -1),
+                    (self._mcf_id, MCF.sb_general, None, -1) if positive
+                    else (self._mcf_id, MCF.sb_general, 0, None)
+                ],
+                lambda: ScoreBoard.players_set(self._mcf_id, MCF.sb_general, bound)
+            )
+
+    def _saturate_product(self, operand: _Operand) -> None:
+        """乘除溢出时按两操作数的符号饱和"""
+        for left in (True, False):
+            for right in (True, False):
+                sign = Fixed._sign(operand, right)
+                if sign is None: continue
+                bound = _INT32_MAX if left == right else _INT32_MIN
+                Fixed._when(
+                    [(MCF.BUFFER4, MCF.sb_sys, 1, 1)] + [
+                        (MCF.BUFFER1, MCF.sb_sys, 0, None) if left
+                        else (MCF.BUFFER1, MCF.sb_sys, None, -1)
+                    ] + sign,
+                    lambda: ScoreBoard.players_set(
+                        self._mcf_id, MCF.sb_general, bound
+                    )
+                )
+
+    def _constant(self, raw: int) -> 'Fixed':
+        temp = type(self)(None, False)
+        ScoreBoard.players_set(temp._mcf_id, MCF.sb_general, raw)
+        temp._learn(raw)
+        return temp
+
+    def _operation(self, other: 'FixedConvertible', ops: str) -> 'Fixed':
+        folded = self._fold(self._known(), self._known_raw(other), ops)
+        if folded is not None:
+            return self._constant(folded)
+        target = self._operand(other)
+        # initialize from self so that a recycled Fool ID needs no reset
+        temp = type(self)(self)
+        temp._forget()
+        temp._apply(target, ops)
+        return temp
+
+    def _r_operation(self, left: 'FixedConvertible', ops: str) -> 'Fixed':
+        folded = self._fold(self._known_raw(left), self._known(), ops)
+        if folded is not None:
+            return self._constant(folded)
+        self._operand(left)
+        temp = type(self)(left)
+        temp._forget()
+        temp._apply(self, ops)
+        return temp
+
+    def _i_operation(self, other: 'FixedConvertible', ops: str) -> None:
+        folded = self._fold(self._known(), self._known_raw(other), ops)
+        if folded is not None:
+            ScoreBoard.players_set(self._mcf_id, MCF.sb_general, folded)
+            self._learn(folded)
+            return
+        target = self._operand(other)
+        self._apply(target, ops)
+        self._forget()
+
+    def __add__(self, other: 'FixedConvertible') -> 'Fixed':
+        try:
+            return self._operation(other, '+')
+        except MCFTypeError:
+            return NotImplemented
+
+    def __radd__(self, left: 'FixedConvertible') -> 'Fixed':
+        try:
+            return self._r_operation(left, '+')
+        except MCFTypeError:
+            return NotImplemented
+
+    def __sub__(self, other: 'FixedConvertible') -> 'Fixed':
+        try:
+            return self._operation(other, '-')
+        except MCFTypeError:
+            return NotImplemented
+
+    def __rsub__(self, left: 'FixedConvertible') -> 'Fixed':
+        try:
+            return self._r_operation(left, '-')
+        except MCFTypeError:
+            return NotImplemented
+
+    def __mul__(self, other: 'FixedConvertible') -> 'Fixed':
+        try:
+            return self._operation(other, '*')
+        except MCFTypeError:
+            return NotImplemented
+
+    def __rmul__(self, left: 'FixedConvertible') -> 'Fixed':
+        try:
+            return self._r_operation(left, '*')
+        except MCFTypeError:
+            return NotImplemented
+
+    def __truediv__(self, other: 'FixedConvertible') -> 'Fixed':
+        try:
+            return self._operation(other, '/')
+        except MCFTypeError:
+            return NotImplemented
+
+    def __rtruediv__(self, left: 'FixedConvertible') -> 'Fixed':
+        try:
+            return self._r_operation(left, '/')
+        except MCFTypeError:
+            return NotImplemented
+
+    def __iadd__(self, other: 'FixedConvertible') -> 'Fixed':
+        try:
+            self._i_operation(other, '+')
+        except MCFTypeError:
+            return NotImplemented
+        return self
+
+    def __isub__(self, other: 'FixedConvertible') -> 'Fixed':
+        try:
+            self._i_operation(other, '-')
+        except MCFTypeError:
+            return NotImplemented
+        return self
+
+    def __imul__(self, other: 'FixedConvertible') -> 'Fixed':
+        try:
+            self._i_operation(other, '*')
+        except MCFTypeError:
+            return NotImplemented
+        return self
+
+    def __itruediv__(self, other: 'FixedConvertible') -> 'Fixed':
+        try:
+            self._i_operation(other, '/')
+        except MCFTypeError:
+            return NotImplemented
+        return self
+
+
+    def _compare(self, other: 'FixedConvertible', _type: str) -> Condition:
+        if isinstance(other, (int, float)) and not isinstance(other, bool):
+            return self._compare_constant(Fraction(other) * self._scale, _type)
+        target = self._operand(other)
+        if not isinstance(target, Fixed):
+            # 值在编译期已知的Integer
+            return self._compare_constant(Fraction(target) * self._scale, _type)
+        left = self._known()
+        right = target._known()
+        if left is not None and right is not None:
+            return Condition(_COMPARISONS[_type](left, right))
+        return Condition._compared(
+            'unless' if _type == '!=' else 'if',
+            lambda context: context.score_compare(
+                self._mcf_id, MCF.sb_general, '=' if _type == '!=' else _type,
+                target._mcf_id, MCF.sb_general
+            )
+        )
+
+    def _compare_constant(self, exact: Fraction, _type: str) -> Condition:
+        """与常量比较，`exact`为常量在当前scale下的精确值"""
+        known = self._known()
+        if known is not None:
+            return Condition(_COMPARISONS[_type](known, exact))
+        # 转换为储存值的整数范围
+        integral = exact.denominator == 1
+        if _type == '<': left, right = None, math.ceil(exact) - 1
+        elif _type == '<=': left, right = None, math.floor(exact)
+        elif _type == '>': left, right = math.floor(exact) + 1, None
+        elif _type == '>=': left, right = math.ceil(exact), None
+        elif _type in ('=', '!='):
+            if not integral:
+                return Condition(_type == '!=')
+            left = right = int(exact)
+        else:
+            raise MCFTypeError(
+                "Unsupported comparison type '{}' for Fixed.", _type
+            )
+        if (left is not None and left > _INT32_MAX) or (
+            right is not None and right < _INT32_MIN
+        ):
+            return Condition(_type == '!=')
+        if (left is None or left <= _INT32_MIN) and (
+            right is None or right >= _INT32_MAX
+        ):
+            return Condition(_type != '!=')
+        return Condition._compared(
+            'unless' if _type == '!=' else 'if',
+            lambda context: context.score_matches(
+                self._mcf_id, MCF.sb_general, left, right
+            )
+        )
+
+    def __eq__(self, value: 'FixedConvertible') -> Condition:
+        try:
+            return self._compare(value, '=')
+        except MCFTypeError:
+            return NotImplemented
+
+    def __ne__(self, value: 'FixedConvertible') -> Condition:
+        try:
+            return self._compare(value, '!=')
+        except MCFTypeError:
+            return NotImplemented
+
+    def __lt__(self, value: 'FixedConvertible') -> Condition:
+        try:
+            return self._compare(value, '<')
+        except MCFTypeError:
+            return NotImplemented
+
+    def __gt__(self, value: 'FixedConvertible') -> Condition:
+        try:
+            return self._compare(value, '>')
+        except MCFTypeError:
+            return NotImplemented
+
+    def __ge__(self, value: 'FixedConvertible') -> Condition:
+        try:
+            return self._compare(value, '>=')
+        except MCFTypeError:
+            return NotImplemented
+
+    def __le__(self, value: 'FixedConvertible') -> Condition:
+        try:
+            return self._compare(value, '<=')
+        except MCFTypeError:
+            return NotImplemented
+
+_FIXED_TYPES: dict[int, type[Fixed]] = {}
+
+def _fixed_type(scale: int) -> type[Fixed]:
+    """返回scale为`scale`的定点数类型，同一scale总是得到同一个类"""
+    if scale == Fixed._scale: return Fixed
+    fixed = _FIXED_TYPES.get(scale, None)
+    if fixed is None:
+        name = f"Fixed[{scale}]"
+        fixed = type(name, (Fixed,), {
+            '_scale': scale,
+            '__qualname__': name,
+            '__module__': __name__
+        })
+        _FIXED_TYPES[scale] = fixed
+    return fixed
+
 # ArrayList Implementation
 
 ElementType = TypeVar("ElementType", bound=MCFVariable)
@@ -1001,31 +1920,81 @@ class _UntypedElement(Generic[ElementType]):
         ret_val.collect("cache.type")
         return ret_val
 
+IterationStrategy: TypeAlias = Literal['consume', 'index']
+
 class _IterationContext(Generic[ElementType]):
+    """列表遍历。
+
+    - `index`（默认）: 以下标计分板经宏函数逐个读取原列表的元素，循环体中对列表的
+    修改对之后的迭代可见。
+    - `consume`: 将列表复制到临时列表，每次读取并移除其首个元素，不需要宏函数
+    与下标计分板。遍历的是进入循环时列表的副本，且进入循环时需要复制整个列表，
+    适用于循环体不修改列表的遍历。
+    """
     _iter_used: bool
+    _strategy: IterationStrategy
+    _scratch: 'ArrayList[ElementType] | None'
     _control_sig: str
     _control_path: str
     _main_sig: str
     _main_path: str
+    _checks: _LoopChecks
     _index_id: str
     _iter_src: str
+    _boxed: bool
     _source: 'ArrayList[ElementType]'
     _ret_value: ElementType
     def __init__(
         self,
         src: 'ArrayList[ElementType]',
-        element_type: type[ElementType]
+        element_type: type[ElementType],
+        strategy: IterationStrategy = 'index'
     ):
         self._ret_value = element_type(init_val=None, void=False)
+        self._strategy = strategy
+        # 临时列表位于上下文中，递归调用时同其他变量一起保存
+        self._scratch = src.duplicate(None) if strategy == 'consume' else None
         self._iter_used = False
         self._control_path, self._control_sig = MCF.makeFunction()
         self._main_path, self._main_sig = MCF.makeFunction()
         self._iter_src = src._mcf_id
+        self._boxed = src._element_type is None
         # void gc on src
         self._source = src
         self._index_id = MCF.getFID()
+
+    def _next_element(self) -> None:
+        """在控制函数中取出下一个元素，列表耗尽时返回"""
+        if self._scratch is not None:
+            head = f"mem.{self._scratch._mcf_id}[0]"
+            Execute().condition('unless').data(
+                Data.storage(MCF.storage), head
+            ).run(
+                ReturN().value(0)
+            )
+            self._ret_value.collect(head if not self._boxed else f"{head}.v")
+            Data.storage(MCF.storage).remove(head)
+            return
+        Data.storage(MCF.storage).modify_set("call.m0").value(f'"{self._iter_src}"')
+        Execute().store('result').storage(MCF.storage, "call.m1", 'int', 1.0).run(
+            ScoreBoard.players_get(self._index_id, MCF.sb_general)
+        )
+        # validate
+        iterate = 'array_list.iterate' if self._boxed else 'array_list.iterate_raw'
+        Function(MCF.builtinSign(iterate)).with_args(
+            Data.storage(MCF.storage), "call"
+        )
+        # return if out of range
+        Execute().condition('if').score_matches(
+            MCF.GENERAL, MCF.sb_sys, 0, 0
+        ).run(
+            ReturN().value(0)
+        )
+        # collect
+        self._ret_value.collect("register")
     
     def __iter__(self) -> Self:
+        MCF.enterLoop()
         # save loop stack
         Data.storage(MCF.storage).modify_set("register").value(r"{}")
         ScoreBoard.to_storage(
@@ -1040,59 +2009,48 @@ class _IterationContext(Generic[ElementType]):
         # reset loop exit flg
         ScoreBoard.players_set(MCF.LOOP_EXIT, MCF.sb_sys, 0)
         # entry
-        ScoreBoard.players_set(self._index_id, MCF.sb_general, 0)
+        if self._scratch is not None:
+            self._scratch.assign(self._source)
+        else:
+            ScoreBoard.players_set(self._index_id, MCF.sb_general, 0)
         Function(self._control_sig).call()
         MCF.forward(self._control_path)
-        # check terminate flg
-        Execute().condition('if').score_matches(
-            MCF.TERMINATE, MCF.sb_sys, 1, 1
-        ).run(
-            ReturN().value(0)
-        )
-        # check break flg
-        Execute().condition('if').score_matches(
-            MCF.LOOP_EXIT, MCF.sb_sys, 1, 1
-        ).run(
-            ReturN().value(0)
-        )
-        ScoreBoard.players_set(MCF.LOOP_CONT, MCF.sb_sys, 0)
-        Data.storage(MCF.storage).modify_set("call.m0").value(f'"{self._iter_src}"')
-        Execute().store('result').storage(MCF.storage, "call.m1", 'int', 1.0).run(
-            ScoreBoard.players_get(self._index_id, MCF.sb_general)
-        )
-        # validate
-        Function(MCF.builtinSign('array_list.iterate')).with_args(
-            Data.storage(MCF.storage), "call"
-        )
-        # return if out of range
-        Execute().condition('if').score_matches(
-            MCF.GENERAL, MCF.sb_sys, 0, 0
-        ).run(
-            ReturN().value(0)
-        )
-        # collect
-        self._ret_value.collect("register")
+        # check terminate & break flg, reset loop skip flg
+        self._checks = _LoopChecks()
+        self._next_element()
         # call main
         Function(self._main_sig).call()
         MCF.forward(self._main_path)
+        MCF.enterScope(keep_live=True)
         MCF._context_type.append('loop')
         MCF._last_ctx_type = 'norm'
+        MCF.beginSignals()
         return self
     
     def __next__(self) -> ElementType:
         if self._iter_used:
+            signals = MCF.endSignals((MCF.TERMINATE,))
             # leave
             MCF.rewind()
-            ScoreBoard.players_add(self._index_id, MCF.sb_general, 1)
+            if self._scratch is None:
+                ScoreBoard.players_add(self._index_id, MCF.sb_general, 1)
             Function(self._control_sig).call()
             MCF._last_ctx_type = MCF._context_type.pop()
+            self._checks.settle(signals)
             MCF.rewind()
+            MCF.exitLoop()
+            MCF.exitScope()
             if MCF.do_gc:
                 # gc iterator
-                ScoreBoard.players_reset(self._index_id, MCF.sb_general)
+                if self._scratch is None:
+                    ScoreBoard.players_reset(self._index_id, MCF.sb_general)
+                else:
+                    MCF.removeContext(self._scratch)
+                    MCF.freeFID(self._scratch, True)
+                    self._scratch._gc_sign = 'shadow'
                 # delete ref from context
-                self._ret_value.rm()
                 MCF.removeContext(self._ret_value)
+                MCF.freeFID(self._ret_value, True)
                 self._ret_value._gc_sign = 'shadow'
             # recover loop stack
             ScoreBoard.from_storage(
@@ -1103,16 +2061,29 @@ class _IterationContext(Generic[ElementType]):
             )
             Data.storage(MCF.storage).remove("loop_stack[-1]")
             # check terminate flg
-            Execute().condition('if').score_matches(
-                MCF.TERMINATE, MCF.sb_sys, 1, 1
-            ).run(
-                ReturN().value(0)
-            )
+            _check_signals(signals, 0, (MCF.TERMINATE,))
             raise StopIteration
         self._iter_used = True
         return self._ret_value
 
 class ArrayList(Generic[ElementType], MCFVariable):
+    """MCF列表
+
+    未指定元素类型的列表中，元素以`{v:...}`的形式包装储存。`ArrayList[Text]`等指定
+    了元素类型的列表为特化列表，其元素不经包装直接储存，`extract`与`construct`
+    只需一次复制，按下标读取时直接得到元素类型的变量。`ArrayList[Integer]`的元素
+    直接读入计分板，下标为编译期常量时不经过宏函数。
+    """
+    _element_type: type[MCFVariable] | None = None
+    _storage_backed = True
+
+    def __class_getitem__(cls, params: Any) -> Any:
+        if (
+            cls is ArrayList and isinstance(params, type)
+            and issubclass(params, MCFVariable)
+        ):
+            return _typed_list(params)
+        return super().__class_getitem__(params)
 
     def __init__(
         self,
@@ -1121,29 +2092,76 @@ class ArrayList(Generic[ElementType], MCFVariable):
     ):
         MCF.useComponent('array_list', built_cps.array_list)
         super().__init__(init_val, void)
-    
+
+    def _check_element(self, element: Any) -> bool:
+        if self._element_type is None:
+            valid = isinstance(element, MCFVariable)
+        elif self._element_type is Integer:
+            valid = isinstance(element, (Integer, int))
+        else:
+            valid = isinstance(element, self._element_type)
+        if not valid:
+            console.error(
+                MCFTypeError(
+                    f"Element of type {type(element)} can not be stored in "
+                    f"{type(self).__name__}."
+                )
+            )
+        return valid
+
+    @classmethod
+    def _check_list(cls, value: 'ArrayList') -> bool:
+        """`value`的元素储存方式须与本类型一致"""
+        if value._element_type is not cls._element_type:
+            console.error(
+                MCFTypeError(
+                    f"{type(value).__name__} can not be used as "
+                    f"{cls.__name__}."
+                )
+            )
+            return False
+        return True
+
+    def _known_element(self, element: Any) -> int | None:
+        """返回特化整数列表中元素的编译期常量值"""
+        if self._element_type is not Integer: return None
+        known = Integer._known_int(element)
+        return None if known is None else int(known)
+
+    def _put(self, element: 'ElementType | int', modify: Any) -> None:
+        """以`modify`指定的方式将元素写入列表"""
+        known = self._known_element(element)
+        if known is not None:
+            modify.value(str(known))
+            return
+        element.move("register")
+        if self._element_type is None:
+            Function(MCF.builtinSign('array_list.wrap')).call()
+            modify.via(Data.storage(MCF.storage), "cache.src")
+        else:
+            modify.via(Data.storage(MCF.storage), "register")
+
     def assign(self, value: Iterable[ElementType] | 'ArrayList[ElementType]') -> None:
         if isinstance(value, ArrayList):
+            if not self._check_list(value): return
             Data.storage(MCF.storage).modify_set(f"mem.{self._mcf_id}").via(
                 Data.storage(MCF.storage), f"mem.{value._mcf_id}"
             )
         elif iterable(value):
+            elements = list(value)
+            for element in elements:
+                if not self._check_element(element): return
+            known = [self._known_element(element) for element in elements]
+            if self._element_type is Integer and None not in known:
+                Data.storage(MCF.storage).modify_set(f"mem.{self._mcf_id}").value(
+                    f"[{', '.join(str(element) for element in known)}]"
+                )
+                return
             Data.storage(MCF.storage).modify_set(f"mem.{self._mcf_id}").value("[]")
-            for element in value:
-                if not isinstance(element, MCFVariable):
-                    console.error(
-                        MCFTypeError(
-                            "Element in an iterable can only be a MCFVariable"
-                            f", not {type(element)}."
-                        )
-                    )
-                    break
-                element.move("register")
-                Function(MCF.builtinSign('array_list.wrap')).call()
-                Data.storage(MCF.storage).modify_append(
-                    f"mem.{self._mcf_id}"
-                ).via(
-                    Data.storage(MCF.storage), "cache.src"
+            for element in elements:
+                self._put(
+                    element,
+                    Data.storage(MCF.storage).modify_append(f"mem.{self._mcf_id}")
                 )
         else:
             console.error(
@@ -1162,7 +2180,7 @@ class ArrayList(Generic[ElementType], MCFVariable):
         init_val: 'Iterable[ElementType] | ArrayList[ElementType] | None' = [],
         void: bool = False
     ) -> 'ArrayList[ElementType]':
-        return ArrayList(init_val, void)
+        return type(self)(init_val, void)
     
     def collect(self, src: str) -> None:
         Data.storage(MCF.storage).modify_set(f"mem.{self._mcf_id}").via(
@@ -1174,10 +2192,20 @@ class ArrayList(Generic[ElementType], MCFVariable):
         dist: str,
         mode: Literal['list', 'long', 'byte', 'int', 'raw']
     ) -> None:
-        if mode == 'raw':
+        if mode == 'raw' or (mode == 'list' and self._element_type is not None):
             Data.storage(MCF.storage).modify_set(dist).via(
                 Data.storage(MCF.storage), f"mem.{self._mcf_id}"
             )
+        elif self._element_type is not None and mode in _ARRAY_PREFIXES:
+            # 元素未经包装，逐个追加至数组即可
+            self.move("cache.src")
+            Data.storage(MCF.storage).modify_set("register").value(
+                _ARRAY_PREFIXES[mode]
+            )
+            Function(MCF.builtinSign('array_list.extend')).call()
+            Data.storage(MCF.storage).modify_set(dist).via(
+                Data.storage(MCF.storage), "register"
+            )
         elif mode == 'list':
             self.move("cache.src")
             Data.storage(MCF.storage).modify_set("register").value("[]")
@@ -1214,6 +2242,9 @@ class ArrayList(Generic[ElementType], MCFVariable):
             )
 
     def construct(self, src: str) -> None:
+        if self._element_type is not None:
+            self.collect(src)
+            return
         Data.storage(MCF.storage).modify_set("cache.src").via(
             Data.storage(MCF.storage), src
         )
@@ -1225,7 +2256,7 @@ class ArrayList(Generic[ElementType], MCFVariable):
         slot: str,
         mcf_id: str
     ) -> 'ArrayList[ElementType]':
-        temp = ArrayList(None, True)
+        temp = type(self)(None, True)
         Data.storage(MCF.storage).modify_set(f"mem.{mcf_id}", True).via(
             Data.storage(MCF.storage), f"mem.$({slot})"
         )
@@ -1244,10 +2275,9 @@ class ArrayList(Generic[ElementType], MCFVariable):
         return ret
 
     def append(self, element: ElementType) -> None:
-        element.move("register")
-        Function(MCF.builtinSign('array_list.wrap')).call()
-        Data.storage(MCF.storage).modify_append(f"mem.{self._mcf_id}").via(
-            Data.storage(MCF.storage), "cache.src"
+        if not self._check_element(element): return
+        self._put(
+            element, Data.storage(MCF.storage).modify_append(f"mem.{self._mcf_id}")
         )
 
     def insert(
@@ -1255,6 +2285,16 @@ class ArrayList(Generic[ElementType], MCFVariable):
         index: IntegerConvertible,
         element: ElementType
     ) -> None:
+        if not self._check_element(element): return
+        known = self._const_index(index)
+        if known is not None:
+            self._put(
+                element,
+                Data.storage(MCF.storage).modify_insert(
+                    f"mem.{self._mcf_id}", known
+                )
+            )
+            return
         # store index
         if isinstance(index, int):
             Data.storage(MCF.storage).modify_set("call.m0").value(str(index))
@@ -1269,17 +2309,22 @@ class ArrayList(Generic[ElementType], MCFVariable):
         # save list ptr
         Data.storage(MCF.storage).modify_set("call.m1").value(f'"{self._mcf_id}"')
         # move element to register
-        element.move("register")
+        if self._known_element(element) is not None:
+            Data.storage(MCF.storage).modify_set("register").value(
+                str(self._known_element(element))
+            )
+        else:
+            element.move("register")
         # call
-        Function(MCF.builtinSign('array_list.insert')).with_args(
+        insert = 'array_list.insert' if self._element_type is None else 'array_list.insert_raw'
+        Function(MCF.builtinSign(insert)).with_args(
             Data.storage(MCF.storage), "call"
         )
 
     def prepend(self, element: ElementType) -> None:
-        element.move("register")
-        Function(MCF.builtinSign('array_list.wrap')).call()
-        Data.storage(MCF.storage).modify_prepend(f"mem.{self._mcf_id}").via(
-            Data.storage(MCF.storage), "cache.src"
+        if not self._check_element(element): return
+        self._put(
+            element, Data.storage(MCF.storage).modify_prepend(f"mem.{self._mcf_id}")
         )
 
     def pop(
@@ -1288,6 +2333,11 @@ class ArrayList(Generic[ElementType], MCFVariable):
         index: IntegerConvertible = -1
     ) -> ElementType:
         """Pop last element by default."""
+        known = self._const_index(index)
+        if known is not None and self._element_type is not None:
+            ret_value = self._read(_type, known)
+            Data.storage(MCF.storage).remove(f"mem.{self._mcf_id}[{known}]")
+            return ret_value
         # export index on m0
         if isinstance(index, int):
             Data.storage(MCF.storage).modify_set("call.m0").value(str(index))
@@ -1301,7 +2351,8 @@ class ArrayList(Generic[ElementType], MCFVariable):
             )
         # store list ptr
         Data.storage(MCF.storage).modify_set("call.m1").value(f'"{self._mcf_id}"')
-        Function(MCF.builtinSign('array_list.pop')).with_args(
+        pop = 'array_list.pop' if self._element_type is None else 'array_list.pop_raw'
+        Function(MCF.builtinSign(pop)).with_args(
             Data.storage(MCF.storage), "call"
         )
         # create return value
@@ -1310,13 +2361,14 @@ class ArrayList(Generic[ElementType], MCFVariable):
         return ret_value
     
     def extend(self, src: 'ArrayList[ElementType]') -> None:
+        if not self._check_list(src): return
         src.move("cache.src")
         self.move("register")
         Function(MCF.builtinSign('array_list.extend')).call()
         self.collect("register")
     
     def __add__(self, src: 'ArrayList[ElementType]') -> 'ArrayList[ElementType]':
-        temp = ArrayList(self)
+        temp = type(self)(self)
         temp.extend(src)
         return temp
 
@@ -1334,6 +2386,34 @@ class ArrayList(Generic[ElementType], MCFVariable):
         self,
         index_or_slice: 'IntegerConvertible | slice'
     ) -> Union['ArrayList[ElementType]', _UntypedElement[ElementType]]:
+        if self._element_type is Integer and isinstance(index_or_slice, (int, Integer)):
+            known = self._const_index(index_or_slice)
+            if known is not None:
+                return self._read(Integer, known)
+            # 动态下标仍需宏函数定位，但元素直接读入计分板
+            index_or_slice.move("call.m0")
+            Data.storage(MCF.storage).modify_set("call.m1").value(f'"{self._mcf_id}"')
+            Function(MCF.builtinSign('array_list.at_score')).with_args(
+                Data.storage(MCF.storage), "call"
+            )
+            ret_val = Integer(None, False)
+            ScoreBoard.players_operation(
+                ret_val._mcf_id, MCF.sb_general, "=",
+                MCF.GENERAL, MCF.sb_sys
+            )
+            return ret_val
+        if self._element_type is not None and isinstance(index_or_slice, (int, Integer)):
+            known = self._const_index(index_or_slice)
+            if known is not None:
+                return self._read(self._element_type, known)
+            index_or_slice.move("call.m0")
+            Data.storage(MCF.storage).modify_set("call.m1").value(f'"{self._mcf_id}"')
+            Function(MCF.builtinSign('array_list.at_raw')).with_args(
+                Data.storage(MCF.storage), "call"
+            )
+            ret_val = self._element_type(init_val=None, void=False)
+            ret_val.collect("cache.type")
+            return ret_val
         if isinstance(index_or_slice, int):
             Data.storage(MCF.storage).modify_set("call.m0").value(str(index_or_slice))
             Data.storage(MCF.storage).modify_set("call.m1").value(f'"{self._mcf_id}"')
@@ -1400,7 +2480,7 @@ class ArrayList(Generic[ElementType], MCFVariable):
             Data.storage(MCF.storage).modify_set("register").value("[]")
             Function(MCF.builtinSign('array_list.slice')).call()
             # collect ret_val
-            ret_val = ArrayList(None, False)
+            ret_val = type(self)(None, False)
             ret_val.collect("register")
             return ret_val
         else:
@@ -1412,14 +2492,68 @@ class ArrayList(Generic[ElementType], MCFVariable):
             )
             return _UntypedElement()
 
-    def iterate(self, _type: type[ElementType]) -> _IterationContext[ElementType]:
-        return _IterationContext(self, _type)
+    def iterate(
+        self,
+        _type: type[ElementType] | None = None,
+        strategy: IterationStrategy = 'index'
+    ) -> _IterationContext[ElementType]:
+        """遍历列表，特化列表可省略元素类型。`strategy`见`_IterationContext`"""
+        if _type is None:
+            _type = self._element_type
+        if _type is None:
+            console.error(
+                MCFTypeError(
+                    "Element type is required to iterate an untyped ArrayList."
+                )
+            )
+        return _IterationContext(self, _type, strategy)
+
+    @staticmethod
+    def _const_index(index: Any) -> int | None:
+        if not isinstance(index, (int, Integer)): return None
+        known = Integer._known_int(index)
+        return None if known is None else int(known)
+
+    def _read(self, _type: type[ElementType], index: int) -> ElementType:
+        """不经宏函数读取常量下标处的元素，仅用于元素未经包装的列表"""
+        ret_val = _type(init_val=None, void=False)
+        if isinstance(ret_val, Integer):
+            Execute().store('result').score(ret_val._mcf_id, MCF.sb_general).run(
+                Data.storage(MCF.storage).get(f"mem.{self._mcf_id}[{index}]")
+            )
+            ret_val._forget()
+        else:
+            ret_val.collect(f"mem.{self._mcf_id}[{index}]")
+        return ret_val
+
+_ARRAY_PREFIXES: dict[str, str] = {
+    'long': "[L;]",
+    'byte': "[B;]",
+    'int': "[I;]"
+}
+
+_TYPED_LISTS: dict[type[MCFVariable], type[ArrayList]] = {}
+
+def _typed_list(element_type: type[ElementType]) -> type[ArrayList[ElementType]]:
+    """返回元素类型为`element_type`的特化列表类型，同一元素类型总是得到同一个类"""
+    typed = _TYPED_LISTS.get(element_type, None)
+    if typed is None:
+        name = f"ArrayList[{element_type.__name__}]"
+        typed = type(name, (ArrayList,), {
+            '_element_type': element_type,
+            '__qualname__': name,
+            '__module__': __name__
+        })
+        _TYPED_LISTS[element_type] = typed
+    return typed
 
 
 # Static String Implementation -> Text
 
 TextConvertible: TypeAlias = 'Text | str'
 class Text(MCFVariable):
+    _storage_backed = True
+
     def __init__(
         self,
         init_val: Optional[TextConvertible] = "",
@@ -1430,15 +2564,18 @@ class Text(MCFVariable):
     
     def assign(self, value: TextConvertible) -> None:
         if isinstance(value, str):
+            known = value
             value = value.replace('\\', '\\\\')
             value = value.replace('"', r'\"')
             Data.storage(MCF.storage).modify_set(f"mem.{self._mcf_id}").value(
                 f'"{value}"'
             )
+            self._learn(known)
         elif isinstance(value, Text):
             Data.storage(MCF.storage).modify_set(f"mem.{self._mcf_id}").via(
                 Data.storage(MCF.storage), f"mem.{value._mcf_id}"
             )
+            self._learn(value._known())
         else:
             console.error(
                 MCFTypeError(
@@ -1455,6 +2592,7 @@ class Text(MCFVariable):
         Data.storage(MCF.storage).modify_set(f"mem.{self._mcf_id}").via(
             Data.storage(MCF.storage), src
         )
+        self._forget()
 
     def extract(self, dist: str) -> None:
         self.move(dist)
@@ -1462,6 +2600,17 @@ class Text(MCFVariable):
     def construct(self, src: str):
         self.collect(src)
 
+    @staticmethod
+    def _known_str(value: TextConvertible) -> str | None:
+        if isinstance(value, str): return value
+        if isinstance(value, Text): return value._known()
+        return None
+
+    @staticmethod
+    def _is_bmp(value: str) -> bool:
+        """运行时以UTF-16计算长度与下标，仅在两者一致时折叠"""
+        return all(ord(char) < 0x10000 for char in value)
+
     @staticmethod
     def duplicate(
         init_val: Optional[TextConvertible] = '',
@@ -1495,6 +2644,16 @@ class Text(MCFVariable):
                         f" not {type(arg)}."
                     )
                 )
+        known = self._known()
+        if known is not None and Text._is_bmp(known):
+            size = len(known)
+            left = 0 if start is None else Integer._known_int(start)
+            right = size if end is None else Integer._known_int(end)
+            if left is not None and right is not None:
+                if left < 0: left += size
+                if right < 0: right += size
+                if 0 <= left <= right <= size:
+                    return Text(known[left:right])
         if start is None:
             Data.storage(MCF.storage).modify_set("call.m1").value("0")
         else:
@@ -1524,6 +2683,9 @@ class Text(MCFVariable):
         return ret_val
 
     def size(self) -> Integer:
+        known = self._known()
+        if known is not None and Text._is_bmp(known):
+            return Integer(len(known))
         ret_ = Integer(None, False)
         Execute().store('result').score(ret_._mcf_id, MCF.sb_general).run(
             Data.storage(MCF.storage).get(f"mem.{self._mcf_id}")
@@ -1531,6 +2693,11 @@ class Text(MCFVariable):
         return ret_
 
     def concat(self, text: TextConvertible) -> None:
+        left = self._known()
+        right = Text._known_str(text)
+        if left is not None and right is not None:
+            self.assign(left + right)
+            return
         if isinstance(text, str):
             text = text.replace('\\', '\\\\')
             text = text.replace('"', r'\"')
@@ -1557,8 +2724,12 @@ class Text(MCFVariable):
         self.concat(other)
         return self
 
-    def __ne__(self, text: TextConvertible) -> Condition:
-        result = Condition(None, False)
+    def _compare(self, text: TextConvertible, mode: Literal['if', 'unless']) -> Condition:
+        """比较两段文本，`mode`为`if`时比较是否相等，为`unless`时比较是否不等"""
+        left = self._known()
+        right = Text._known_str(text)
+        if left is not None and right is not None:
+            return Condition((left == right) == (mode == 'if'))
         self.move("register")
         if isinstance(text, str):
             text = text.replace('\\', '\\\\')
@@ -1575,21 +2746,21 @@ class Text(MCFVariable):
                     f"not {type(text)}."
                 )
             )
+        # copying succeeds only when the two texts differ
         Execute().store('success').score(MCF.GENERAL, MCF.sb_sys).run(
             Data.storage(MCF.storage).modify_set("register").via(
                 Data.storage(MCF.storage), "cache.src"
             )
-        )        
-        ScoreBoard.players_operation(
-            result._mcf_id, MCF.sb_general, "=",
-            MCF.GENERAL, MCF.sb_sys
         )
-        return result
+        return Condition._compared(mode, lambda context: context.score_matches(
+            MCF.GENERAL, MCF.sb_sys, 0, 0
+        ))
+
+    def __ne__(self, text: TextConvertible) -> Condition:
+        return self._compare(text, 'unless')
 
     def __eq__(self, text: TextConvertible) -> Condition:
-        result = self.__ne__(text)
-        result.invert()
-        return result
+        return self._compare(text, 'if')
 
 
 # Dict Implementation -> HashMap
@@ -1598,6 +2769,8 @@ class Text(MCFVariable):
 HashMapConvertible: TypeAlias = 'HashMap | dict[TextConvertible, MCFVariable]'
 ValueType = TypeVar("ValueType", bound=MCFVariable)
 class HashMap(MCFVariable):
+    _storage_backed = True
+
     def __init__(
         self,
         init_val: Optional[HashMapConvertible] = {},
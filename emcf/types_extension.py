@@ -25,6 +25,8 @@ __all__ = [
 # Based on selector
 
 class Entity(MCFVariable):
+    _storage_backed = True
+
     def __init__(
         self,
         init_val: Optional['TextConvertible | Entity'] = "@s",
@@ -133,6 +135,8 @@ class Player(Entity):
 # Based on coordinates
 
 class Block(MCFVariable):
+    _storage_backed = True
+
     def __init__(
         self,
         init_val: 'TextConvertible | Block' = "~ ~ ~",